@@ -8,15 +8,28 @@ Responsável por:
 - configurar sessão e segurança
 """
 
+import os
+
 from flask import Flask
 from .extensions import init_extensions
+from .metrics import init_metrics
+from .sessions import init_sessions
+from .writequeue import init_write_queue
+from .retention import init_retention
 from .db import init_database
+from .commands import init_commands
 
-# Importação das blueprints (rotas)
+# Importação das blueprints (rotas).
+# routes/registros.py e routes/offices.py são a versão antiga (dependem
+# de um app.models que não existe) e não são registradas: records,
+# deleted e offices do próprio pacote as substituem.
 from .routes.auth import auth_bp
-from .routes.users import users_bp
-from .routes.offices import offices_bp
-from .routes.registros import registros_bp
+from .records import records_bp
+from .deleted import deleted_bp
+from .users import users_bp
+from .offices import offices_bp
+from .api import api_bp
+from .user_store import current_user
 
 
 def create_app():
@@ -26,11 +39,53 @@ def create_app():
     Torna o projeto modular, organizado e compatível com servidores de produção.
     """
 
-    app = Flask(__name__)
+    # templates/ e static/ ficam na raiz do projeto, fora do pacote
+    app = Flask(__name__, template_folder="../templates", static_folder="../static")
 
     # Configurações essenciais
     app.config["SECRET_KEY"] = "SUA_SECRET_KEY_SUPER_SECRETA_AQUI"
-    app.config["DB_PATH"] = "database.db"
+    app.config["DB_PATH"] = os.environ.get("DB_PATH", "database.db")
+
+    # Pool de conexões SQLite (um por worker do gunicorn)
+    app.config["DB_POOL_SIZE"] = 4
+    app.config["DB_BUSY_TIMEOUT_MS"] = 5000
+    app.config["DB_MMAP_SIZE"] = 256 * 1024 * 1024
+    app.config["DB_CACHE_SIZE_KB"] = 20000
+
+    # Leituras pesadas (tabela, lixeira, exportação, relatórios, dashboard)
+    # em conexões somente leitura. DB_READ_PATH: snapshot renovado com
+    # `flask db-backup <arquivo>`; sem ele, o próprio DB_PATH (mode=ro)
+    app.config["DB_READ_ROUTING"] = os.environ.get("DB_READ_ROUTING", "1") == "1"
+    app.config["DB_READ_PATH"] = os.environ.get("DB_READ_PATH")
+    app.config["DB_READ_POOL_SIZE"] = 4
+
+    # Custo do hash de senhas (meça com: flask bench-passwords).
+    # Hashes antigos são regravados com este custo no próximo login
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:260000"
+
+    # Sessões no servidor: snapshot do usuário recarregado após este tempo
+    app.config["USER_SNAPSHOT_TTL_S"] = 300
+
+    # Relatórios PDF em lote (pool de processos)
+    app.config["REPORTS_DIR"] = "reports"
+    app.config["REPORT_WORKERS"] = 2
+    app.config["REPORT_JOB_TIMEOUT_S"] = 30 * 60
+
+    # Cadastros gravados via fila + thread única (ative com WRITE_BEHIND=1)
+    app.config["WRITE_BEHIND"] = os.environ.get("WRITE_BEHIND") == "1"
+    app.config["WRITE_QUEUE_PATH"] = "write_queue.db"
+    app.config["WRITE_QUEUE_BATCH_SIZE"] = 500
+
+    # Retenção da lixeira (0 = nunca remove); limpeza em lotes a cada intervalo
+    app.config["TRASH_RETENTION_DAYS"] = int(os.environ.get("TRASH_RETENTION_DAYS", "0"))
+    app.config["TRASH_PURGE_INTERVAL_S"] = 3600
+    app.config["TRASH_PURGE_BATCH_SIZE"] = 500
+
+    # Cache do HTML das linhas das tabelas, por worker (0 = desligado)
+    app.config["FRAGMENT_CACHE_MAX_BYTES"] = 32 * 1024 * 1024
+
+    # Instrumentação (/metrics e Server-Timing) — ative com METRICS_ENABLED=1
+    app.config["METRICS_ENABLED"] = os.environ.get("METRICS_ENABLED") == "1"
 
     # Inicialização das Extensões
     init_extensions(app)
@@ -38,10 +93,34 @@ def create_app():
     # Inicialização do Banco de Dados
     init_database(app)
 
+    # Sessões guardadas no SQLite (o cookie leva só o id)
+    init_sessions(app)
+
+    # Comandos de linha de comando (flask db-migrate, ...)
+    init_commands(app)
+
+    # Fila de gravação assíncrona (opcional)
+    init_write_queue(app)
+
+    # Limpeza periódica da lixeira (opcional)
+    init_retention(app)
+
+    # Métricas por requisição (opcional)
+    init_metrics(app)
+
     # Registro de Blueprints (Rotas)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(records_bp)
+    app.register_blueprint(deleted_bp)
     app.register_blueprint(users_bp)
     app.register_blueprint(offices_bp)
-    app.register_blueprint(registros_bp)
+
+    # Usuário logado (snapshot da sessão) disponível em todos os templates
+    @app.context_processor
+    def inject_current_user():
+        return {"current_user": current_user()}
+
+    # API JSON (/api/v1)
+    app.register_blueprint(api_bp)
 
     return app
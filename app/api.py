@@ -0,0 +1,404 @@
+"""
+api.py
+---------------------------
+API JSON versionada (/api/v1) para as integrações internas.
+
+Inclui:
+- GET /registros: filtros iguais aos da tabela (office, filtro, valor,
+  data_tipo, data_de, data_ate), paginação por cursor (keyset sobre o id)
+  e projeção de colunas (fields=id,nome,cpf)
+- POST/PATCH/DELETE /registros: criação, alteração e exclusão em lote,
+  cada chamada em uma única transação (tudo ou nada)
+- PATCH /registros/batch: a mesma alteração em vários ids; alterações
+  com "version" são condicionais (edits.py) e conflitos voltam com 409
+- GET /excluidos: lixeira com cursor e projeção
+- GET /offices: escritórios permitidos ao usuário
+- Mesmas regras das telas: usuário logado (sessão) e escritórios
+  permitidos; GET condicional (ETag) pelas versões dos dados
+
+Respostas de erro: {"error": "...", "details": [...]} com o status HTTP.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+
+from flask import Blueprint, request, abort, jsonify
+from werkzeug.exceptions import HTTPException
+
+from .db_helpers import write_transaction, parse_ids
+from .extensions import get_conn, get_read_conn
+from .edits import validate_changes, update_registros, batch_update
+from .importer import INSERT_SQL, validate_row
+from .query import parse_filters, fetch_page, parse_int_arg, EXPORT_COLUMNS, DEFAULT_PER_PAGE, MAX_PER_PAGE
+from .trash import trash_scope_sql, move_to_trash
+from .user_store import current_user, permitted_offices, office_allowed
+from .utils import list_offices, get_office_directory, normalize_office_key, invalidate_office_cache
+from .versions import conditional, registros_version
+
+
+api_bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+# Colunas que podem ser pedidas em fields=
+REGISTRO_FIELDS = EXPORT_COLUMNS + ("version",)
+EXCLUIDO_FIELDS = (
+    "id", "nome", "cpf", "escritorio_origem", "escritorio_origem_chave", "tipo_acao",
+    "data_fechamento", "pendencias", "numero_processo", "data_protocolo",
+    "observacoes", "captador", "created_at", "data_exclusao", "registro_id",
+)
+
+# Itens por chamada de POST/PATCH/DELETE
+MAX_BULK_ITEMS = 1000
+
+
+# =============================================================================
+# AUTENTICAÇÃO E ERROS
+# =============================================================================
+@api_bp.before_request
+def _require_login():
+    """A API usa a mesma sessão das telas; sem login responde 401 (sem redirect)."""
+    if current_user() is None:
+        abort(401, description="login necessário")
+
+
+@api_bp.errorhandler(HTTPException)
+def _json_error(e):
+    body = {"error": e.description}
+    details = getattr(e, "details", None)
+    if details:
+        body["details"] = details
+    return jsonify(body), e.code
+
+
+def _fail(code, message, details=None):
+    """Aborta com o status e, opcionalmente, a lista de erros por item."""
+    try:
+        abort(code, description=message)
+    except HTTPException as e:
+        e.details = details
+        raise
+
+
+# =============================================================================
+# PARÂMETROS: CURSOR E PROJEÇÃO
+# =============================================================================
+def encode_cursor(last_id):
+    """Cursor opaco para a próxima página (o último id entregue)."""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Id a partir do qual continuar, ou None na primeira página."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        _fail(400, "cursor inválido")
+
+
+def parse_fields(args, allowed_fields):
+    """
+    Lê fields=a,b,c. Sem o parâmetro, devolve todas as colunas.
+    O id é sempre incluído (é a chave do cursor).
+    """
+    raw = args.get("fields", "").strip()
+    if not raw:
+        return allowed_fields
+
+    fields = ["id"]
+    for name in raw.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in allowed_fields:
+            _fail(400, f"campo desconhecido: {name}")
+        if name not in fields:
+            fields.append(name)
+    return tuple(fields)
+
+
+def _page(rows, fields, limit):
+    """Corpo de uma página de listagem com o cursor seguinte."""
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "data": [{f: r[f] for f in fields} for r in rows],
+        "next_cursor": encode_cursor(rows[-1]["id"]) if more else None,
+    }
+
+
+def _json_items(key):
+    """Lista `key` do corpo JSON, com o limite de itens por chamada."""
+    body = request.get_json(silent=True)
+    items = body.get(key) if isinstance(body, dict) else None
+
+    if not isinstance(items, list) or not items:
+        _fail(400, f'corpo deve ser {{"{key}": [...]}} não vazio')
+    if len(items) > MAX_BULK_ITEMS:
+        _fail(400, f"no máximo {MAX_BULK_ITEMS} itens por chamada")
+    return items
+
+
+# =============================================================================
+# REGISTROS
+# =============================================================================
+@api_bp.route("/registros", methods=["GET"])
+@conditional(lambda: [registros_version(request.args.get("office")), "offices"])
+def registros_list():
+    """
+    Lista registros ativos, ORDER BY id DESC.
+
+    Parâmetros: office (padrão CENTRAL), filtros da tabela, fields,
+    limit (1..MAX_PER_PAGE) e cursor (next_cursor da página anterior).
+    """
+    allowed = permitted_offices()
+    filters = parse_filters(request.args.get("office"), request.args, allowed)
+    fields = parse_fields(request.args, REGISTRO_FIELDS)
+    limit = parse_int_arg(request.args, "limit", DEFAULT_PER_PAGE, minimum=1, maximum=MAX_PER_PAGE)
+    after = decode_cursor(request.args.get("cursor"))
+
+    result = fetch_page(get_read_conn(), filters, limit, after=after, columns=", ".join(fields))
+
+    return {
+        "data": [{f: r[f] for f in fields} for r in result["rows"]],
+        "next_cursor": encode_cursor(result["last_id"]) if result["has_next"] else None,
+    }
+
+
+@api_bp.route("/registros", methods=["POST"])
+def registros_create():
+    """
+    Cria registros em lote: {"items": [{nome, cpf, escritorio, ...}]}.
+
+    Mesma validação da importação de planilhas. Se algum item for
+    inválido nada é gravado e a resposta lista os erros por índice.
+
+    Returns:
+        201 {"ids": [...]} na ordem dos itens.
+    """
+    items = _json_items("items")
+    allowed = permitted_offices()
+    directory = get_office_directory()
+
+    rows, errors, new_offices = [], [], {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({"index": index, "error": "item deve ser um objeto"})
+            continue
+
+        data, reason = validate_row(item)
+        if reason:
+            errors.append({"index": index, "error": reason})
+            continue
+
+        office = directory["by_display"].get(data["escritorio"]) or directory["by_key"].get(data["escritorio"])
+        if office:
+            key, display = office["key"], office["display"]
+        else:
+            key, display = normalize_office_key(data["escritorio"]), data["escritorio"].upper()
+            new_offices.setdefault(key, display)
+
+        if not office_allowed(key, allowed):
+            errors.append({"index": index, "error": "escritório não permitido"})
+            continue
+
+        rows.append((
+            data["nome"], data["cpf"], key, display,
+            data["tipo_acao"], data["data_fechamento"], data["pendencias"],
+            data["numero_processo"], data["data_protocolo"],
+            data["observacoes"], data["captador"],
+        ))
+
+    if errors:
+        _fail(400, "itens inválidos", errors)
+
+    now = datetime.utcnow().isoformat()
+    conn = get_conn()
+    ids = []
+
+    with write_transaction(conn):
+        if new_offices:
+            conn.executemany(
+                "INSERT OR IGNORE INTO offices (office_key, display_name) VALUES (?, ?)",
+                sorted(new_offices.items()),
+            )
+        for row in rows:
+            ids.append(conn.execute(INSERT_SQL, row + (now,)).lastrowid)
+
+    if new_offices:
+        invalidate_office_cache()
+    return {"ids": ids}, 201
+
+
+@api_bp.route("/registros", methods=["PATCH"])
+def registros_update():
+    """
+    Altera registros em lote: {"items": [{"id": 1, "version": 3, "nome": "...", ...}]}.
+
+    Somente as colunas enviadas mudam (EDITABLE_FIELDS), validadas como
+    na importação. Com "version" a linha só é gravada se ainda estiver
+    nessa versão. Item inválido ou id repetido (400), id inexistente ou
+    não permitido (404) ou versão desatualizada (409) cancela a chamada
+    inteira.
+
+    Returns:
+        {"updated": n, "versions": {id: nova versão}}
+    """
+    items = _json_items("items")
+
+    changes, errors, seen = [], [], set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not parse_ids([item.get("id")]):
+            errors.append({"index": index, "error": "id ausente ou inválido"})
+            continue
+
+        # Repetido com versão daria um falso 409 (a 1ª alteração muda a versão)
+        reg_id = int(item["id"])
+        if reg_id in seen:
+            errors.append({"index": index, "error": "id repetido"})
+            continue
+        seen.add(reg_id)
+
+        version, reason = _parse_version(item.get("version"))
+        if not reason:
+            fields = {k: v for k, v in item.items() if k not in ("id", "version")}
+            values, reason = validate_changes(fields)
+        if reason:
+            errors.append({"index": index, "error": reason})
+            continue
+
+        changes.append((reg_id, values, version))
+
+    if errors:
+        _fail(400, "itens inválidos", errors)
+
+    result = update_registros(get_conn(), changes, permitted_offices())
+    return _edit_response(result)
+
+
+@api_bp.route("/registros/batch", methods=["PATCH"])
+def registros_batch_update():
+    """
+    Aplica a mesma alteração a vários registros:
+        {"set": {"tipo_acao": "..."}, "ids": [1, 2, 3]}
+    ou, com checagem de versão por registro:
+        {"set": {...}, "items": [{"id": 1, "version": 3}, ...]}
+
+    Um UPDATE por bloco de ids, tudo em uma transação; 404/409 como no PATCH.
+
+    Returns:
+        {"updated": n, "versions": {id: nova versão}}
+    """
+    body = request.get_json(silent=True)
+    fields = body.get("set") if isinstance(body, dict) else None
+    if not isinstance(fields, dict):
+        _fail(400, 'corpo deve ter "set": {coluna: valor}')
+
+    values, reason = validate_changes(fields)
+    if reason:
+        _fail(400, reason)
+
+    ids, versions, errors = [], {}, []
+    if "items" in body:
+        for index, item in enumerate(_json_items("items")):
+            if not isinstance(item, dict) or not parse_ids([item.get("id")]):
+                errors.append({"index": index, "error": "id ausente ou inválido"})
+                continue
+
+            version, reason = _parse_version(item.get("version"))
+            if reason:
+                errors.append({"index": index, "error": reason})
+                continue
+
+            reg_id = int(item["id"])
+            if reg_id not in ids:
+                ids.append(reg_id)
+            if version is not None:
+                versions[reg_id] = version
+    else:
+        ids = parse_ids(_json_items("ids"))
+
+    if errors:
+        _fail(400, "itens inválidos", errors)
+
+    result = batch_update(get_conn(), ids, values, versions, permitted_offices())
+    return _edit_response(result)
+
+
+def _parse_version(value):
+    """Versão informada pelo cliente: (int | None, motivo da rejeição)."""
+    if value is None:
+        return None, None
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        return None, "version inválida"
+    return value, None
+
+
+def _edit_response(result):
+    """Resposta de edits.update_registros / batch_update (409 se houver conflito)."""
+    details = [
+        {"id": c["id"], "error": "versão desatualizada", "version": c["version"]}
+        for c in result["conflicts"]
+    ] + [
+        {"id": i, "error": "registro não encontrado"} for i in result["missing"]
+    ]
+
+    if result["conflicts"]:
+        _fail(409, "registros alterados por outro usuário; nada foi alterado", details)
+    if result["missing"]:
+        _fail(404, "registros não encontrados; nada foi alterado", details)
+
+    versions = result["versions"]
+    return {"updated": len(versions), "versions": {str(k): v for k, v in versions.items()}}
+
+
+@api_bp.route("/registros", methods=["DELETE"])
+def registros_delete():
+    """
+    Move registros para a lixeira em lote: {"ids": [1, 2, 3]}, em uma
+    transação (trash.move_to_trash). Ids de escritórios não permitidos
+    são ignorados.
+
+    Returns:
+        {"deleted": n}
+    """
+    deleted = move_to_trash(get_conn(), _json_items("ids"), permitted_offices())
+
+    return {"deleted": deleted}
+
+
+# =============================================================================
+# EXCLUÍDOS E ESCRITÓRIOS
+# =============================================================================
+@api_bp.route("/excluidos", methods=["GET"])
+@conditional(["excluidos", "offices"])
+def excluidos_list():
+    """Lixeira (tabela excluidos), ORDER BY id DESC, com fields, limit e cursor."""
+    fields = parse_fields(request.args, EXCLUIDO_FIELDS)
+    limit = parse_int_arg(request.args, "limit", DEFAULT_PER_PAGE, minimum=1, maximum=MAX_PER_PAGE)
+    after = decode_cursor(request.args.get("cursor"))
+
+    conn = get_read_conn()
+    scope, params = trash_scope_sql(conn, permitted_offices())
+    if after is not None:
+        scope += " AND id < ?"
+        params = params + [after]
+
+    rows = conn.execute(f"""
+        SELECT {", ".join(fields)} FROM excluidos
+        WHERE {scope}
+        ORDER BY id DESC
+        LIMIT ?
+    """, params + [limit + 1]).fetchall()
+
+    return _page(rows, fields, limit)
+
+
+@api_bp.route("/offices", methods=["GET"])
+@conditional(["offices"])
+def offices_list():
+    """Escritórios permitidos ao usuário: {"data": [{"key", "display"}]}."""
+    allowed = permitted_offices()
+    return {"data": [o for o in list_offices() if office_allowed(o["key"], allowed)]}
@@ -0,0 +1,142 @@
+"""
+backup.py
+---------------------------
+Cópia de segurança do banco em uso (API de backup do SQLite).
+
+Inclui:
+- Cópia em passos de N páginas com uma pausa entre eles: cada passo é
+  uma leitura curta, então cadastros e edições seguem durante a cópia
+  (copiar o arquivo com o app no ar pode gerar um backup corrompido)
+- Se o banco mudar durante a cópia, o SQLite recomeça do início; após
+  BACKUP_MAX_RESTARTS recomeços o restante é copiado em um único passo
+  (uma só transação de leitura — no WAL não bloqueia os gravadores)
+- Snapshot em arquivo único (journal_mode=DELETE), verificado com
+  PRAGMA integrity_check e, opcionalmente, compactado (gzip)
+- Gravação em arquivo temporário + rename: um backup interrompido
+  nunca substitui o anterior
+
+Uso: flask --app wsgi db-backup backups/ --gzip
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+
+
+DEFAULT_STEP_PAGES = 1024
+DEFAULT_PAUSE_S = 0.01
+BACKUP_MAX_RESTARTS = 3
+
+
+class BackupError(Exception):
+    """Snapshot gerado não passou na verificação de integridade."""
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def snapshot_path(dest, now=None):
+    """Se dest for um diretório, gera database-AAAAMMDD-HHMMSS.db dentro dele."""
+    if os.path.isdir(dest):
+        stamp = (now or datetime.now()).strftime("%Y%m%d-%H%M%S")
+        return os.path.join(dest, f"database-{stamp}.db")
+    return dest
+
+
+def backup_database(src_path, dest, step_pages=DEFAULT_STEP_PAGES, pause_s=DEFAULT_PAUSE_S,
+                    compress=False, verify=True, progress=None):
+    """
+    Gera um snapshot consistente de `src_path` com o app no ar.
+
+    Args:
+        src_path: banco de origem (DB_PATH).
+        dest: arquivo de destino ou diretório (nome com data e hora).
+        step_pages: páginas copiadas por passo.
+        pause_s: pausa entre os passos.
+        compress: grava <dest>.gz em vez do .db.
+        verify: roda PRAGMA integrity_check no snapshot.
+        progress (callable): recebe (páginas restantes, total) a cada passo.
+
+    Returns:
+        dict: {"path", "pages", "steps", "restarts", "seconds", "bytes",
+               "integrity"}
+
+    Raises:
+        BackupError: integrity_check diferente de "ok" (nada é gravado).
+    """
+    dest = snapshot_path(dest)
+    final_path = dest + ".gz" if compress else dest
+    tmp_path = dest + ".tmp"
+
+    start = time.monotonic()
+    state = {"steps": 0, "restarts": 0, "remaining": None, "total": 0}
+
+    def on_step(status, remaining, total):
+        # remaining volta a subir quando o banco mudou e a cópia recomeçou
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+        state.update(steps=state["steps"] + 1, remaining=remaining, total=total)
+
+        if progress:
+            progress(remaining, total)
+        if remaining and state["restarts"] >= BACKUP_MAX_RESTARTS:
+            raise _TooManyRestarts()
+        if remaining:
+            time.sleep(pause_s)
+
+    src = sqlite3.connect(src_path, timeout=30)
+    target = sqlite3.connect(tmp_path)
+    try:
+        try:
+            src.backup(target, pages=step_pages, progress=on_step)
+        except _TooManyRestarts:
+            src.backup(target, pages=-1)
+
+        # Arquivo único, sem -wal ao lado
+        target.execute("PRAGMA journal_mode=DELETE")
+
+        integrity = None
+        if verify:
+            integrity = "; ".join(r[0] for r in target.execute("PRAGMA integrity_check"))
+            if integrity != "ok":
+                raise BackupError(f"integrity_check: {integrity}")
+
+        pages = target.execute("PRAGMA page_count").fetchone()[0]
+    except BaseException:
+        target.close()
+        _remove(tmp_path)
+        raise
+    finally:
+        src.close()
+
+    target.close()
+
+    if compress:
+        gz_tmp = final_path + ".tmp"
+        with open(tmp_path, "rb") as raw, gzip.open(gz_tmp, "wb", compresslevel=6) as out:
+            shutil.copyfileobj(raw, out, 1024 * 1024)
+        _remove(tmp_path)
+        tmp_path = gz_tmp
+
+    os.replace(tmp_path, final_path)
+
+    return {
+        "path": final_path,
+        "pages": pages,
+        "steps": state["steps"],
+        "restarts": state["restarts"],
+        "seconds": time.monotonic() - start,
+        "bytes": os.path.getsize(final_path),
+        "integrity": integrity,
+    }
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
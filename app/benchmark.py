@@ -0,0 +1,490 @@
+"""
+benchmark.py
+---------------------------
+Benchmark das rotas com dados sintéticos (ver benchmark.py na raiz).
+
+Inclui:
+- Gerador de registros, excluídos, escritórios e usuários em escala
+  configurável (10 mil a 5 milhões de linhas), com distribuição
+  desigual entre escritórios (Zipf: poucos escritórios concentram a
+  maior parte dos registros, como em produção)
+- Gravação em blocos de GENERATE_CHUNK_ROWS linhas por transação; os
+  triggers (FTS, contadores, versões) rodam como num cadastro real
+- Cenários executados pelo test client do Flask contra a app de
+  create_app: submit, table, edit, delete, restore_selected,
+  delete_forever_selected e admin_users, além da geração de PDF
+  (pdfgen, no próprio processo); rota ausente é erro
+- Relatório com vazão e latências (p50/p90/p95/p99/máx) por cenário,
+  em JSON, e comparação entre dois relatórios (ex.: dois commits)
+"""
+
+import io
+import itertools
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from flask import url_for
+
+from .db_helpers import write_transaction
+from .extensions import get_conn
+from .passwords import hash_password
+from .pdfgen import render_registros_pdf
+from .query import parse_filters, iter_filtered
+from .reports import REPORT_COLUMNS
+from .user_store import load_user_snapshot
+
+
+GENERATE_CHUNK_ROWS = 50000
+
+TIPOS_ACAO = (
+    "TRABALHISTA", "PREVIDENCIARIO", "CIVEL", "CONSUMIDOR", "TRIBUTARIO",
+    "FAMILIA", "BANCARIO",
+)
+PENDENCIAS = ("", "", "", "NÃO PAGO", "PAGO", "DOCUMENTAÇÃO", "ASSINATURA")
+ROLES = ("OPERADOR",) * 8 + ("SUPERVISOR",) * 2
+
+# Endpoint de cada cenário. Todos precisam estar registrados em create_app:
+# faltar um é erro (BenchmarkError), não um cenário a menos no relatório
+SCENARIO_ENDPOINTS = {
+    "submit": "records.submit",
+    "table": "records.table",
+    "edit": "records.edit",
+    "delete": "records.delete",
+    "restore_selected": "deleted.restore_selected",
+    "delete_forever_selected": "deleted.delete_forever_selected",
+    "admin_users": "users.admin_users",
+}
+SCENARIOS = tuple(SCENARIO_ENDPOINTS) + ("pdf",)
+
+# Ids por requisição nos cenários em lote
+SELECTED_IDS = 20
+
+
+class BenchmarkError(Exception):
+    """A app não tem as rotas dos cenários pedidos."""
+
+
+# =============================================================================
+# DADOS SINTÉTICOS
+# =============================================================================
+def office_weights(count, skew):
+    """
+    Pesos Zipf (1 / posição^skew) dos escritórios.
+    skew=0 distribui por igual; 1.2 põe ~35% no maior com 20 escritórios.
+    """
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def _cpf(rng):
+    """CPF com dígitos verificadores válidos (somente dígitos)."""
+    digits = [rng.randrange(10) for _ in range(9)]
+    for size in (10, 11):
+        total = sum(d * w for d, w in zip(digits, range(size, 1, -1)))
+        digits.append(total * 10 % 11 % 10)
+    return "".join(map(str, digits))
+
+
+def _date(rng, start, days):
+    return (start + timedelta(days=rng.randrange(days))).isoformat()
+
+
+def _registro(rng, i, office, start):
+    key, display = office
+    protocolo = _date(rng, start, 1100) if rng.random() < 0.6 else ""
+    return (
+        f"CLIENTE SINTETICO {i}",
+        _cpf(rng),
+        key,
+        display,
+        rng.choice(TIPOS_ACAO),
+        _date(rng, start, 1095),
+        rng.choice(PENDENCIAS),
+        f"{rng.randrange(10 ** 7):07d}-{rng.randrange(100):02d}.{start.year}.8.26.0100",
+        protocolo,
+        f"observação {i}" if rng.random() < 0.3 else "",
+        f"CAPTADOR {rng.randrange(50)}",
+        datetime.now().isoformat(timespec="seconds"),
+    )
+
+
+def generate_dataset(conn, rows=10000, deleted_ratio=0.1, offices=20, users=50,
+                     skew=1.2, seed=42, log=None):
+    """
+    Preenche um banco recém-criado (init_database) com dados sintéticos.
+    Mesmos parâmetros e mesma semente → mesmo conteúdo.
+
+    Args:
+        rows: registros ativos.
+        deleted_ratio: excluídos na lixeira, em proporção de rows.
+        offices: escritórios (além da CENTRAL).
+        users: usuários além do admin (1 a 3 escritórios cada).
+        skew: expoente Zipf da distribuição entre escritórios.
+        log (callable): recebe mensagens de progresso.
+
+    Returns:
+        dict: {"registros", "excluidos", "offices", "users", "seconds"}
+    """
+    rng = random.Random(seed)
+    log = log or (lambda msg: None)
+    start = time.monotonic()
+    base_date = date.today() - timedelta(days=3 * 365)
+
+    office_list = [(f"ESCRITORIO_{n:03d}", f"ESCRITORIO {n:03d}") for n in range(1, offices + 1)]
+    cum_weights = list(itertools.accumulate(office_weights(offices, skew)))
+
+    def pick_offices(k):
+        return rng.choices(office_list, cum_weights=cum_weights, k=k)
+
+    with write_transaction(conn):
+        conn.executemany(
+            "INSERT OR IGNORE INTO offices (office_key, display_name) VALUES (?, ?)",
+            [("CENTRAL", "CENTRAL")] + office_list,
+        )
+
+        # Um único hash para todos: o custo do hash não entra na geração
+        password = hash_password("benchmark")
+        for n in range(1, users + 1):
+            user_id = conn.execute("""
+                INSERT INTO users (username, password, full_name, role, active)
+                VALUES (?, ?, ?, ?, 1)
+            """, (f"usuario{n}", password, f"Usuário {n}", rng.choice(ROLES))).lastrowid
+            keys = {key for key, _ in pick_offices(rng.randint(1, 3))}
+            conn.executemany(
+                "INSERT INTO user_offices (user_id, office_key) VALUES (?, ?)",
+                [(user_id, key) for key in sorted(keys)],
+            )
+
+    trashed = int(rows * deleted_ratio)
+    for table, total in (("registros", rows), ("excluidos", trashed)):
+        done = 0
+        while done < total:
+            size = min(GENERATE_CHUNK_ROWS, total - done)
+            batch = [
+                _registro(rng, done + j, office, base_date)
+                for j, office in enumerate(pick_offices(size))
+            ]
+
+            with write_transaction(conn):
+                if table == "registros":
+                    conn.executemany("""
+                        INSERT INTO registros (
+                            nome, cpf, escritorio_dono, escritorio_nome, tipo_acao,
+                            data_fechamento, pendencias, numero_processo,
+                            data_protocolo, observacoes, captador, created_at
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, batch)
+                else:
+                    # Origem como no move_to_trash: nome exibido + chave
+                    conn.executemany("""
+                        INSERT INTO excluidos (
+                            nome, cpf, escritorio_origem_chave, escritorio_origem,
+                            tipo_acao, data_fechamento, pendencias, numero_processo,
+                            data_protocolo, observacoes, captador, created_at,
+                            data_exclusao
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                                  datetime('now', 'localtime', ?))
+                    """, [r + (f"-{rng.randrange(365)} days",) for r in batch])
+
+            done += size
+            log(f"{table}: {done}/{total}")
+
+    conn.execute("PRAGMA optimize")
+    conn.commit()
+
+    return {
+        "registros": rows,
+        "excluidos": trashed,
+        "offices": offices,
+        "users": users,
+        "seconds": time.monotonic() - start,
+    }
+
+
+# =============================================================================
+# CENÁRIOS
+# =============================================================================
+class _Picker:
+    """Sorteia escritórios e ids existentes para montar as requisições."""
+
+    def __init__(self, conn, seed, skew):
+        self.conn = conn
+        self.rng = random.Random(seed)
+        self.offices = [r[0] for r in conn.execute(
+            "SELECT office_key FROM offices WHERE office_key != 'CENTRAL' ORDER BY office_key"
+        )]
+        self.cum_weights = list(itertools.accumulate(office_weights(len(self.offices), skew)))
+
+    def office(self):
+        if not self.offices or self.rng.random() < 0.2:
+            return "CENTRAL"
+        return self.rng.choices(self.offices, cum_weights=self.cum_weights)[0]
+
+    def _ids(self, table, columns, count):
+        high = self.conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+        return self.conn.execute(f"""
+            SELECT {columns} FROM {table} WHERE id >= ? ORDER BY id LIMIT ?
+        """, (self.rng.randint(1, max(high, 1)), count)).fetchall()
+
+    def registro(self):
+        rows = self._ids("registros", "id, version", 1)
+        return tuple(rows[0]) if rows else (None, None)
+
+    def trash_ids(self, count=SELECTED_IDS):
+        return [r[0] for r in self._ids("excluidos", "id", count)]
+
+
+def _request_submit(picker, n):
+    rng = picker.rng
+    return "POST", {}, {
+        "nome": f"CLIENTE BENCHMARK {n}",
+        "cpf": _cpf(rng),
+        "escritorio_dono": picker.office(),
+        "tipo_acao": rng.choice(TIPOS_ACAO),
+        "data_fechamento": date.today().isoformat(),
+    }
+
+
+def _request_table(picker, n):
+    args = {"office": picker.office()}
+    # Metade das requisições pede uma página adiante (cursor)
+    if picker.rng.random() < 0.5:
+        reg_id, _ = picker.registro()
+        if reg_id:
+            args["after"] = reg_id
+    return "GET", args, None
+
+
+def _request_edit(picker, n):
+    reg_id, version = picker.registro()
+    return "POST", {"reg_id": reg_id or 0}, {
+        "nome": f"CLIENTE EDITADO {n}",
+        "cpf": _cpf(picker.rng),
+        "tipo_acao": picker.rng.choice(TIPOS_ACAO),
+        "data_fechamento": date.today().isoformat(),
+        "version": version or "",
+    }
+
+
+def _request_delete(picker, n):
+    reg_id, _ = picker.registro()
+    return "POST", {}, {"id": reg_id or ""}
+
+
+def _request_trash_selected(picker, n):
+    return "POST", {}, {"ids": picker.trash_ids()}
+
+
+def _request_admin_users(picker, n):
+    return "GET", {"page": picker.rng.randint(1, 3)}, None
+
+
+SCENARIO_REQUESTS = {
+    "submit": _request_submit,
+    "table": _request_table,
+    "edit": _request_edit,
+    "delete": _request_delete,
+    "restore_selected": _request_trash_selected,
+    "delete_forever_selected": _request_trash_selected,
+    "admin_users": _request_admin_users,
+}
+
+
+def summarize(timings, errors=0, statuses=None):
+    """
+    Latências (ms) e vazão de uma série de medições (segundos).
+
+    Returns:
+        dict: {"requests", "errors", "p50_ms", "p90_ms", "p95_ms",
+               "p99_ms", "max_ms", "mean_ms", "per_s"} (+ "statuses")
+    """
+    timings = sorted(timings)
+    if not timings:
+        return {"requests": 0, "errors": errors}
+
+    def pct(p):
+        return timings[min(len(timings) - 1, int(p / 100 * len(timings)))] * 1000
+
+    result = {
+        "requests": len(timings),
+        "errors": errors,
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": timings[-1] * 1000,
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "per_s": len(timings) / sum(timings),
+    }
+    if statuses is not None:
+        result["statuses"] = {str(k): v for k, v in sorted(statuses.items())}
+    return result
+
+
+def login_client(app, user_id):
+    """Test client com a sessão do usuário já aberta (sem passar pelo login)."""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+        sess["user"] = load_user_snapshot(get_conn(), user_id)
+    return client
+
+
+def check_endpoints(app, scenarios):
+    """
+    Raises:
+        BenchmarkError: algum cenário sem o endpoint registrado na app.
+    """
+    missing = [
+        f"{s} ({SCENARIO_ENDPOINTS[s]})" for s in scenarios
+        if s in SCENARIO_ENDPOINTS and SCENARIO_ENDPOINTS[s] not in app.view_functions
+    ]
+    if missing:
+        raise BenchmarkError("endpoints não registrados: " + ", ".join(missing))
+
+
+def run_scenario(app, client, picker, scenario, iterations):
+    """
+    Executa `iterations` requisições do cenário e mede cada uma.
+    Respostas 4xx/5xx e exceções contam como erro.
+    """
+    endpoint = SCENARIO_ENDPOINTS[scenario]
+
+    timings, statuses = [], {}
+    errors = 0
+    first_error = None
+    make_request = SCENARIO_REQUESTS[scenario]
+
+    for n in range(iterations):
+        method, values, data = make_request(picker, n)
+        with app.test_request_context():
+            url = url_for(endpoint, **values)
+
+        start = time.perf_counter()
+        try:
+            response = client.open(url, method=method, data=data)
+            response.get_data()
+            status = response.status_code
+        except Exception as e:
+            status = "exception"
+            first_error = first_error or f"{type(e).__name__}: {e}"
+        timings.append(time.perf_counter() - start)
+
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == "exception" or status >= 400:
+            errors += 1
+
+    result = summarize(timings, errors, statuses)
+    result["endpoint"] = endpoint
+    if first_error:
+        result["first_error"] = first_error
+    return result
+
+
+def run_pdf(app, picker, iterations, max_rows):
+    """Desenha PDFs de até max_rows registros de um escritório sorteado."""
+    timings, rows = [], 0
+
+    for _ in range(iterations):
+        with app.app_context():
+            filters = parse_filters(picker.office(), {})
+            start = time.perf_counter()
+            rows += render_registros_pdf(
+                itertools.islice(iter_filtered(get_conn(), filters, REPORT_COLUMNS), max_rows),
+                io.BytesIO(),
+            )
+            timings.append(time.perf_counter() - start)
+
+    result = summarize(timings)
+    result["rows_per_pdf"] = rows / max(iterations, 1)
+    return result
+
+
+def run_benchmark(app, scenarios=SCENARIOS, iterations=200, pdf_iterations=10,
+                  pdf_rows=500, seed=42, skew=1.2, log=None):
+    """
+    Roda os cenários em sequência, autenticado como admin.
+
+    Returns:
+        dict: {cenário: resultado de summarize (+ "endpoint")}
+
+    Raises:
+        BenchmarkError: ver check_endpoints (verificado antes de medir).
+    """
+    check_endpoints(app, scenarios)
+    log = log or (lambda msg: None)
+    results = {}
+
+    with app.app_context():
+        conn = get_conn()
+        admin_id = conn.execute("SELECT id FROM users WHERE username='admin'").fetchone()[0]
+        client = login_client(app, admin_id)
+
+    # Conexão própria para sortear ids (fora do pool e das requisições)
+    picker = _Picker(_open_picker_conn(app), seed, skew)
+
+    for scenario in scenarios:
+        log(f"cenário {scenario}...")
+        if scenario == "pdf":
+            results[scenario] = run_pdf(app, picker, pdf_iterations, pdf_rows)
+        else:
+            results[scenario] = run_scenario(app, client, picker, scenario, iterations)
+
+    picker.conn.close()
+    return results
+
+
+def _open_picker_conn(app):
+    conn = sqlite3.connect(app.config["DB_PATH"])
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+# =============================================================================
+# RELATÓRIO
+# =============================================================================
+def environment_info():
+    """Commit, versões e máquina — para comparar execuções."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def compare_reports(old, new, metric="p95_ms"):
+    """
+    Compara dois relatórios cenário a cenário.
+
+    Returns:
+        list[dict]: {"scenario", "old", "new", "ratio"} — ratio < 1 é melhora.
+    """
+    rows = []
+    for scenario, result in new.get("scenarios", {}).items():
+        before = old.get("scenarios", {}).get(scenario, {})
+        if metric not in result or metric not in before:
+            continue
+        rows.append({
+            "scenario": scenario,
+            "old": before[metric],
+            "new": result[metric],
+            "ratio": result[metric] / before[metric] if before[metric] else None,
+        })
+    return rows
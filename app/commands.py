@@ -0,0 +1,278 @@
+"""
+commands.py
+---------------------------
+Comandos de linha de comando (Flask CLI).
+
+Uso:
+    flask --app wsgi db-migrate
+    flask --app wsgi db-check-plans
+    flask --app wsgi db-drop-soft-delete-columns --yes
+    flask --app wsgi import-registros planilha.csv --rejected rejeitados.csv
+    flask --app wsgi bench-passwords --budget-ms 250
+    flask --app wsgi write-queue-drain --retry-failed
+    flask --app wsgi trash-purge --days 90
+    flask --app wsgi db-backup backups/ --gzip
+"""
+
+import csv
+
+import click
+from flask import current_app
+
+from .extensions import get_conn
+from .migrations import run_migrations, get_version, drop_soft_delete_columns
+from .plans import check_query_plans
+from .importer import iter_file_rows, import_rows, DEFAULT_BATCH_SIZE
+from .passwords import benchmark as benchmark_passwords
+from .writequeue import drain_once, queue_stats, requeue_failed
+from .backup import backup_database, BackupError, DEFAULT_STEP_PAGES, DEFAULT_PAUSE_S
+from .retention import purge_expired_trash, enable_incremental_vacuum, DEFAULT_BATCH_SIZE as PURGE_BATCH_SIZE
+
+
+@click.command("db-migrate")
+def db_migrate_command():
+    """Aplica as migrações pendentes no banco configurado em DB_PATH."""
+
+    conn = get_conn()
+    before = get_version(conn)
+    after = run_migrations(conn, log=click.echo)
+
+    click.echo(f"Esquema na versão {after} (antes: {before}).")
+
+
+@click.command("db-drop-soft-delete-columns")
+@click.confirmation_option(
+    "--yes", prompt="Reescreve a tabela registros e bloqueia escritas até terminar. Continuar?",
+    help="Não pede confirmação.",
+)
+def db_drop_soft_delete_columns_command():
+    """
+    Remove de registros as colunas excluido e data_exclusao, sem uso
+    desde a migração 11. Manutenção opcional, fora das migrações: o
+    DROP COLUMN reescreve a tabela inteira com o lock de escrita.
+    """
+
+    conn = get_conn()
+    try:
+        dropped = drop_soft_delete_columns(conn)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f"Colunas removidas: {', '.join(dropped)}." if dropped else "Nada a remover.")
+
+
+@click.command("db-check-plans")
+def db_check_plans_command():
+    """
+    Mostra o plano de cada consulta das rotas e falha (exit 1)
+    se alguma voltar a fazer varredura completa da tabela.
+    """
+
+    conn = get_conn()
+    report = check_query_plans(conn)
+
+    for item in report:
+        status = "OK  " if item["ok"] else "SCAN"
+        click.echo(f"[{status}] {item['name']}")
+        for line in item["plan"]:
+            click.echo(f"         {line}")
+
+    if not all(item["ok"] for item in report):
+        raise SystemExit(1)
+
+
+@click.command("import-registros")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True,
+              help="Linhas gravadas por transação.")
+@click.option("--rejected", "rejected_path", type=click.Path(dir_okay=False),
+              help="Grava as linhas rejeitadas (com o motivo) neste CSV.")
+def import_registros_command(path, batch_size, rejected_path):
+    """Importa registros de uma planilha CSV ou XLSX."""
+
+    conn = get_conn()
+    rejected_file = open(rejected_path, "w", newline="", encoding="utf-8") if rejected_path else None
+    rejected_writer = csv.writer(rejected_file, delimiter=";") if rejected_file else None
+
+    keys = []
+
+    # Cabeçalho original do arquivo (antes da normalização): o CSV de
+    # rejeitadas pode ser corrigido e importado de novo
+    def on_header(header, normalized):
+        keys.extend(normalized)
+        if rejected_writer:
+            rejected_writer.writerow(["linha", "motivo", *header])
+
+    def on_reject(line_no, reason, row):
+        if rejected_writer:
+            rejected_writer.writerow([line_no, reason, *(row.get(k, "") for k in keys)])
+
+    def on_progress(read, inserted, rejected):
+        click.echo(f"  lidas: {read}  inseridas: {inserted}  rejeitadas: {rejected}")
+
+    try:
+        with open(path, "rb") as fileobj:
+            stats = import_rows(
+                conn,
+                iter_file_rows(fileobj, path, on_header=on_header),
+                batch_size=batch_size,
+                on_progress=on_progress,
+                on_reject=on_reject,
+            )
+    finally:
+        if rejected_file:
+            rejected_file.close()
+
+    click.echo(
+        f"Importação concluída: {stats['inserted']} inseridas, "
+        f"{stats['rejected']} rejeitadas de {stats['read']} lidas."
+    )
+
+
+BENCH_PASSWORD_METHODS = (
+    "pbkdf2:sha256:100000",
+    "pbkdf2:sha256:260000",
+    "pbkdf2:sha256:600000",
+    "scrypt:16384:8:1",
+    "scrypt:32768:8:1",
+)
+
+
+@click.command("bench-passwords")
+@click.option("--method", "methods", multiple=True,
+              help="Método a medir (repita a opção). Padrão: uma faixa de custos.")
+@click.option("--rounds", default=50, show_default=True,
+              help="Verificações medidas por método.")
+@click.option("--budget-ms", default=250.0, show_default=True,
+              help="Orçamento de latência (p99) de uma verificação de login.")
+def bench_passwords_command(methods, rounds, budget_ms):
+    """
+    Mede latência (p50/p95/p99) e vazão de login por worker para cada
+    custo de hash e indica o mais forte que cabe no orçamento.
+    """
+
+    methods = methods or BENCH_PASSWORD_METHODS
+    results = benchmark_passwords(methods, rounds=rounds)
+
+    click.echo(f"{'método':<24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'logins/s':>9}")
+    for r in results:
+        click.echo(
+            f"{r['method']:<24} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} "
+            f"{r['p99_ms']:8.1f} {r['logins_per_s']:9.1f}"
+        )
+
+    fitting = [r for r in results if r["p99_ms"] <= budget_ms]
+    if fitting:
+        best = max(fitting, key=lambda r: r["p99_ms"])
+        click.echo(f"\nMais forte dentro de {budget_ms:.0f} ms (p99): {best['method']}")
+        click.echo("Vazão por worker; multiplique pelo nº de workers/núcleos do servidor.")
+    else:
+        click.echo(f"\nNenhum método cabe em {budget_ms:.0f} ms (p99).")
+
+
+@click.command("write-queue-drain")
+@click.option("--retry-failed", is_flag=True,
+              help="Reenfileira os itens com erro antes de drenar.")
+def write_queue_drain_command(retry_failed):
+    """
+    Aplica agora todos os cadastros pendentes da fila de gravação
+    (ex.: antes de parar o serviço) e mostra os itens com erro.
+    """
+
+    app = current_app._get_current_object()
+    if retry_failed:
+        click.echo(f"{requeue_failed(app)} item(ns) com erro reenfileirado(s).")
+
+    total = 0
+    while True:
+        applied = drain_once(app)
+        if not applied:
+            break
+        total += applied
+
+    stats = queue_stats(app)
+    click.echo(f"{total} cadastro(s) aplicado(s); {stats['failed']} com erro na fila.")
+
+
+@click.command("trash-purge")
+@click.option("--days", type=int,
+              help="Remove o que foi excluído há mais de N dias. Padrão: TRASH_RETENTION_DAYS.")
+@click.option("--batch-size", default=PURGE_BATCH_SIZE, show_default=True,
+              help="Linhas removidas por transação.")
+@click.option("--no-vacuum", is_flag=True, help="Não roda o incremental_vacuum ao final.")
+@click.option("--enable-incremental-vacuum", "enable_vacuum", is_flag=True,
+              help="Antes, ativa auto_vacuum=INCREMENTAL (VACUUM completo, uma única vez).")
+def trash_purge_command(days, batch_size, no_vacuum, enable_vacuum):
+    """
+    Remove da lixeira os registros excluídos há mais de N dias, em lotes
+    curtos, e devolve ao sistema as páginas liberadas.
+    """
+
+    days = days if days is not None else current_app.config.get("TRASH_RETENTION_DAYS")
+    if not days or days < 1:
+        raise click.UsageError("Informe --days ou configure TRASH_RETENTION_DAYS.")
+
+    conn = get_conn()
+
+    if enable_vacuum:
+        click.echo("Ativando auto_vacuum=INCREMENTAL (VACUUM completo)...")
+        enable_incremental_vacuum(conn)
+
+    report = purge_expired_trash(conn, days, batch_size=batch_size, vacuum=not no_vacuum)
+
+    click.echo(
+        f"{report['purged']} registro(s) removido(s) em {report['batches']} lote(s); "
+        f"{report['pages_reclaimed']} página(s) recuperada(s) "
+        f"({report['bytes_reclaimed'] / 1024 / 1024:.1f} MiB)."
+    )
+    if report["freelist_pages"]:
+        click.echo(
+            f"{report['freelist_pages']} página(s) livre(s) continuam no arquivo "
+            "(use --enable-incremental-vacuum uma vez para recuperá-las)."
+        )
+
+
+@click.command("db-backup")
+@click.argument("dest", type=click.Path())
+@click.option("--pages", "step_pages", default=DEFAULT_STEP_PAGES, show_default=True,
+              help="Páginas copiadas por passo.")
+@click.option("--pause-ms", default=DEFAULT_PAUSE_S * 1000, show_default=True,
+              help="Pausa entre os passos (libera o banco para as requisições).")
+@click.option("--gzip", "compress", is_flag=True, help="Grava o snapshot compactado (.gz).")
+@click.option("--no-verify", is_flag=True, help="Não roda o integrity_check no snapshot.")
+def db_backup_command(dest, step_pages, pause_ms, compress, no_verify):
+    """
+    Gera um snapshot do banco com o app no ar (API de backup do SQLite).
+    DEST pode ser um arquivo ou um diretório (nome com data e hora).
+    """
+
+    try:
+        report = backup_database(
+            current_app.config["DB_PATH"], dest,
+            step_pages=step_pages, pause_s=pause_ms / 1000,
+            compress=compress, verify=not no_verify,
+        )
+    except BackupError as e:
+        click.echo(f"Backup descartado: {e}", err=True)
+        raise SystemExit(1)
+
+    click.echo(
+        f"Backup gravado em {report['path']}: {report['pages']} páginas, "
+        f"{report['bytes'] / 1024 / 1024:.1f} MiB em {report['seconds']:.1f} s "
+        f"({report['steps']} passos, {report['restarts']} recomeço(s))."
+    )
+    if report["integrity"]:
+        click.echo(f"integrity_check: {report['integrity']}")
+
+
+def init_commands(app):
+    """Registra os comandos na CLI do Flask."""
+
+    app.cli.add_command(db_migrate_command)
+    app.cli.add_command(db_check_plans_command)
+    app.cli.add_command(db_drop_soft_delete_columns_command)
+    app.cli.add_command(import_registros_command)
+    app.cli.add_command(bench_passwords_command)
+    app.cli.add_command(write_queue_drain_command)
+    app.cli.add_command(trash_purge_command)
+    app.cli.add_command(db_backup_command)
@@ -8,6 +8,8 @@ Inclui:
 
 from flask import current_app
 from .extensions import get_conn
+from .migrations import run_migrations
+from .passwords import hash_password
 
 
 # ======================================================================
@@ -42,9 +44,36 @@ CREATE TABLE IF NOT EXISTS registros (
     nome TEXT,
     cpf TEXT,
     escritorio_dono TEXT,
+    escritorio_nome TEXT,
+    tipo_acao TEXT,
     data_fechamento TEXT,
-    excluido INTEGER DEFAULT 0,
-    data_exclusao TEXT DEFAULT NULL
+    pendencias TEXT,
+    numero_processo TEXT,
+    data_protocolo TEXT,
+    observacoes TEXT,
+    captador TEXT,
+    created_at TEXT,
+    version INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS excluidos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT,
+    cpf TEXT,
+    escritorio_origem TEXT,
+    escritorio_origem_chave TEXT,
+    tipo_acao TEXT,
+    data_fechamento TEXT,
+    pendencias TEXT,
+    numero_processo TEXT,
+    data_protocolo TEXT,
+    observacoes TEXT,
+    captador TEXT,
+    created_at TEXT,
+    data_exclusao TEXT,
+    registro_id INTEGER,
+    version INTEGER,
+    escritorio_nome TEXT
 );
 """
 
@@ -56,6 +85,7 @@ def init_database(app):
     """
     Criado quando a aplicação inicializa.
     - Executa o schema
+    - Aplica as migrações pendentes (índices, colunas novas)
     - Cria admin padrão caso não exista
     - Prepara escritórios básicos caso necessário
     """
@@ -64,9 +94,19 @@ def init_database(app):
         conn = get_conn()
         cur = conn.cursor()
 
+        # Banco novo: páginas liberadas pela limpeza da lixeira podem ser
+        # devolvidas com incremental_vacuum (o VACUUM de um banco vazio é
+        # imediato e aplica o modo, já que o WAL gravou o cabeçalho)
+        if cur.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+            cur.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            cur.execute("VACUUM")
+
         # Criação de todas as tabelas
         cur.executescript(SCHEMA_SQL)
 
+        # Migrações versionadas (PRAGMA user_version)
+        run_migrations(conn)
+
         # Verifica se existe administrador
         cur.execute("SELECT * FROM users WHERE username='admin'")
         admin = cur.fetchone()
@@ -74,7 +114,7 @@ def init_database(app):
         if not admin:
             cur.execute("""
                 INSERT INTO users (username, password, full_name, role, active)
-                VALUES ('admin', '123456', 'Administrador do Sistema', 'ADMIN', 1)
-            """)
+                VALUES ('admin', ?, 'Administrador do Sistema', 'ADMIN', 1)
+            """, (hash_password("123456"),))
 
         conn.commit()
@@ -8,12 +8,15 @@ Inclui:
 - Verificação de existência
 - Inserções base
 - Inicialização do sistema
+- Transações de escrita explícitas e lotes de ids
 """
 
+from contextlib import contextmanager
 from datetime import datetime
 from werkzeug.security import generate_password_hash
 
 from .extensions import get_conn
+from .migrations import run_migrations
 
 
 def init_db():
@@ -22,6 +25,7 @@ def init_db():
     Popula o banco com:
         - ADMIN padrão
         - Escritório CENTRAL
+    Ao final aplica as migrações pendentes (app/migrations.py).
     """
     conn = get_conn()
     c = conn.cursor()
@@ -118,4 +122,62 @@ def init_db():
         """, ("admin", "Administrador Padrão", pw, "ADMIN", 1, now))
 
     conn.commit()
+
+    # Índices e colunas novas (PRAGMA user_version)
+    run_migrations(conn)
+
     conn.close()
+
+
+@contextmanager
+def write_transaction(conn):
+    """
+    Abre uma transação de escrita (BEGIN IMMEDIATE) e faz commit ao final,
+    ou rollback se ocorrer erro.
+
+    O lock de escrita é obtido logo no início, evitando que duas
+    transações leiam e depois disputem o lock no meio do trabalho.
+
+    Uso:
+        with write_transaction(conn):
+            conn.execute(...)
+    """
+    if conn.in_transaction:
+        conn.commit()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def parse_ids(values):
+    """
+    Converte ids vindos de formulário em inteiros únicos, na ordem original.
+    Valores inválidos são ignorados.
+    """
+    ids = []
+    seen = set()
+
+    for v in values:
+        try:
+            i = int(v)
+        except (TypeError, ValueError):
+            continue
+        if i not in seen:
+            seen.add(i)
+            ids.append(i)
+
+    return ids
+
+
+def chunked(items, size=500):
+    """
+    Divide uma lista em blocos de até `size` itens.
+    Mantém cada IN (...) bem abaixo do limite de variáveis do SQLite.
+    """
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -11,43 +11,68 @@ Rotas relacionadas à tabela EXCLUIDOS:
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from datetime import datetime
 
-from .extensions import get_conn
-from .utils import (
-    normalize_office_key,
-    register_office,
-    list_offices,
-    get_office_display
-)
+from .extensions import get_conn, get_read_conn
+from .utils import list_offices, require_roles_hook
+from .trash import restore_ids, purge_ids, fetch_trash_page
+from .query import parse_int_arg, DEFAULT_PER_PAGE, MAX_PER_PAGE
+from .user_store import permitted_offices, current_user
+from .versions import conditional, current_versions
+from .fragments import cached_fragment
 
 
 # -----------------------------------------------------------------------------
 # Blueprint dos EXCLUÍDOS
 # -----------------------------------------------------------------------------
 deleted_bp = Blueprint("deleted", __name__, url_prefix="/deleted")
+deleted_bp.before_request(require_roles_hook())
 
 
 # =============================================================================
 # LISTAGEM DOS EXCLUÍDOS
 # =============================================================================
 @deleted_bp.route("/")
+@conditional(["excluidos", "offices"])
 def excluidos():
     """
-    Lista todos os registros que foram movidos para a tabela 'excluidos'.
-    """
-
-    conn = get_conn()
-    c = conn.cursor()
+    Lista os registros que foram movidos para a tabela 'excluidos',
+    mais recentes primeiro.
 
-    c.execute("SELECT * FROM excluidos ORDER BY id DESC")
-    rows = c.fetchall()
+    - Paginação por keyset: ?after=<id> avança, ?before=<id> volta
+    - Cada página em cache (fragments.py) pela versão de excluidos
+    """
 
-    conn.close()
+    allowed = permitted_offices()
+    user = current_user()
+    role = user["role"] if user else None
+
+    per_page = parse_int_arg(
+        request.args, "per_page", DEFAULT_PER_PAGE, minimum=1, maximum=MAX_PER_PAGE
+    )
+    page = parse_int_arg(request.args, "page", 1, minimum=1)
+    after = parse_int_arg(request.args, "after")
+    before = parse_int_arg(request.args, "before")
+
+    def load():
+        result = fetch_trash_page(get_read_conn(), allowed, per_page, after=after, before=before)
+        meta = {k: result[k] for k in ("has_next", "has_prev", "first_id", "last_id")}
+        return {"rows": result["rows"], "current_user": user}, meta
+
+    # Linhas em cache pela versão de excluidos (a mesma do ETag); o papel
+    # entra na chave porque só o ADMIN vê a exclusão permanente
+    version = current_versions(["excluidos", "offices"])
+    key = (
+        "excluidos", allowed, role, per_page, after, before,
+        version["excluidos"][0], version["offices"][0],
+    )
+    tbody, meta = cached_fragment(key, "excluidos_rows.html", load)
 
     offices = list_offices()
 
-    return render_template("excluidos.html", rows=rows, offices=offices)
+    return render_template(
+        "excluidos.html", tbody=tbody, offices=offices,
+        page=page, per_page=per_page, **meta,
+    )
 
 
 # =============================================================================
@@ -61,47 +86,9 @@ def restore():
 
     registro_id = request.form.get("id")
 
-    conn = get_conn()
-    c = conn.cursor()
-
-    c.execute("SELECT * FROM excluidos WHERE id=?", (registro_id,))
-    row = c.fetchone()
-
-    if row:
-        origem_display = row[3]  # escritório_nome original
-        origem_chave = row[4]    # office_<KEY>
-
-        # recuperar key real
-        if origem_chave.startswith("office_"):
-            office_key = origem_chave.replace("office_", "").upper()
-        else:
-            office_key = normalize_office_key(origem_display)
-
-        register_office(office_key, origem_display)
-
-        c.execute("""
-            INSERT INTO registros (
-                nome, cpf, escritorio_chave, escritorio_nome,
-                tipo_acao, data_fechamento, pendencias,
-                numero_processo, data_protocolo,
-                observacoes, captador, created_at
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            row[1], row[2],
-            f"office_{office_key}", origem_display,
-            row[5], row[6], row[7], row[8], row[9],
-            row[10], row[11], row[12]
-        ))
-
-        # remover da tabela excluídos
-        c.execute("DELETE FROM excluidos WHERE id=?", (registro_id,))
-        conn.commit()
-
+    if restore_ids(get_conn(), [registro_id], permitted_offices()):
         flash("Registro restaurado.", "success")
 
-    conn.close()
-
     return redirect(url_for("deleted.excluidos"))
 
 
@@ -111,52 +98,14 @@ def restore():
 @deleted_bp.route("/restore_selected", methods=["POST"])
 def restore_selected():
     """
-    Restaura múltiplos registros selecionados.
+    Restaura múltiplos registros selecionados em uma única transação.
     """
 
     ids = request.form.getlist("ids")
 
-    conn = get_conn()
-    c = conn.cursor()
-
-    for registro_id in ids:
-        c.execute("SELECT * FROM excluidos WHERE id=?", (registro_id,))
-        row = c.fetchone()
-
-        if not row:
-            continue
-
-        origem_display = row[3]
-        origem_chave = row[4]
+    total = restore_ids(get_conn(), ids, permitted_offices())
 
-        if origem_chave.startswith("office_"):
-            office_key = origem_chave.replace("office_", "")
-        else:
-            office_key = normalize_office_key(origem_display)
-
-        register_office(office_key, origem_display)
-
-        c.execute("""
-            INSERT INTO registros (
-                nome, cpf, escritorio_chave, escritorio_nome,
-                tipo_acao, data_fechamento, pendencias,
-                numero_processo, data_protocolo,
-                observacoes, captador, created_at
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            row[1], row[2],
-            f"office_{office_key}", origem_display,
-            row[5], row[6], row[7], row[8], row[9],
-            row[10], row[11], row[12]
-        ))
-
-        c.execute("DELETE FROM excluidos WHERE id=?", (registro_id,))
-
-    conn.commit()
-    conn.close()
-
-    flash("Registros restaurados com sucesso.", "success")
+    flash(f"{total} registro(s) restaurado(s) com sucesso.", "success")
 
     return redirect(url_for("deleted.excluidos"))
 
@@ -172,12 +121,7 @@ def delete_forever():
 
     registro_id = request.form.get("id")
 
-    conn = get_conn()
-    c = conn.cursor()
-
-    c.execute("DELETE FROM excluidos WHERE id=?", (registro_id,))
-    conn.commit()
-    conn.close()
+    purge_ids(get_conn(), [registro_id], permitted_offices())
 
     flash("Registro excluído permanentemente.", "success")
 
@@ -190,20 +134,13 @@ def delete_forever():
 @deleted_bp.route("/delete_forever_selected", methods=["POST"])
 def delete_forever_selected():
     """
-    Remove permanentemente múltiplos registros.
+    Remove permanentemente múltiplos registros em uma única transação.
     """
 
     ids = request.form.getlist("ids")
 
-    conn = get_conn()
-    c = conn.cursor()
-
-    for rid in ids:
-        c.execute("DELETE FROM excluidos WHERE id=?", (rid,))
-
-    conn.commit()
-    conn.close()
+    total = purge_ids(get_conn(), ids, permitted_offices())
 
-    flash("Registros excluídos permanentemente.", "success")
+    flash(f"{total} registro(s) excluído(s) permanentemente.", "success")
 
     return redirect(url_for("deleted.excluidos"))
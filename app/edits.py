@@ -0,0 +1,171 @@
+"""
+edits.py
+---------------------------
+Alteração de registros com controle otimista de concorrência.
+
+Inclui:
+- Coluna version em registros (migração 10): todo UPDATE feito por aqui
+  incrementa a versão; quem informa a versão que leu só grava se a linha
+  não mudou desde então (WHERE id=? AND version=?)
+- Conflitos e ids inexistentes são reportados e a transação inteira é
+  desfeita — nada é sobrescrito sem o usuário ver
+- Edição em lote: a mesma alteração aplicada a vários ids com um UPDATE
+  por bloco (RETURNING devolve as novas versões)
+"""
+
+from .db_helpers import write_transaction, chunked
+from .importer import IMPORT_COLUMNS, validate_row
+from .user_store import office_scope_sql
+
+
+# Colunas alteráveis (o escritório dono não muda por edição)
+EDITABLE_FIELDS = tuple(c for c in IMPORT_COLUMNS if c != "escritorio")
+
+
+def validate_changes(fields):
+    """
+    Valida só as colunas enviadas, com as regras da importação
+    (nome é obrigatório apenas se enviado).
+
+    Returns:
+        tuple[dict | None, str | None]: (valores normalizados, motivo da rejeição)
+    """
+    unknown = sorted(set(fields) - set(EDITABLE_FIELDS))
+    if unknown:
+        return None, f"campos não editáveis: {', '.join(unknown)}"
+    if not fields:
+        return None, "nenhum campo para alterar"
+
+    data, reason = validate_row({"nome": "-", **fields})
+    if reason:
+        return None, reason
+    return {k: data[k] for k in fields}, None
+
+
+class _Rejected(Exception):
+    """Conflito ou id ausente: write_transaction desfaz tudo."""
+
+
+def _result():
+    return {"versions": {}, "conflicts": [], "missing": []}
+
+
+def _classify(conn, ids, scope, scope_params, result):
+    """
+    Separa os ids não alterados: os que existem mudaram de versão
+    (conflito, com a versão atual); os demais não existem ou não são
+    permitidos.
+    """
+    current = {}
+    for chunk in chunked(ids):
+        marks = ",".join("?" * len(chunk))
+        current.update(conn.execute(f"""
+            SELECT id, version FROM registros
+            WHERE id IN ({marks}) AND {scope}
+        """, chunk + scope_params).fetchall())
+
+    for reg_id in ids:
+        if reg_id in current:
+            result["conflicts"].append({"id": reg_id, "version": current[reg_id]})
+        else:
+            result["missing"].append(reg_id)
+
+
+def update_registros(conn, changes, allowed=None):
+    """
+    Aplica alterações diferentes por registro em uma transação.
+
+    Args:
+        changes: lista de (id, {coluna: valor}, versão lida ou None),
+                 sem ids repetidos. Sem versão a alteração é incondicional.
+        allowed: escritórios permitidos (None = todos).
+
+    Returns:
+        dict: {"versions": {id: nova versão}, "conflicts": [{"id", "version"}],
+               "missing": [ids]} — com conflitos ou ids ausentes nada é gravado.
+    """
+    scope, scope_params = office_scope_sql("escritorio_dono", allowed)
+    result = _result()
+    failed = []
+
+    try:
+        with write_transaction(conn):
+            for reg_id, values, version in changes:
+                assignments = "".join(f"{k}=?, " for k in values)
+                params = list(values.values()) + [reg_id]
+                check = ""
+                if version is not None:
+                    check = "AND version=?"
+                    params.append(version)
+
+                row = conn.execute(f"""
+                    UPDATE registros SET {assignments}version = version + 1
+                    WHERE id=? {check} AND {scope}
+                    RETURNING version
+                """, params + scope_params).fetchone()
+
+                if row is None:
+                    failed.append(reg_id)
+                else:
+                    result["versions"][reg_id] = row[0]
+
+            if failed:
+                _classify(conn, failed, scope, scope_params, result)
+                raise _Rejected
+    except _Rejected:
+        result["versions"] = {}
+
+    return result
+
+
+def batch_update(conn, ids, values, versions=None, allowed=None):
+    """
+    Aplica a mesma alteração a vários registros em uma transação,
+    com um UPDATE por bloco de ids.
+
+    Args:
+        ids: ids (inteiros, sem repetição).
+        values: {coluna: valor} já validados (validate_changes).
+        versions: {id: versão lida}; ids fora do dicionário são
+                  alterados sem checagem.
+        allowed: escritórios permitidos (None = todos).
+
+    Returns:
+        dict: como update_registros.
+    """
+    versions = versions or {}
+    scope, scope_params = office_scope_sql("escritorio_dono", allowed)
+    assignments = "".join(f"{k}=?, " for k in values)
+    result = _result()
+
+    checked = [i for i in ids if i in versions]
+    unchecked = [i for i in ids if i not in versions]
+
+    try:
+        with write_transaction(conn):
+            for chunk in chunked(unchecked):
+                marks = ",".join("?" * len(chunk))
+                result["versions"].update(conn.execute(f"""
+                    UPDATE registros SET {assignments}version = version + 1
+                    WHERE id IN ({marks}) AND {scope}
+                    RETURNING id, version
+                """, list(values.values()) + chunk + scope_params).fetchall())
+
+            # (id, versão) IN (VALUES ...): um único comando também com checagem
+            for chunk in chunked(checked):
+                pairs = ",".join("(?, ?)" for _ in chunk)
+                params = [p for i in chunk for p in (i, versions[i])]
+                result["versions"].update(conn.execute(f"""
+                    UPDATE registros SET {assignments}version = version + 1
+                    WHERE (id, version) IN (VALUES {pairs}) AND {scope}
+                    RETURNING id, version
+                """, list(values.values()) + params + scope_params).fetchall())
+
+            failed = [i for i in ids if i not in result["versions"]]
+            if failed:
+                _classify(conn, failed, scope, scope_params, result)
+                raise _Rejected
+    except _Rejected:
+        result["versions"] = {}
+
+    return result
@@ -4,39 +4,292 @@ Aqui ficam funções ou objetos que precisam ser utilizados em múltiplos módul
 como conexões de banco ou controladores de autenticação.
 """
 
+import os
 import sqlite3
+import threading
+import time
 from flask import g, current_app
 
 
+# ======================================================================
+#  CONEXÃO "POOLED"
+# ======================================================================
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexão SQLite que volta para o pool em vez de fechar.
+
+    Várias rotas chamam conn.close() no meio da requisição; com o pool,
+    esse close() vira no-op e a mesma conexão continua disponível para
+    helpers como list_offices() até o teardown da requisição.
+    """
+
+    def close(self):
+        pass
+
+    def really_close(self):
+        super().close()
+
+
+# ======================================================================
+#  POOL DE CONEXÕES (UM POR PROCESSO/WORKER)
+# ======================================================================
+class ConnectionPool:
+    """
+    Mantém até `size` conexões ociosas para reaproveitar entre requisições.
+
+    - Nunca bloqueia: se o pool estiver vazio, abre uma conexão nova;
+      ao devolver com o pool cheio, a excedente é fechada
+    - Cada conexão nova recebe os PRAGMAs de desempenho (WAL, etc.)
+    - Conexões ociosas há mais de `health_check_after` segundos são
+      testadas com SELECT 1 antes de serem entregues
+    - readonly=True: conexões `mode=ro` + PRAGMA query_only (ver
+      get_read_conn); se o arquivo for trocado (snapshot renovado com
+      db-backup), as conexões ociosas do arquivo antigo são descartadas
+    """
+
+    def __init__(self, path, size=4, busy_timeout_ms=5000, mmap_size=268435456,
+                 cache_size_kb=20000, health_check_after=30, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.health_check_after = health_check_after
+
+        self.pid = os.getpid()
+        self._idle = []  # [(conn, devolvida_em)]
+        self._lock = threading.Lock()
+        self._file_id = self._stat_file()
+
+    def _stat_file(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino)
+
+    def _connect(self):
+        target = self.path
+        if self.readonly:
+            target = f"file:{os.path.abspath(self.path)}?mode=ro"
+
+        conn = sqlite3.connect(
+            target,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            factory=PooledConnection,
+            uri=self.readonly,
+        )
+        conn.row_factory = sqlite3.Row  # retorna dict-like
+
+        if self.readonly:
+            # O modo WAL é do arquivo (definido pelo primário); aqui só leitura
+            conn.execute("PRAGMA query_only=ON")
+            # Autocommit: nenhum BEGIN implícito segura um snapshot antigo
+            conn.isolation_level = None
+            conn.file_id = self._file_id
+        else:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    @staticmethod
+    def _healthy(conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Entrega uma conexão ociosa saudável ou abre uma nova."""
+
+        if self.readonly:
+            file_id = self._stat_file()
+            if file_id != self._file_id:
+                self._file_id = file_id
+                self.close_all()
+
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, released_at = self._idle.pop()
+
+            if time.monotonic() - released_at < self.health_check_after:
+                return conn
+            if self._healthy(conn):
+                return conn
+
+            self._discard(conn)
+
+        return self._connect()
+
+    def release(self, conn):
+        """
+        Devolve a conexão ao pool.
+        Transações esquecidas abertas são desfeitas antes da reutilização.
+        """
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        if self.readonly and getattr(conn, "file_id", None) != self._file_id:
+            self._discard(conn)
+            return
+
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((conn, time.monotonic()))
+                return
+
+        self._discard(conn)
+
+    def close_all(self):
+        """Fecha todas as conexões ociosas."""
+
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for conn, _ in idle:
+            self._discard(conn)
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.really_close()
+        except sqlite3.Error:
+            pass
+
+
+def get_pool(app=None):
+    """
+    Retorna o pool do processo atual.
+
+    O gunicorn cria os workers via fork: conexões herdadas do processo
+    master não podem ser compartilhadas, então um PID diferente
+    descarta o pool herdado e cria um novo.
+    """
+
+    app = app or current_app
+    pool = app.extensions.get("db_pool")
+
+    if pool is None or pool.pid != os.getpid():
+        pool = ConnectionPool(
+            app.config["DB_PATH"],
+            size=app.config.get("DB_POOL_SIZE", 4),
+            busy_timeout_ms=app.config.get("DB_BUSY_TIMEOUT_MS", 5000),
+            mmap_size=app.config.get("DB_MMAP_SIZE", 268435456),
+            cache_size_kb=app.config.get("DB_CACHE_SIZE_KB", 20000),
+            health_check_after=app.config.get("DB_POOL_HEALTH_CHECK_S", 30),
+        )
+        app.extensions["db_pool"] = pool
+
+    return pool
+
+
+def get_read_pool(app=None):
+    """
+    Pool somente leitura do processo atual (DB_READ_PATH ou, sem ele,
+    o próprio DB_PATH). Recriado após fork, como get_pool().
+    """
+
+    app = app or current_app
+    pool = app.extensions.get("db_read_pool")
+
+    if pool is None or pool.pid != os.getpid():
+        pool = ConnectionPool(
+            app.config.get("DB_READ_PATH") or app.config["DB_PATH"],
+            size=app.config.get("DB_READ_POOL_SIZE", 4),
+            busy_timeout_ms=app.config.get("DB_BUSY_TIMEOUT_MS", 5000),
+            mmap_size=app.config.get("DB_MMAP_SIZE", 268435456),
+            cache_size_kb=app.config.get("DB_CACHE_SIZE_KB", 20000),
+            health_check_after=app.config.get("DB_POOL_HEALTH_CHECK_S", 30),
+            readonly=True,
+        )
+        app.extensions["db_read_pool"] = pool
+
+    return pool
+
+
 # ======================================================================
 #  FUNÇÃO DE CONEXÃO COM O BANCO
 # ======================================================================
 def get_conn():
     """
     Fornece uma conexão SQLite por requisição.
-    - Abre a conexão somente quando necessário
+    - Pega a conexão do pool somente quando necessário
     - Armazena em g (objeto de contexto do Flask)
-    - Garante fechamento automático ao final
+    - Devolve ao pool automaticamente ao final
     """
 
     if "db_conn" not in g:
-        g.db_conn = sqlite3.connect(
-            current_app.config["DB_PATH"],
-            detect_types=sqlite3.PARSE_DECLTYPES,
-        )
-        g.db_conn.row_factory = sqlite3.Row  # retorna dict-like
-    return g.db_conn
+        g.db_conn = get_pool().acquire()
+
+    return _traced("db_conn")
+
+
+def get_read_conn():
+    """
+    Conexão somente leitura para listagens, exportações, relatórios e
+    dashboard (uma por requisição, como get_conn).
+
+    - `mode=ro` + PRAGMA query_only: qualquer escrita falha em vez de
+      disputar o lock do primário
+    - No WAL, leitores não bloqueiam nem são bloqueados pelos cadastros;
+      em conexão separada, uma leitura longa também não prende a conexão
+      de escrita da requisição
+    - Com DB_READ_PATH aponta para um snapshot renovado periodicamente
+      (`flask db-backup <DB_READ_PATH>`); os dados podem estar defasados
+    - DB_READ_ROUTING=False: devolve a conexão primária (get_conn)
+    """
+
+    if not current_app.config.get("DB_READ_ROUTING", True):
+        return get_conn()
+
+    if "db_read_conn" not in g:
+        g.db_read_conn = get_read_pool().acquire()
+
+    return _traced("db_read_conn")
+
+
+def _traced(key):
+    # Instrumentação opcional (metrics.py): entrega a conexão rastreada
+    wrapper = current_app.extensions.get("db_conn_wrapper")
+    if wrapper and "sql_stats" in g:
+        traced_key = key + "_traced"
+        if traced_key not in g:
+            setattr(g, traced_key, wrapper(g.get(key), g.sql_stats))
+        return g.get(traced_key)
+
+    return g.get(key)
 
 
 def close_conn(e=None):
     """
-    Fecha a conexão ao final da requisição.
+    Devolve as conexões ao pool ao final da requisição.
     O Flask chamará automaticamente via teardown_appcontext.
     """
 
+    g.pop("db_conn_traced", None)
     conn = g.pop("db_conn", None)
     if conn:
-        conn.close()
+        get_pool().release(conn)
+
+    g.pop("db_read_conn_traced", None)
+    conn = g.pop("db_read_conn", None)
+    if conn:
+        get_read_pool().release(conn)
 
 
 # ======================================================================
@@ -0,0 +1,123 @@
+"""
+fragments.py
+---------------------------
+Cache do HTML já renderizado das linhas das tabelas (tbody).
+
+Inclui:
+- LRU em memória, por worker, limitado em bytes (FRAGMENT_CACHE_MAX_BYTES)
+- Chave com a versão dos dados (versions.py): qualquer escrita em
+  registros/excluidos muda a versão, então entradas antigas nunca mais
+  são encontradas e saem pelo LRU — não há invalidação manual
+- O valor guarda também os metadados da página (paginação, totais):
+  uma visita repetida não consulta o banco nem percorre o template
+
+O tamanho é estimado pelo nº de caracteres do HTML.
+"""
+
+import threading
+from collections import OrderedDict
+
+from flask import current_app, render_template
+from markupsafe import Markup
+
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# Fragmentos maiores que esta fração do limite não são guardados
+MAX_ENTRY_FRACTION = 4
+
+
+class FragmentCache:
+    """LRU de fragmentos renderizados com limite total de bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # chave → (html, meta, tamanho)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key, html, meta):
+        size = len(html) + 256
+        if size > self.max_bytes // MAX_ENTRY_FRACTION:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self.size -= old[2]
+
+            self._entries[key] = (html, meta, size)
+            self.size += size
+
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries), "bytes": self.size,
+                "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_fragment_cache(app=None):
+    """Cache deste worker (criado na primeira chamada com o limite da config)."""
+    global _cache
+
+    app = app or current_app
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FragmentCache(
+                    app.config.get("FRAGMENT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+                )
+    return _cache
+
+
+def cached_fragment(key, template, load):
+    """
+    Devolve (tbody, meta) do cache ou renderiza e guarda.
+
+    Args:
+        key (tuple): identifica o fragmento; deve incluir a versão dos dados.
+        template (str): template só com as linhas (<tr>...</tr>).
+        load (callable): consulta o banco; devolve (contexto do template, meta).
+
+    Returns:
+        tuple[Markup, dict]
+    """
+    cache = get_fragment_cache()
+
+    if cache.max_bytes:
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+
+    context, meta = load()
+    html = Markup(render_template(template, **context))
+
+    if cache.max_bytes:
+        cache.put(key, html, meta)
+    return html, meta
@@ -0,0 +1,358 @@
+"""
+importer.py
+---------------------------
+Importação em massa de registros a partir de planilhas (CSV ou XLSX).
+
+Inclui:
+- Leitura linha a linha (geradores), sem carregar o arquivo em memória
+- Validação e normalização de CPF, datas e escritório
+- Resolução dos escritórios por um único mapa em memória
+- Validação e resolução de um cadastro avulso do formulário (mesmas
+  regras), usada por records.submit e pela fila de gravação
+- Inserção com executemany em lotes, cada lote em sua própria transação
+- Relatório de progresso e de linhas rejeitadas
+
+Colunas reconhecidas (cabeçalho, sem diferenciar maiúsculas/acentos simples):
+    nome, cpf, escritorio, tipo_acao, data_fechamento, pendencias,
+    numero_processo, data_protocolo, observacoes, captador
+"""
+
+import csv
+import io
+from datetime import datetime
+
+from .db_helpers import write_transaction
+from .utils import (
+    normalize_cpf, is_valid_cpf, normalize_office_key, get_office_directory,
+    find_office_by_display, invalidate_office_cache
+)
+
+
+IMPORT_COLUMNS = (
+    "nome", "cpf", "escritorio", "tipo_acao", "data_fechamento", "pendencias",
+    "numero_processo", "data_protocolo", "observacoes", "captador",
+)
+
+# Cabeçalhos alternativos comuns nas planilhas antigas
+HEADER_ALIASES = {
+    "escritório": "escritorio",
+    "escritorio_dono": "escritorio",
+    "escritorio_nome": "escritorio",
+    "tipo da ação": "tipo_acao",
+    "tipo_ação": "tipo_acao",
+    "data de fechamento": "data_fechamento",
+    "pendências": "pendencias",
+    "nº processo": "numero_processo",
+    "numero do processo": "numero_processo",
+    "data de protocolo": "data_protocolo",
+    "observações": "observacoes",
+}
+
+DEFAULT_BATCH_SIZE = 1000
+
+INSERT_SQL = """
+    INSERT INTO registros (
+        nome, cpf, escritorio_dono, escritorio_nome,
+        tipo_acao, data_fechamento, pendencias, numero_processo,
+        data_protocolo, observacoes, captador, created_at
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+# =============================================================================
+# LEITURA (GERADORES)
+# =============================================================================
+def _normalize_header(name):
+    key = (name or "").strip().lower()
+    return HEADER_ALIASES.get(key, key.replace(" ", "_"))
+
+
+def iter_csv_rows(stream, on_header=None):
+    """
+    Lê um CSV linha a linha.
+    Detecta o separador (";" do Excel brasileiro ou ",").
+
+    Args:
+        stream: arquivo de texto aberto.
+        on_header (callable): recebe (cabeçalho original, chaves
+                              normalizadas) antes da primeira linha.
+
+    Yields:
+        tuple[int, dict]: (número da linha no arquivo, {coluna: valor})
+    """
+    sample = stream.read(4096)
+    stream.seek(0)
+
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.reader(stream, dialect)
+    raw_header = next(reader, [])
+    header = [_normalize_header(h) for h in raw_header]
+    if on_header:
+        on_header(raw_header, header)
+
+    for line_no, values in enumerate(reader, start=2):
+        if not any(v.strip() for v in values):
+            continue
+        yield line_no, dict(zip(header, values))
+
+
+def _xlsx_value(value):
+    """Células numéricas (CPF, nº processo) chegam como float: 123.0 → "123"."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return value
+
+
+def iter_xlsx_rows(fileobj, on_header=None):
+    """
+    Lê a primeira planilha de um XLSX linha a linha (modo read_only).
+    Requer o pacote openpyxl. on_header: como em iter_csv_rows.
+
+    Yields:
+        tuple[int, dict]: (número da linha, {coluna: valor})
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Importação de XLSX requer o pacote openpyxl.")
+
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        raw_header = [str(h) if h is not None else "" for h in next(rows, ())]
+        header = [_normalize_header(h) for h in raw_header]
+        if on_header:
+            on_header(raw_header, header)
+
+        for line_no, values in enumerate(rows, start=2):
+            if not any(v not in (None, "") for v in values):
+                continue
+            yield line_no, {h: _xlsx_value(v) for h, v in zip(header, values)}
+    finally:
+        wb.close()
+
+
+def iter_file_rows(fileobj, filename, on_header=None):
+    """
+    Escolhe o leitor pelo nome do arquivo.
+
+    Args:
+        fileobj: arquivo binário aberto.
+        filename (str): nome original (define CSV ou XLSX).
+        on_header (callable): ver iter_csv_rows.
+    """
+    if filename.lower().endswith(".xlsx"):
+        return iter_xlsx_rows(fileobj, on_header)
+
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    return iter_csv_rows(text, on_header)
+
+
+# =============================================================================
+# VALIDAÇÃO
+# =============================================================================
+def _parse_date(value):
+    """
+    Aceita data ISO (AAAA-MM-DD), brasileira (DD/MM/AAAA) ou datetime do XLSX.
+    Retorna a data em ISO, "" se vazia, ou None se inválida.
+    """
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+
+    value = str(value).strip()
+    if not value:
+        return ""
+
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y"):
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def validate_row(row):
+    """
+    Valida e normaliza uma linha da planilha.
+
+    Returns:
+        tuple[dict | None, str | None]: (dados normalizados, motivo da rejeição)
+    """
+    data = {col: str(row.get(col, "") or "").strip() for col in IMPORT_COLUMNS}
+
+    if not data["nome"]:
+        return None, "nome vazio"
+
+    if data["cpf"]:
+        data["cpf"] = normalize_cpf(data["cpf"]).zfill(11)
+        if not is_valid_cpf(data["cpf"]):
+            return None, "CPF inválido"
+
+    for col in ("data_fechamento", "data_protocolo"):
+        parsed = _parse_date(row.get(col, ""))
+        if parsed is None:
+            return None, f"{col} inválida"
+        data[col] = parsed
+
+    data["escritorio"] = data["escritorio"] or "CENTRAL"
+    data["captador"] = data["captador"] or "NÃO PAGO"
+
+    return data, None
+
+
+# =============================================================================
+# CADASTRO AVULSO (FORMULÁRIO)
+# =============================================================================
+def resolve_submission(row):
+    """
+    Valida um cadastro do formulário (mesmas regras da importação) e
+    resolve o escritório pelo diretório em memória: "escritorio" pode
+    ser o nome exibido ou a chave; nome desconhecido vira escritório novo.
+
+    Returns:
+        tuple[dict | None, str | None]: (colunas de INSERT_SQL, com
+        escritorio_dono, escritorio_nome e created_at; motivo da rejeição)
+    """
+    data, reason = validate_row(row)
+    if reason:
+        return None, reason
+
+    office = (find_office_by_display(data["escritorio"])
+              or get_office_directory()["by_key"].get(data["escritorio"]))
+    if office:
+        key, display = office["key"], office["display"]
+    else:
+        key, display = normalize_office_key(data["escritorio"]), data["escritorio"].upper()
+
+    data["escritorio_dono"] = key
+    data["escritorio_nome"] = display
+    data["created_at"] = datetime.utcnow().isoformat()
+    del data["escritorio"]
+
+    return data, None
+
+
+def registro_params(data, now=None):
+    """Parâmetros de INSERT_SQL para um dict de resolve_submission."""
+    return (
+        data.get("nome"), data.get("cpf"), data.get("escritorio_dono"), data.get("escritorio_nome"),
+        data.get("tipo_acao"), data.get("data_fechamento"), data.get("pendencias"),
+        data.get("numero_processo"), data.get("data_protocolo"), data.get("observacoes"),
+        data.get("captador"), data.get("created_at") or now,
+    )
+
+
+# =============================================================================
+# IMPORTAÇÃO
+# =============================================================================
+class _OfficeMap:
+    """
+    Mapa em memória nome exibido / chave → (chave, nome exibido).
+    Escritórios novos ficam pendentes até o próximo lote ser gravado.
+    """
+
+    def __init__(self):
+        directory = get_office_directory()
+        self.by_display = {d: o["key"] for d, o in directory["by_display"].items()}
+        self.by_key = {k: o["display"] for k, o in directory["by_key"].items()}
+        self.pending = {}
+
+    def resolve(self, name):
+        key = self.by_display.get(name)
+        if key:
+            return key, self.by_key[key]
+
+        display = name.upper()
+        key = self.by_display.get(display) or normalize_office_key(name)
+
+        if key not in self.by_key:
+            self.by_key[key] = display
+            self.pending[key] = display
+
+        self.by_display[name] = key
+        return key, self.by_key[key]
+
+
+def import_rows(conn, rows, batch_size=DEFAULT_BATCH_SIZE, on_progress=None, on_reject=None,
+                allowed=None):
+    """
+    Importa registros a partir de um iterável de (linha, dict).
+
+    Args:
+        conn: conexão sqlite3.
+        rows: gerador de iter_csv_rows / iter_xlsx_rows.
+        batch_size (int): linhas por transação.
+        on_progress (callable): recebe (lidas, inseridas, rejeitadas) a cada lote.
+        on_reject (callable): recebe (linha, motivo, dict original).
+        allowed: escritórios permitidos (None = todos); linhas de outros
+                 escritórios são rejeitadas.
+
+    Returns:
+        dict: {"read": int, "inserted": int, "rejected": int}
+    """
+    offices = _OfficeMap()
+    stats = {"read": 0, "inserted": 0, "rejected": 0}
+    batch = []
+
+    def flush():
+        now = datetime.utcnow().isoformat()
+
+        with write_transaction(conn):
+            if offices.pending:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO offices (office_key, display_name) VALUES (?, ?)",
+                    list(offices.pending.items()),
+                )
+                offices.pending.clear()
+
+            conn.executemany(INSERT_SQL, [b + (now,) for b in batch])
+
+        stats["inserted"] += len(batch)
+        batch.clear()
+
+        if on_progress:
+            on_progress(stats["read"], stats["inserted"], stats["rejected"])
+
+    for line_no, row in rows:
+        stats["read"] += 1
+        data, reason = validate_row(row)
+
+        if reason:
+            stats["rejected"] += 1
+            if on_reject:
+                on_reject(line_no, reason, row)
+            continue
+
+        key, display = offices.resolve(data["escritorio"])
+
+        if allowed is not None and key not in allowed:
+            offices.pending.pop(key, None)
+            stats["rejected"] += 1
+            if on_reject:
+                on_reject(line_no, "escritório não permitido", row)
+            continue
+
+        batch.append((
+            data["nome"], data["cpf"], key, display,
+            data["tipo_acao"], data["data_fechamento"], data["pendencias"],
+            data["numero_processo"], data["data_protocolo"],
+            data["observacoes"], data["captador"],
+        ))
+
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    elif on_progress:
+        on_progress(stats["read"], stats["inserted"], stats["rejected"])
+
+    invalidate_office_cache()
+    return stats
@@ -0,0 +1,245 @@
+"""
+metrics.py
+---------------------------
+Instrumentação opcional de requisições e SQL (METRICS_ENABLED).
+
+Inclui:
+- Conexão "rastreada": conta consultas, tempo de SQL e linhas lidas
+  por requisição (envolve a conexão entregue por get_conn())
+- Histogramas de latência e de nº de consultas por endpoint
+  (um nº alto de consultas por requisição denuncia padrões N+1)
+- Cabeçalho Server-Timing em todas as respostas
+- Endpoint /metrics no formato texto do Prometheus
+
+Os valores ficam em memória, por processo: cada worker do gunicorn
+expõe os próprios números em /metrics.
+"""
+
+import threading
+import time
+
+from flask import g, request, Response
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+# =============================================================================
+# CONEXÃO E CURSOR RASTREADOS
+# =============================================================================
+class TracedCursor:
+    """Cursor que soma tempo e linhas lidas nas estatísticas da requisição."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._stats["sql_time"] += time.perf_counter() - start
+
+    def execute(self, *args):
+        self._stats["queries"] += 1
+        self._timed(self._cursor.execute, *args)
+        return self
+
+    def executemany(self, *args):
+        self._stats["queries"] += 1
+        self._timed(self._cursor.executemany, *args)
+        return self
+
+    def executescript(self, *args):
+        self._stats["queries"] += 1
+        self._timed(self._cursor.executescript, *args)
+        return self
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None:
+            self._stats["rows"] += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._timed(self._cursor.fetchmany, *args)
+        self._stats["rows"] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._stats["rows"] += len(rows)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class TracedConnection:
+    """
+    Envolve a conexão do pool; tudo que não é consulta é repassado.
+    """
+
+    def __init__(self, conn, stats):
+        self._conn = conn
+        self._stats = stats
+
+    def cursor(self, *args):
+        return TracedCursor(self._conn.cursor(*args), self._stats)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def executescript(self, *args):
+        return self.cursor().executescript(*args)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+# =============================================================================
+# REGISTRO DAS MÉTRICAS (POR PROCESSO)
+# =============================================================================
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, le in enumerate(self.buckets):
+            if value <= le:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+_lock = threading.Lock()
+_latency = {}   # endpoint → _Histogram (segundos)
+_queries = {}   # endpoint → _Histogram (consultas por requisição)
+_counters = {}  # (nome, endpoint) → valor
+
+
+def record_request(endpoint, duration, stats):
+    """Acumula os números de uma requisição concluída."""
+    with _lock:
+        _latency.setdefault(endpoint, _Histogram(LATENCY_BUCKETS)).observe(duration)
+        _queries.setdefault(endpoint, _Histogram(QUERY_BUCKETS)).observe(stats["queries"])
+
+        for name, value in (
+            ("sql_queries_total", stats["queries"]),
+            ("sql_seconds_total", stats["sql_time"]),
+            ("sql_rows_total", stats["rows"]),
+        ):
+            _counters[(name, endpoint)] = _counters.get((name, endpoint), 0) + value
+
+
+def _label(endpoint):
+    return endpoint.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _render_histogram(lines, name, help_text, histograms):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+
+    for endpoint, h in sorted(histograms.items()):
+        ep = _label(endpoint)
+        for le, count in zip(h.buckets, h.counts):
+            lines.append(f'{name}_bucket{{endpoint="{ep}",le="{le}"}} {count}')
+        lines.append(f'{name}_bucket{{endpoint="{ep}",le="+Inf"}} {h.total}')
+        lines.append(f'{name}_sum{{endpoint="{ep}"}} {h.sum}')
+        lines.append(f'{name}_count{{endpoint="{ep}"}} {h.total}')
+
+
+def render_prometheus():
+    """Gera o texto de exposição do Prometheus (versão 0.0.4)."""
+    lines = []
+
+    with _lock:
+        _render_histogram(
+            lines, "app_request_duration_seconds",
+            "Latência das requisições por endpoint.", _latency,
+        )
+        _render_histogram(
+            lines, "app_request_sql_queries",
+            "Consultas SQL por requisição (N+1 aparece aqui).", _queries,
+        )
+
+        for name, help_text in (
+            ("sql_queries_total", "Consultas SQL executadas."),
+            ("sql_seconds_total", "Tempo gasto em SQL (execute + fetch)."),
+            ("sql_rows_total", "Linhas lidas do banco."),
+        ):
+            lines.append(f"# HELP app_{name} {help_text}")
+            lines.append(f"# TYPE app_{name} counter")
+            for (n, endpoint), value in sorted(_counters.items()):
+                if n == name:
+                    lines.append(f'app_{name}{{endpoint="{_label(endpoint)}"}} {value}')
+
+    return "\n".join(lines) + "\n"
+
+
+# =============================================================================
+# GANCHOS DA REQUISIÇÃO
+# =============================================================================
+def _before_request():
+    g.request_start = time.perf_counter()
+    g.sql_stats = {"queries": 0, "sql_time": 0.0, "rows": 0}
+
+
+def _after_request(response):
+    start = g.get("request_start")
+    stats = g.get("sql_stats")
+    if start is None or stats is None:
+        return response
+
+    duration = time.perf_counter() - start
+    endpoint = request.endpoint or "404"
+
+    if endpoint != "static":
+        record_request(endpoint, duration, stats)
+
+    response.headers.add(
+        "Server-Timing",
+        f'app;dur={duration * 1000:.1f}, '
+        f'db;dur={stats["sql_time"] * 1000:.1f};desc="{stats["queries"]} queries, {stats["rows"]} rows"',
+    )
+    return response
+
+
+def metrics_view():
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+def init_metrics(app):
+    """
+    Ativa a instrumentação se METRICS_ENABLED estiver ligado:
+    ganchos de requisição, conexão rastreada em get_conn() e /metrics.
+    """
+    if not app.config.get("METRICS_ENABLED"):
+        return
+
+    app.extensions["db_conn_wrapper"] = TracedConnection
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -0,0 +1,630 @@
+"""
+migrations.py
+---------------------------
+Migrações versionadas do esquema SQLite.
+
+Inclui:
+- Controle de versão via PRAGMA user_version
+- Reconciliação de colunas em bancos antigos
+- Índices compostos e parciais das consultas mais usadas
+  (os planos são conferidos por plans.py)
+
+Regras:
+- Cada comando roda em uma transação curta e separada (BEGIN IMMEDIATE),
+  então leitores continuam atendidos enquanto os índices são criados
+- Todos os comandos são idempotentes (IF NOT EXISTS / checagem de coluna):
+  se o processo cair no meio, basta rodar de novo
+- A versão é relida dentro da transação, então vários workers do
+  gunicorn podem subir ao mesmo tempo sem aplicar a mesma migração duas vezes
+"""
+
+# Colunas esperadas em registros (bancos antigos nasceram com menos colunas)
+REGISTROS_COLUMNS = (
+    ("escritorio_nome", "TEXT"),
+    ("tipo_acao", "TEXT"),
+    ("pendencias", "TEXT"),
+    ("numero_processo", "TEXT"),
+    ("data_protocolo", "TEXT"),
+    ("observacoes", "TEXT"),
+    ("captador", "TEXT"),
+    ("created_at", "TEXT"),
+    # Exclusão lógica antiga: usadas pelas migrações 2 a 5; sem uso desde a
+    # 11 (remoção opcional: drop_soft_delete_columns)
+    ("excluido", "INTEGER DEFAULT 0"),
+    ("data_exclusao", "TEXT DEFAULT NULL"),
+    # Versão da linha (controle otimista de concorrência, edits.py)
+    ("version", "INTEGER NOT NULL DEFAULT 1"),
+)
+
+# Colunas da lixeira que guardam a linha original para a restauração
+# (mesmo id, versão e nome do escritório; ver trash.py)
+EXCLUIDOS_COLUMNS = (
+    ("registro_id", "INTEGER"),
+    ("version", "INTEGER"),
+    ("escritorio_nome", "TEXT"),
+)
+
+
+def _add_missing_columns(conn):
+    """
+    Adiciona em registros as colunas que o código usa e o banco não tem.
+    """
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(registros)")}
+
+    # Bancos criados por db_helpers.init_db usam escritorio_chave
+    if "escritorio_dono" not in existing:
+        conn.execute("ALTER TABLE registros ADD COLUMN escritorio_dono TEXT")
+        if "escritorio_chave" in existing:
+            conn.execute("""
+                UPDATE registros
+                SET escritorio_dono = REPLACE(escritorio_chave, 'office_', '')
+            """)
+
+    for name, decl in REGISTROS_COLUMNS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE registros ADD COLUMN {name} {decl}")
+
+
+FTS_COLUMNS = "nome, cpf, numero_processo, observacoes, pendencias"
+
+
+def _populate_fts(conn):
+    """
+    (Re)indexa os registros ativos na busca textual.
+    Não usa o comando 'rebuild' do FTS5 porque ele indexaria também
+    os registros com excluido=1.
+    """
+    conn.execute("INSERT INTO registros_fts (registros_fts) VALUES ('delete-all')")
+    conn.execute(f"""
+        INSERT INTO registros_fts (rowid, {FTS_COLUMNS})
+        SELECT id, {FTS_COLUMNS} FROM registros WHERE excluido=0
+    """)
+
+
+# Chave do escritório de uma linha da lixeira (mesma regra de trash.py,
+# sem a função Python, que não existe dentro de triggers)
+TRASH_OFFICE_KEY_SQL = """
+    CASE
+        WHEN {row}.escritorio_origem_chave LIKE 'office\\_%' ESCAPE '\\'
+            THEN UPPER(SUBSTR({row}.escritorio_origem_chave, 8))
+        ELSE COALESCE({row}.escritorio_origem_chave, '')
+    END
+"""
+
+
+def _stats_statements(row, sign, live_only=False):
+    """
+    Comandos que somam (sign=1) ou subtraem (sign=-1) uma linha de
+    registros ('new' ou 'old') dos contadores agregados.
+
+    live_only: registros só guarda linhas ativas (migração 11); antes
+    disso a coluna excluido separa ativos de excluídos.
+    """
+    office = f"COALESCE({row}.escritorio_dono, '')"
+    active = "1" if live_only else f"{row}.excluido=0"
+    trashed = "0" if live_only else f"{row}.excluido<>0"
+    return f"""
+        INSERT INTO office_stats (office_key, ativos, excluidos)
+        VALUES ({office}, {sign} * ({active}), {sign} * ({trashed}))
+        ON CONFLICT(office_key) DO UPDATE SET
+            ativos = ativos + excluded.ativos,
+            excluidos = excluidos + excluded.excluidos;
+
+        INSERT INTO office_stats_tipo (office_key, tipo_acao, total)
+        SELECT {office}, COALESCE({row}.tipo_acao, ''), {sign}
+        WHERE {active}
+        ON CONFLICT(office_key, tipo_acao) DO UPDATE SET total = total + excluded.total;
+
+        INSERT INTO office_stats_mes (office_key, mes, total)
+        SELECT {office}, SUBSTR({row}.data_fechamento, 1, 7), {sign}
+        WHERE {active} AND COALESCE({row}.data_fechamento, '') <> ''
+        ON CONFLICT(office_key, mes) DO UPDATE SET total = total + excluded.total;
+    """
+
+
+def _populate_stats(conn):
+    """Recalcula do zero os contadores agregados a partir das tabelas."""
+    conn.execute("DELETE FROM office_stats")
+    conn.execute("DELETE FROM office_stats_tipo")
+    conn.execute("DELETE FROM office_stats_mes")
+
+    conn.execute("""
+        INSERT INTO office_stats (office_key, ativos, excluidos)
+        SELECT COALESCE(escritorio_dono, ''), SUM(excluido=0), SUM(excluido<>0)
+        FROM registros GROUP BY 1
+    """)
+    conn.execute(f"""
+        INSERT INTO office_stats (office_key, ativos, excluidos)
+        SELECT {TRASH_OFFICE_KEY_SQL.format(row="excluidos")}, 0, COUNT(*)
+        FROM excluidos GROUP BY 1
+        ON CONFLICT(office_key) DO UPDATE SET excluidos = excluidos + excluded.excluidos
+    """)
+    conn.execute("""
+        INSERT INTO office_stats_tipo (office_key, tipo_acao, total)
+        SELECT COALESCE(escritorio_dono, ''), COALESCE(tipo_acao, ''), COUNT(*)
+        FROM registros WHERE excluido=0 GROUP BY 1, 2
+    """)
+    conn.execute("""
+        INSERT INTO office_stats_mes (office_key, mes, total)
+        SELECT COALESCE(escritorio_dono, ''), SUBSTR(data_fechamento, 1, 7), COUNT(*)
+        FROM registros
+        WHERE excluido=0 AND COALESCE(data_fechamento, '') <> ''
+        GROUP BY 1, 2
+    """)
+
+
+def _add_generations_changed_at(conn):
+    """Momento (epoch) da última mudança de cada contador — Last-Modified."""
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(generations)")}
+    if "changed_at" not in existing:
+        conn.execute("ALTER TABLE generations ADD COLUMN changed_at INTEGER")
+
+
+def _bump_sql(name_sql):
+    """Comando que incrementa o contador de versão `name_sql` (expressão SQL)."""
+    return f"""
+        INSERT INTO generations (name, value, changed_at)
+        VALUES ({name_sql}, 1, CAST(strftime('%s', 'now') AS INTEGER))
+        ON CONFLICT(name) DO UPDATE SET
+            value = value + 1,
+            changed_at = excluded.changed_at;
+    """
+
+
+def _version_triggers():
+    """
+    Triggers que mantêm as versões usadas nos ETags (versions.py):
+        registros, registros:<escritório>, excluidos, offices, users
+    """
+    office = "'registros:' || COALESCE({row}.escritorio_dono, '')"
+    triggers = [
+        ("trg_registros_ver_insert", "AFTER INSERT ON registros",
+         _bump_sql("'registros'") + _bump_sql(office.format(row="new"))),
+        ("trg_registros_ver_update", "AFTER UPDATE ON registros",
+         _bump_sql("'registros'") + _bump_sql(office.format(row="old"))
+         + _bump_sql(office.format(row="new"))),
+        ("trg_registros_ver_delete", "AFTER DELETE ON registros",
+         _bump_sql("'registros'") + _bump_sql(office.format(row="old"))),
+    ]
+
+    for table, name in (("excluidos", "excluidos"), ("offices", "offices"),
+                        ("users", "users"), ("user_offices", "users")):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            triggers.append((
+                f"trg_{table}_ver_{event.lower()}",
+                f"AFTER {event} ON {table}",
+                _bump_sql(f"'{name}'"),
+            ))
+
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {trigger} {when} BEGIN
+               {body}
+           END"""
+        for trigger, when, body in triggers
+    ]
+
+
+def _add_trash_columns(conn):
+    """Adiciona em excluidos as colunas de EXCLUIDOS_COLUMNS que faltarem."""
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(excluidos)")}
+
+    for name, decl in EXCLUIDOS_COLUMNS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE excluidos ADD COLUMN {name} {decl}")
+
+
+def _move_soft_deleted(conn):
+    """
+    Leva para excluidos as linhas com exclusão lógica (excluido=1) e as
+    remove de registros, no mesmo passo (uma transação): se cair no meio,
+    nada foi movido. Os triggers de FTS e contadores acompanham.
+    """
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(registros)")}
+    if "excluido" not in existing:
+        return
+
+    conn.execute("""
+        INSERT INTO excluidos (
+            registro_id, version, escritorio_nome,
+            nome, cpf, escritorio_origem, escritorio_origem_chave,
+            tipo_acao, data_fechamento, pendencias,
+            numero_processo, data_protocolo,
+            observacoes, captador, created_at, data_exclusao
+        )
+        SELECT
+            id, version, escritorio_nome,
+            nome, cpf, COALESCE(escritorio_nome, escritorio_dono), escritorio_dono,
+            tipo_acao, data_fechamento, pendencias,
+            numero_processo, data_protocolo,
+            observacoes, captador, created_at,
+            COALESCE(data_exclusao, datetime('now','localtime'))
+        FROM registros
+        WHERE excluido<>0
+        ORDER BY id
+    """)
+    conn.execute("DELETE FROM registros WHERE excluido<>0")
+
+
+def drop_soft_delete_columns(conn):
+    """
+    Remove excluido e data_exclusao de registros, sem uso desde a
+    migração 11. Não faz parte das migrações: DROP COLUMN reescreve a
+    tabela inteira e bloqueia os escritores até terminar — rodar em janela
+    de manutenção (flask db-drop-soft-delete-columns).
+
+    Returns:
+        list[str]: colunas removidas.
+    """
+    if get_version(conn) < 11:
+        raise RuntimeError("requer o esquema na versão 11 ou superior")
+
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(registros)")}
+    dropped = [name for name in ("excluido", "data_exclusao") if name in existing]
+
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for name in dropped:
+            conn.execute(f"ALTER TABLE registros DROP COLUMN {name}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return dropped
+
+
+def _migrate_users_offices(conn):
+    """
+    Copia para user_offices os vínculos gravados na antiga coluna
+    users.offices (chaves separadas por vírgula). A coluna fica no
+    banco, mas não é mais lida nem gravada.
+    """
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(users)")}
+    if "offices" not in existing:
+        return
+
+    pairs = []
+    for user_id, offices in conn.execute(
+        "SELECT id, offices FROM users WHERE COALESCE(offices, '') <> ''"
+    ):
+        for key in offices.split(","):
+            key = key.strip()
+            if key.startswith("office_"):
+                key = key[len("office_"):].upper()
+            if key:
+                pairs.append((user_id, key))
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO user_offices (user_id, office_key) VALUES (?, ?)",
+        pairs,
+    )
+
+
+# =============================================================================
+# LISTA DE MIGRAÇÕES
+#   (versão, descrição, [comandos SQL ou funções que recebem conn])
+# =============================================================================
+MIGRATIONS = [
+    (1, "colunas de registros", [
+        _add_missing_columns,
+    ]),
+    (2, "índices de registros, excluidos, offices e user_offices", [
+        # Listagem por escritório (records.table) e contagem aproximada.
+        # Parcial em vez de (excluido, escritorio_dono, id): a CENTRAL segue
+        # lendo na ordem do rowid e o planner não troca por um sort
+        """CREATE INDEX IF NOT EXISTS idx_registros_ativos_office
+           ON registros (escritorio_dono, id DESC) WHERE excluido=0""",
+
+        # Filtros da barra de table.html — só linhas ativas
+        """CREATE INDEX IF NOT EXISTS idx_registros_cpf
+           ON registros (cpf) WHERE excluido=0""",
+        """CREATE INDEX IF NOT EXISTS idx_registros_nome
+           ON registros (nome COLLATE NOCASE) WHERE excluido=0""",
+        """CREATE INDEX IF NOT EXISTS idx_registros_data_fechamento
+           ON registros (data_fechamento) WHERE excluido=0""",
+        """CREATE INDEX IF NOT EXISTS idx_registros_data_protocolo
+           ON registros (data_protocolo) WHERE excluido=0""",
+
+        # Tela de excluídos de records.py (exclusão lógica)
+        """CREATE INDEX IF NOT EXISTS idx_registros_data_exclusao
+           ON registros (data_exclusao DESC) WHERE excluido=1""",
+
+        # Lixeira física (deleted.py)
+        """CREATE INDEX IF NOT EXISTS idx_excluidos_origem
+           ON excluidos (escritorio_origem_chave, id DESC)""",
+        """CREATE INDEX IF NOT EXISTS idx_excluidos_data_exclusao
+           ON excluidos (data_exclusao)""",
+        """CREATE INDEX IF NOT EXISTS idx_excluidos_cpf
+           ON excluidos (cpf)""",
+
+        # Escritórios: ORDER BY display_name e busca pelo nome exibido
+        """CREATE INDEX IF NOT EXISTS idx_offices_display_name
+           ON offices (display_name)""",
+
+        # Vínculos usuário x escritório
+        """CREATE INDEX IF NOT EXISTS idx_user_offices_user
+           ON user_offices (user_id, office_key)""",
+        """CREATE INDEX IF NOT EXISTS idx_user_offices_office
+           ON user_offices (office_key)""",
+    ]),
+    (3, "contadores de geração (invalidação de caches entre workers)", [
+        """CREATE TABLE IF NOT EXISTS generations (
+               name TEXT PRIMARY KEY,
+               value INTEGER NOT NULL DEFAULT 0
+           )""",
+        "INSERT OR IGNORE INTO generations (name, value) VALUES ('offices', 0)",
+
+        # Qualquer escrita em offices (inclusive fora de utils.py) invalida
+        # o diretório de escritórios em todos os workers
+        """CREATE TRIGGER IF NOT EXISTS trg_offices_gen_insert
+           AFTER INSERT ON offices BEGIN
+               UPDATE generations SET value = value + 1 WHERE name = 'offices';
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_offices_gen_update
+           AFTER UPDATE ON offices BEGIN
+               UPDATE generations SET value = value + 1 WHERE name = 'offices';
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_offices_gen_delete
+           AFTER DELETE ON offices BEGIN
+               UPDATE generations SET value = value + 1 WHERE name = 'offices';
+           END""",
+    ]),
+    (4, "busca textual (FTS5) em registros", [
+        # Conteúdo externo: o índice guarda só os tokens, o texto fica em
+        # registros. remove_diacritics faz "João" e "Joao" casarem.
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS registros_fts USING fts5(
+               {FTS_COLUMNS},
+               content='registros', content_rowid='id',
+               tokenize='unicode61 remove_diacritics 2'
+           )""",
+
+        # Somente registros ativos ficam no índice: a exclusão lógica
+        # (excluido=1) remove, a restauração (excluido=0) devolve
+        f"""CREATE TRIGGER IF NOT EXISTS trg_registros_fts_insert
+           AFTER INSERT ON registros WHEN new.excluido=0 BEGIN
+               INSERT INTO registros_fts (rowid, {FTS_COLUMNS})
+               VALUES (new.id, new.nome, new.cpf, new.numero_processo,
+                       new.observacoes, new.pendencias);
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_registros_fts_delete
+           AFTER DELETE ON registros WHEN old.excluido=0 BEGIN
+               INSERT INTO registros_fts (registros_fts, rowid, {FTS_COLUMNS})
+               VALUES ('delete', old.id, old.nome, old.cpf, old.numero_processo,
+                       old.observacoes, old.pendencias);
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_registros_fts_update
+           AFTER UPDATE OF {FTS_COLUMNS}, excluido ON registros BEGIN
+               INSERT INTO registros_fts (registros_fts, rowid, {FTS_COLUMNS})
+               SELECT 'delete', old.id, old.nome, old.cpf, old.numero_processo,
+                      old.observacoes, old.pendencias
+               WHERE old.excluido=0;
+               INSERT INTO registros_fts (rowid, {FTS_COLUMNS})
+               SELECT new.id, new.nome, new.cpf, new.numero_processo,
+                      new.observacoes, new.pendencias
+               WHERE new.excluido=0;
+           END""",
+
+        _populate_fts,
+    ]),
+    (5, "contadores agregados por escritório (dashboard)", [
+        """CREATE TABLE IF NOT EXISTS office_stats (
+               office_key TEXT PRIMARY KEY,
+               ativos INTEGER NOT NULL DEFAULT 0,
+               excluidos INTEGER NOT NULL DEFAULT 0
+           )""",
+        """CREATE TABLE IF NOT EXISTS office_stats_tipo (
+               office_key TEXT NOT NULL,
+               tipo_acao TEXT NOT NULL,
+               total INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (office_key, tipo_acao)
+           )""",
+        """CREATE TABLE IF NOT EXISTS office_stats_mes (
+               office_key TEXT NOT NULL,
+               mes TEXT NOT NULL,
+               total INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (office_key, mes)
+           )""",
+
+        # registros: inserção soma, exclusão subtrai, alteração faz os dois
+        f"""CREATE TRIGGER IF NOT EXISTS trg_registros_stats_insert
+           AFTER INSERT ON registros BEGIN
+               {_stats_statements("new", 1)}
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_registros_stats_delete
+           AFTER DELETE ON registros BEGIN
+               {_stats_statements("old", -1)}
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_registros_stats_update
+           AFTER UPDATE OF escritorio_dono, excluido, tipo_acao, data_fechamento
+           ON registros BEGIN
+               {_stats_statements("old", -1)}
+               {_stats_statements("new", 1)}
+           END""",
+
+        # Lixeira física (mover para excluidos / restaurar / excluir de vez)
+        f"""CREATE TRIGGER IF NOT EXISTS trg_excluidos_stats_insert
+           AFTER INSERT ON excluidos BEGIN
+               INSERT INTO office_stats (office_key, ativos, excluidos)
+               VALUES ({TRASH_OFFICE_KEY_SQL.format(row="new")}, 0, 1)
+               ON CONFLICT(office_key) DO UPDATE SET excluidos = excluidos + 1;
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_excluidos_stats_delete
+           AFTER DELETE ON excluidos BEGIN
+               INSERT INTO office_stats (office_key, ativos, excluidos)
+               VALUES ({TRASH_OFFICE_KEY_SQL.format(row="old")}, 0, -1)
+               ON CONFLICT(office_key) DO UPDATE SET excluidos = excluidos - 1;
+           END""",
+
+        _populate_stats,
+    ]),
+    (6, "vínculos usuário x escritório somente em user_offices", [
+        # Vínculos de usuários já excluídos e duplicados
+        "DELETE FROM user_offices WHERE user_id NOT IN (SELECT id FROM users)",
+        """DELETE FROM user_offices WHERE rowid NOT IN (
+               SELECT MIN(rowid) FROM user_offices GROUP BY user_id, office_key
+           )""",
+        """CREATE UNIQUE INDEX IF NOT EXISTS ux_user_offices
+           ON user_offices (user_id, office_key)""",
+        "DROP INDEX IF EXISTS idx_user_offices_user",
+
+        _migrate_users_offices,
+    ]),
+    (7, "sessões no servidor (sessions.py)", [
+        """CREATE TABLE IF NOT EXISTS sessions (
+               id TEXT PRIMARY KEY,
+               user_id INTEGER,
+               data TEXT NOT NULL,
+               expires_at INTEGER NOT NULL
+           )""",
+        # Invalidação por usuário e limpeza das vencidas
+        """CREATE INDEX IF NOT EXISTS idx_sessions_user
+           ON sessions (user_id)""",
+        """CREATE INDEX IF NOT EXISTS idx_sessions_expires
+           ON sessions (expires_at)""",
+    ]),
+    (8, "marcador da fila de gravação assíncrona (writequeue.py)", [
+        # Último item aplicado de cada arquivo de fila; gravado na mesma
+        # transação dos registros, evita aplicar duas vezes após uma queda
+        """CREATE TABLE IF NOT EXISTS write_queue_applied (
+               queue_id TEXT PRIMARY KEY,
+               last_id INTEGER NOT NULL
+           )""",
+    ]),
+    (9, "versões por tabela e por escritório (ETag / Last-Modified)", [
+        _add_generations_changed_at,
+
+        # Os triggers de offices da migração 3 passam a ser os de _version_triggers
+        "DROP TRIGGER IF EXISTS trg_offices_gen_insert",
+        "DROP TRIGGER IF EXISTS trg_offices_gen_update",
+        "DROP TRIGGER IF EXISTS trg_offices_gen_delete",
+
+        *_version_triggers(),
+    ]),
+    (10, "versão por linha em registros (edição concorrente)", [
+        _add_missing_columns,
+    ]),
+    # Sem DROP COLUMN: excluido e data_exclusao ficam sem uso, e a remoção
+    # (que reescreve a tabela) é um comando de manutenção à parte
+    (11, "lixeira única por movimentação: registros só com linhas ativas", [
+        # A lixeira guarda id, versão e nome do escritório originais
+        _add_trash_columns,
+        _move_soft_deleted,
+
+        # Busca textual: toda linha de registros é ativa
+        "DROP TRIGGER IF EXISTS trg_registros_fts_insert",
+        "DROP TRIGGER IF EXISTS trg_registros_fts_delete",
+        "DROP TRIGGER IF EXISTS trg_registros_fts_update",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_registros_fts_insert
+           AFTER INSERT ON registros BEGIN
+               INSERT INTO registros_fts (rowid, {FTS_COLUMNS})
+               VALUES (new.id, new.nome, new.cpf, new.numero_processo,
+                       new.observacoes, new.pendencias);
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_registros_fts_delete
+           AFTER DELETE ON registros BEGIN
+               INSERT INTO registros_fts (registros_fts, rowid, {FTS_COLUMNS})
+               VALUES ('delete', old.id, old.nome, old.cpf, old.numero_processo,
+                       old.observacoes, old.pendencias);
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_registros_fts_update
+           AFTER UPDATE OF {FTS_COLUMNS} ON registros BEGIN
+               INSERT INTO registros_fts (registros_fts, rowid, {FTS_COLUMNS})
+               VALUES ('delete', old.id, old.nome, old.cpf, old.numero_processo,
+                       old.observacoes, old.pendencias);
+               INSERT INTO registros_fts (rowid, {FTS_COLUMNS})
+               VALUES (new.id, new.nome, new.cpf, new.numero_processo,
+                       new.observacoes, new.pendencias);
+           END""",
+        # Índice refeito a partir de registros, agora só com linhas ativas
+        "INSERT INTO registros_fts (registros_fts) VALUES ('rebuild')",
+
+        # Contadores: registros conta só ativos, excluidos só a lixeira
+        "DROP TRIGGER IF EXISTS trg_registros_stats_insert",
+        "DROP TRIGGER IF EXISTS trg_registros_stats_delete",
+        "DROP TRIGGER IF EXISTS trg_registros_stats_update",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_registros_stats_insert
+           AFTER INSERT ON registros BEGIN
+               {_stats_statements("new", 1, live_only=True)}
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_registros_stats_delete
+           AFTER DELETE ON registros BEGIN
+               {_stats_statements("old", -1, live_only=True)}
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_registros_stats_update
+           AFTER UPDATE OF escritorio_dono, tipo_acao, data_fechamento
+           ON registros BEGIN
+               {_stats_statements("old", -1, live_only=True)}
+               {_stats_statements("new", 1, live_only=True)}
+           END""",
+
+        # Índices parciais (WHERE excluido=0) viram índices comuns
+        "DROP INDEX IF EXISTS idx_registros_data_exclusao",
+        "DROP INDEX IF EXISTS idx_registros_ativos_office",
+        "DROP INDEX IF EXISTS idx_registros_cpf",
+        "DROP INDEX IF EXISTS idx_registros_nome",
+        "DROP INDEX IF EXISTS idx_registros_data_fechamento",
+        "DROP INDEX IF EXISTS idx_registros_data_protocolo",
+        """CREATE INDEX IF NOT EXISTS idx_registros_ativos_office
+           ON registros (escritorio_dono, id DESC)""",
+        """CREATE INDEX IF NOT EXISTS idx_registros_cpf
+           ON registros (cpf)""",
+        """CREATE INDEX IF NOT EXISTS idx_registros_nome
+           ON registros (nome COLLATE NOCASE)""",
+        """CREATE INDEX IF NOT EXISTS idx_registros_data_fechamento
+           ON registros (data_fechamento)""",
+        """CREATE INDEX IF NOT EXISTS idx_registros_data_protocolo
+           ON registros (data_protocolo)""",
+    ]),
+]
+
+
+def get_version(conn):
+    """Retorna a versão atual do esquema (PRAGMA user_version)."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn, log=None):
+    """
+    Aplica as migrações pendentes, em ordem.
+
+    Args:
+        conn: conexão sqlite3 aberta.
+        log (callable): opcional, recebe mensagens de progresso.
+
+    Returns:
+        int: versão final do esquema.
+    """
+    conn.commit()
+
+    for version, description, steps in MIGRATIONS:
+        if get_version(conn) >= version:
+            continue
+
+        if log:
+            log(f"Migração {version}: {description}")
+
+        for step in steps:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Outro worker pode ter terminado a migração enquanto esperávamos
+                if get_version(conn) >= version:
+                    conn.rollback()
+                    break
+
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        else:
+            conn.execute("BEGIN IMMEDIATE")
+            if get_version(conn) < version:
+                conn.execute(f"PRAGMA user_version={version:d}")
+            conn.commit()
+
+    return get_version(conn)
@@ -8,6 +8,7 @@ Funções incluídas:
  - Criar novo escritório
  - Editar escritório existente
  - Excluir escritório (restrito ao ADMIN)
+ - Dashboard com os contadores de cada escritório
 
 Observações:
  - A tabela 'offices' padroniza todos os escritórios usados no sistema
@@ -15,19 +16,27 @@ Observações:
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from .extensions import get_conn
-from .utils import normalize_office_key, list_offices, register_office
+from .extensions import get_conn, get_read_conn
+from .stats import get_dashboard
+from .user_store import permitted_offices
+from .versions import conditional
+from .utils import (
+    require_roles_hook, normalize_office_key, list_offices, register_office, invalidate_office_cache,
+    OFFICE_BY_KEY_SQL,
+)
 
 # -----------------------------------------------------------------------------
 # Blueprint dos ESCRITÓRIOS
 # -----------------------------------------------------------------------------
 offices_bp = Blueprint("offices", __name__, url_prefix="/offices")
+offices_bp.before_request(require_roles_hook())
 
 
 # =============================================================================
 # PÁGINA PRINCIPAL DE ESCRITÓRIOS
 # =============================================================================
 @offices_bp.route("/")
+@conditional(["offices"])
 def offices_page():
     """
     Exibe todos os escritórios cadastrados.
@@ -38,6 +47,30 @@ def offices_page():
     return render_template("offices.html", offices=offices)
 
 
+# =============================================================================
+# DASHBOARD (CONTADORES POR ESCRITÓRIO)
+# =============================================================================
+@offices_bp.route("/dashboard")
+def dashboard():
+    """
+    Resumo por escritório: ativos, excluídos, por tipo de ação e por mês
+    de fechamento. Lê apenas as tabelas de contadores (ver stats.py).
+    Usuário restrito vê só os seus escritórios (e os totais deles).
+
+    ?format=json devolve os mesmos dados em JSON.
+    """
+
+    months = request.args.get("meses", 12, type=int)
+    data = get_dashboard(
+        get_read_conn(), months=max(1, min(months, 60)), allowed=permitted_offices()
+    )
+
+    if request.args.get("format") == "json":
+        return data
+
+    return render_template("dashboard.html", **data)
+
+
 # =============================================================================
 # CRIAR NOVO ESCRITÓRIO
 # =============================================================================
@@ -75,7 +108,7 @@ def office_edit(office_key):
     conn = get_conn()
     c = conn.cursor()
 
-    c.execute("SELECT office_key, display_name FROM offices WHERE office_key=?", (office_key,))
+    c.execute(OFFICE_BY_KEY_SQL, (office_key,))
     row = c.fetchone()
 
     if not row:
@@ -105,6 +138,7 @@ def office_edit(office_key):
 
         conn.commit()
         conn.close()
+        invalidate_office_cache()
 
         flash("Escritório atualizado com sucesso!", "success")
         return redirect(url_for("offices.offices_page"))
@@ -138,6 +172,7 @@ def offices_delete():
     c.execute("DELETE FROM offices WHERE office_key=?", (office_key,))
     conn.commit()
     conn.close()
+    invalidate_office_cache()
 
     flash("Escritório removido com sucesso!", "success")
     return redirect(url_for("offices.offices_page"))
@@ -0,0 +1,143 @@
+"""
+passwords.py
+---------------------------
+Hash e verificação de senhas.
+
+Inclui:
+- Hash com custo configurável (PASSWORD_HASH_METHOD, formato do
+  werkzeug: "pbkdf2:sha256:<iterações>" ou "scrypt:<n>:<r>:<p>")
+- Verificação em tempo constante, inclusive para usuário inexistente
+  (compara contra um hash fictício do mesmo custo)
+- Atualização transparente no login: senhas legadas em texto puro ou
+  com parâmetros antigos são regravadas com o custo atual
+- Medição de vazão e latência do login por custo (flask bench-passwords)
+
+Nada é guardado em cache: cada login paga o custo completo do hash.
+"""
+
+import hmac
+import os
+import time
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+DEFAULT_METHOD = "pbkdf2:sha256:260000"
+
+# Prefixos dos hashes gerados pelo werkzeug ("método$salt$hash")
+HASH_PREFIXES = ("pbkdf2:", "scrypt:")
+
+_dummy_hashes = {}
+
+
+def _configured_method(method=None):
+    if method:
+        return method
+    return current_app.config.get("PASSWORD_HASH_METHOD", DEFAULT_METHOD)
+
+
+def is_hashed(stored):
+    """True se o valor gravado for um hash (e não uma senha em texto puro)."""
+    return bool(stored) and stored.count("$") == 2 and stored.startswith(HASH_PREFIXES)
+
+
+def hash_password(password, method=None):
+    """Gera o hash da senha com o custo configurado."""
+    return generate_password_hash(password, method=_configured_method(method))
+
+
+def needs_rehash(stored, method=None):
+    """True se o valor gravado não usar exatamente o método/custo atual."""
+    if not is_hashed(stored):
+        return True
+    return stored.split("$", 1)[0] != _configured_method(method)
+
+
+def verify_password(stored, password, method=None):
+    """
+    Confere a senha contra o valor gravado.
+
+    - Hash: check_password_hash (comparação em tempo constante)
+    - Texto puro (legado): hmac.compare_digest
+    - Usuário inexistente (stored=None): verifica contra um hash fictício
+      do custo atual, para o tempo de resposta não revelar o username
+
+    Returns:
+        bool
+    """
+    password = password or ""
+
+    if stored is None:
+        method = _configured_method(method)
+        if method not in _dummy_hashes:
+            _dummy_hashes[method] = generate_password_hash(os.urandom(16).hex(), method=method)
+        check_password_hash(_dummy_hashes[method], password)
+        return False
+
+    if is_hashed(stored):
+        return check_password_hash(stored, password)
+
+    return hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
+
+
+def check_login(conn, user_id, stored, password):
+    """
+    Verifica a senha do login e, se estiver correta mas gravada em texto
+    puro ou com custo antigo, regrava o hash atual (com commit).
+
+    Returns:
+        bool
+    """
+    if not verify_password(stored, password):
+        return False
+
+    if user_id is not None and needs_rehash(stored):
+        conn.execute(
+            "UPDATE users SET password=? WHERE id=? AND password=?",
+            (hash_password(password), user_id, stored),
+        )
+        conn.commit()
+
+    return True
+
+
+# =============================================================================
+# MEDIÇÃO DE CUSTO
+# =============================================================================
+def benchmark(methods, rounds=50, password="senha-de-teste"):
+    """
+    Mede, para cada método, a latência de uma verificação de login
+    (o que cada worker executa por tentativa) em um único núcleo.
+
+    Returns:
+        list[dict]: {"method", "rounds", "p50_ms", "p95_ms", "p99_ms",
+                     "max_ms", "logins_per_s"} — logins_per_s por worker
+    """
+    results = []
+
+    for method in methods:
+        stored = generate_password_hash(password, method=method)
+        timings = []
+
+        for _ in range(rounds):
+            start = time.perf_counter()
+            check_password_hash(stored, password)
+            timings.append(time.perf_counter() - start)
+
+        timings.sort()
+
+        def pct(p):
+            return timings[min(len(timings) - 1, int(p / 100 * len(timings)))] * 1000
+
+        results.append({
+            "method": method,
+            "rounds": rounds,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "max_ms": timings[-1] * 1000,
+            "logins_per_s": len(timings) / sum(timings),
+        })
+
+    return results
@@ -2,32 +2,151 @@
 pdfgen.py
 ---------
 Geração de PDFs usando reportlab.
+
+- generate_pdf: um registro (relatório individual)
+- render_registros_pdf: vários registros em um PDF paginado
+  (quebra de linha pela largura da página e quebra de página automática)
 """
 
-from flask import send_file
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
 from reportlab.pdfgen import canvas
 import io
 
 
-def generate_pdf(registro):
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 40
+LINE_HEIGHT = 14
+FONT = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+FONT_SIZE = 10
+
+# Rótulos exibidos no relatório (campo → texto)
+FIELD_LABELS = {
+    "nome": "Nome",
+    "cpf": "CPF",
+    "escritorio_nome": "Escritório",
+    "escritorio_dono": "Chave do escritório",
+    "tipo_acao": "Tipo da ação",
+    "data_fechamento": "Data de fechamento",
+    "pendencias": "Pendências",
+    "numero_processo": "Nº processo",
+    "data_protocolo": "Data de protocolo",
+    "observacoes": "Observações",
+    "captador": "Captador",
+}
+
+
+class _PagedCanvas:
     """
-    Recebe um dict com os dados do registro e devolve um arquivo PDF.
+    Canvas com cursor vertical: cuida do cabeçalho, do rodapé com o
+    número da página e da quebra de página quando o espaço acaba.
     """
 
-    buffer = io.BytesIO()
-    pdf = canvas.Canvas(buffer)
+    def __init__(self, fileobj, title):
+        self.pdf = canvas.Canvas(fileobj, pagesize=A4)
+        self.pdf.setTitle(title)
+        self.title = title
+        self.page = 0
+        self._start_page()
+
+    def _start_page(self):
+        self.page += 1
+        self.pdf.setFont(FONT_BOLD, 14)
+        self.pdf.drawString(MARGIN, PAGE_HEIGHT - MARGIN, self.title)
+        self.pdf.setFont(FONT, 8)
+        self.pdf.drawRightString(PAGE_WIDTH - MARGIN, MARGIN / 2, f"Página {self.page}")
+        self.y = PAGE_HEIGHT - MARGIN - 30
+
+    def ensure_space(self, height):
+        """Quebra a página se o bloco não couber no espaço restante."""
+        if self.y - height < MARGIN:
+            self.pdf.showPage()
+            self._start_page()
+
+    def line(self, text, font=FONT, size=FONT_SIZE):
+        self.ensure_space(LINE_HEIGHT)
+        self.pdf.setFont(font, size)
+        self.pdf.drawString(MARGIN, self.y, text)
+        self.y -= LINE_HEIGHT
+
+    def separator(self):
+        self.ensure_space(LINE_HEIGHT)
+        self.pdf.line(MARGIN, self.y + LINE_HEIGHT / 2, PAGE_WIDTH - MARGIN, self.y + LINE_HEIGHT / 2)
+        self.y -= LINE_HEIGHT / 2
+
+    def save(self):
+        self.pdf.save()
+
+
+def _registro_lines(registro):
+    """
+    Quebra os campos de um registro em linhas que cabem na largura útil.
+
+    Returns:
+        list[tuple[str, str]]: (fonte, texto) de cada linha.
+    """
+    width = PAGE_WIDTH - 2 * MARGIN
+    header = f"#{registro.get('id', '')} — {registro.get('nome') or ''}"
+    lines = [(FONT_BOLD, text) for text in simpleSplit(header, FONT_BOLD, FONT_SIZE + 1, width)]
+
+    for key, value in registro.items():
+        if key in ("id", "nome") or value in (None, ""):
+            continue
+
+        label = FIELD_LABELS.get(key, key)
+        for text in simpleSplit(f"{label}: {value}", FONT, FONT_SIZE, width):
+            lines.append((FONT, text))
 
-    pdf.setFont("Helvetica-Bold", 16)
-    pdf.drawString(30, 800, "Relatório — Registro")
+    return lines
 
-    pdf.setFont("Helvetica", 12)
 
-    y = 760
-    for k, v in registro.items():
-        pdf.drawString(30, y, f"{k}: {v}")
-        y -= 20
+def _draw_registro(paged, registro):
+    lines = _registro_lines(registro)
 
-    pdf.save()
+    # Mantém o cabeçalho do registro junto do primeiro campo
+    paged.ensure_space(LINE_HEIGHT * min(len(lines), 2))
+
+    for font, text in lines:
+        size = FONT_SIZE + 1 if font == FONT_BOLD else FONT_SIZE
+        paged.line(text, font, size)
+
+    paged.separator()
+
+
+def render_registros_pdf(registros, fileobj, title="Relatório — Registros"):
+    """
+    Desenha vários registros em um PDF paginado.
+
+    Args:
+        registros: iterável de dicts (ou sqlite3.Row) — consumido em fluxo.
+        fileobj: arquivo binário de destino.
+        title (str): título repetido em todas as páginas.
+
+    Returns:
+        int: quantidade de registros desenhados.
+    """
+    paged = _PagedCanvas(fileobj, title)
+    total = 0
+
+    for registro in registros:
+        _draw_registro(paged, dict(registro))
+        total += 1
+
+    if total == 0:
+        paged.line("Nenhum registro encontrado.")
+
+    paged.save()
+    return total
+
+
+def generate_pdf(registro):
+    """
+    Recebe um dict com os dados do registro e devolve um arquivo PDF.
+    """
+
+    buffer = io.BytesIO()
+    render_registros_pdf([registro], buffer, title="Relatório — Registro")
     buffer.seek(0)
 
     return buffer
@@ -0,0 +1,120 @@
+"""
+plans.py
+---------------------------
+Verificação dos planos de consulta (EXPLAIN QUERY PLAN) de cada rota.
+
+Inclui:
+- Lista das consultas verificadas, montadas pelos mesmos construtores
+  que as rotas usam (query.page_query / count_query, trash_list_query e
+  as constantes SQL dos módulos) — o SQL verificado é o SQL executado
+- Detecção de varredura completa e de ordenação em árvore temporária
+- Relatório usado pelo comando `flask db-check-plans`
+"""
+
+from .query import parse_filters, page_query, count_query
+from .trash import trash_list_query
+from .utils import OFFICES_SQL, OFFICE_BY_KEY_SQL
+from .user_store import USER_OFFICE_KEYS_SQL
+from .sessions import OPEN_SESSION_SQL, DROP_USER_SESSIONS_SQL
+
+
+# Padrão de TABLE_COUNT_CAP (contagem de records.table)
+COUNT_CAP = 10000
+
+
+def _table(office, args=None, allowed=None, **page):
+    """Página de records.table com os filtros de request.args."""
+    return page_query(parse_filters(office, args or {}, allowed), **page)
+
+
+# =============================================================================
+# CONSULTAS VERIFICADAS
+#   (nome, (SQL, parâmetros), custos permitidos)
+#
+# Custos detectados no EXPLAIN QUERY PLAN:
+#   "SCAN" → varredura completa da tabela, sem índice
+#   "SORT" → USE TEMP B-TREE (ordenação de todo o resultado)
+# Qualquer custo não listado como permitido é tratado como regressão.
+# =============================================================================
+def plan_checks(conn):
+    """
+    Consultas verificadas, com parâmetros de exemplo.
+    conn é necessário para as funções SQL da lixeira (trash_scope_sql).
+
+    Returns:
+        list[tuple[str, tuple[str, list], tuple[str, ...]]]
+    """
+    dates = {"data_de": "2024-01-01", "data_ate": "2024-12-31"}
+
+    return [
+        # Leitura na ordem do rowid com LIMIT: para cedo, a varredura é esperada
+        ("records.table CENTRAL", _table("CENTRAL"), ("SCAN",)),
+        ("records.table CENTRAL (próxima página)", _table("CENTRAL", after=1000), ()),
+        ("records.table escritório", _table("SP", after=1000), ()),
+        ("records.table escritório (página anterior)", _table("SP", before=1000), ()),
+
+        # Filtros seletivos: ordenar apenas as linhas encontradas é aceitável
+        ("records.table filtro nome",
+         _table("CENTRAL", {"filtro": "nome", "valor": "JOAO"}), ("SORT",)),
+        ("records.table filtro cpf",
+         _table("CENTRAL", {"filtro": "cpf", "valor": "12345678900"}), ("SORT",)),
+        ("records.table filtro cpf (prefixo)",
+         _table("CENTRAL", {"filtro": "cpf", "valor": "123"}), ("SORT",)),
+        ("records.table filtro data_fechamento",
+         _table("CENTRAL", dict(dates, data_tipo="data_fechamento")), ("SORT",)),
+        ("records.table filtro data_protocolo",
+         _table("CENTRAL", dict(dates, data_tipo="data_protocolo")), ("SORT",)),
+        # Usuário restrito a alguns escritórios: uma busca no índice por
+        # escritório, ordenando só as linhas encontradas
+        ("records.table CENTRAL (escritórios permitidos)",
+         _table("CENTRAL", allowed=("SP", "RJ")), ("SORT",)),
+        ("records.table contagem",
+         count_query(parse_filters("SP", {}), COUNT_CAP), ()),
+
+        ("deleted.excluidos", trash_list_query(conn, None), ("SCAN",)),
+        ("deleted.excluidos (próxima página)", trash_list_query(conn, None, after=1000), ()),
+        ("deleted.excluidos (página anterior)", trash_list_query(conn, None, before=1000), ()),
+
+        ("utils.list_offices", (OFFICES_SQL, []), ()),
+        ("offices.office_edit", (OFFICE_BY_KEY_SQL, ["CENTRAL"]), ()),
+        ("user_offices por usuário", (USER_OFFICE_KEYS_SQL, [1]), ()),
+        ("sessions.open_session", (OPEN_SESSION_SQL, ["abc", 0]), ()),
+        ("sessions.invalidate_user_sessions (drop)", (DROP_USER_SESSIONS_SQL, [1]), ()),
+    ]
+
+
+def _plan_costs(plan):
+    """Extrai os custos ("SCAN", "SORT") das linhas de um plano."""
+    costs = set()
+
+    for line in plan:
+        if line.startswith("SCAN ") and "USING" not in line and "subquery" not in line:
+            costs.add("SCAN")
+        if line.startswith("USE TEMP B-TREE"):
+            costs.add("SORT")
+
+    return costs
+
+
+def check_query_plans(conn):
+    """
+    Roda EXPLAIN QUERY PLAN para cada consulta de plan_checks.
+
+    Returns:
+        list[dict]: um item por consulta:
+            {"name", "plan": [linhas], "costs": set, "ok": bool}
+    """
+    report = []
+
+    for name, (sql, params), allowed in plan_checks(conn):
+        plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        costs = _plan_costs(plan)
+
+        report.append({
+            "name": name,
+            "plan": plan,
+            "costs": costs,
+            "ok": costs <= set(allowed),
+        })
+
+    return report
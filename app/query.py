@@ -0,0 +1,368 @@
+"""
+query.py
+---------------------------
+Motor de consulta da tabela de registros.
+
+Inclui:
+- Leitura e validação dos parâmetros de filtro (nome, cpf, id e datas)
+- Montagem da cláusula WHERE parametrizada
+- Paginação por keyset (seek) sobre o id, sem OFFSET (SQL montado em
+  page_query / count_query, que a verificação de planos também usa)
+- Contagem total aproximada (limitada) para a paginação
+- Leitura em fluxo (fetchmany) para exportações
+- Busca textual ranqueada (FTS5) em nome, cpf, processo, observações e pendências
+"""
+
+import re
+
+from .utils import normalize_cpf
+from .user_store import office_scope_sql
+
+
+# Colunas exibidas em table.html (ordem livre: o template acessa por nome)
+TABLE_COLUMNS = (
+    "id, nome, cpf, escritorio_dono, escritorio_nome, tipo_acao, "
+    "data_fechamento, numero_processo, data_protocolo"
+)
+
+# Colunas da exportação CSV (mesma ordem das colunas da planilha de importação)
+EXPORT_COLUMNS = (
+    "id", "nome", "cpf", "escritorio_dono", "escritorio_nome", "tipo_acao",
+    "data_fechamento", "pendencias", "numero_processo", "data_protocolo",
+    "observacoes", "captador", "created_at",
+)
+
+# Únicas colunas de data aceitas no filtro (evita SQL injection via nome de coluna)
+DATE_COLUMNS = ("data_fechamento", "data_protocolo")
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+def parse_filters(office, args, allowed=None):
+    """
+    Lê os parâmetros da barra de filtros de table.html (request.args).
+    Valores desconhecidos são descartados silenciosamente.
+
+    Args:
+        allowed: escritórios permitidos ao usuário (None = todos),
+                 ver user_store.permitted_offices.
+
+    Returns:
+        dict: office, filtro, valor, data_tipo, data_de, data_ate
+              (sempre strings, nunca None) e allowed
+    """
+    filtro = args.get("filtro", "").strip()
+    if filtro not in ("nome", "cpf", "id"):
+        filtro = ""
+
+    data_tipo = args.get("data_tipo", "").strip()
+    if data_tipo not in DATE_COLUMNS:
+        data_tipo = ""
+
+    return {
+        "office": office or "CENTRAL",
+        "filtro": filtro,
+        "valor": args.get("valor", "").strip(),
+        "data_tipo": data_tipo,
+        "data_de": args.get("data_de", "").strip(),
+        "data_ate": args.get("data_ate", "").strip(),
+        "allowed": None if allowed is None else tuple(allowed),
+    }
+
+
+def filter_args(filters):
+    """
+    Devolve apenas os filtros preenchidos, para repassar ao url_for.
+    """
+    keys = ("filtro", "valor", "data_tipo", "data_de", "data_ate")
+    return {k: filters[k] for k in keys if filters[k]}
+
+
+def build_where(filters):
+    """
+    Monta a cláusula WHERE e os parâmetros para os filtros informados.
+
+    Regras:
+        - CENTRAL enxerga todos os escritórios permitidos
+        - nome: busca por prefixo (sem curinga inicial)
+        - cpf: igualdade com 11 dígitos, prefixo caso contrário
+        - id: igualdade exata (valor inválido não retorna nada)
+        - datas: intervalo fechado na coluna escolhida (formato ISO)
+
+    registros só guarda linhas ativas (a lixeira é a tabela excluidos).
+
+    Returns:
+        tuple[str, list]: ("escritorio_dono=? AND ...", [params]) ou ("1", [])
+    """
+    clauses = []
+    params = []
+
+    allowed = filters.get("allowed")
+
+    if filters["office"] != "CENTRAL":
+        clauses.append("escritorio_dono=?")
+        params.append(filters["office"])
+        if allowed is not None and filters["office"] not in allowed:
+            clauses.append("0")
+    elif allowed is not None:
+        scope, scope_params = office_scope_sql("escritorio_dono", allowed)
+        clauses.append(scope)
+        params.extend(scope_params)
+
+    if filters["filtro"] and filters["valor"]:
+        if filters["filtro"] == "nome":
+            clauses.append("nome LIKE ? ESCAPE '\\'")
+            params.append(_escape_like(filters["valor"]) + "%")
+
+        elif filters["filtro"] == "cpf":
+            digits = normalize_cpf(filters["valor"])
+            if len(digits) == 11:
+                clauses.append("cpf=?")
+                params.append(digits)
+            else:
+                # Faixa [digits, digits + ":") — ":" vem logo após "9" em ASCII,
+                # o que equivale a um prefixo mas usa o índice de cpf
+                clauses.append("cpf >= ? AND cpf < ?")
+                params.extend([digits, digits + ":"])
+
+        elif filters["filtro"] == "id":
+            try:
+                params.append(int(filters["valor"]))
+                clauses.append("id=?")
+            except ValueError:
+                clauses.append("0")
+
+    col = filters["data_tipo"]
+    if col:
+        if filters["data_de"]:
+            clauses.append(f"{col} >= ?")
+            params.append(filters["data_de"])
+        if filters["data_ate"]:
+            clauses.append(f"{col} <= ?")
+            params.append(filters["data_ate"])
+
+    return " AND ".join(clauses) or "1", params
+
+
+def page_query(filters, per_page=DEFAULT_PER_PAGE, after=None, before=None,
+               columns=TABLE_COLUMNS):
+    """
+    SQL e parâmetros de uma página de fetch_page (per_page + 1 linhas).
+    Também usado pela verificação de planos (plans.py).
+
+    Returns:
+        tuple[str, list]
+    """
+    where, params = build_where(filters)
+
+    if before is not None:
+        sql = f"""
+            SELECT {columns} FROM registros
+            WHERE {where} AND id > ?
+            ORDER BY id ASC
+            LIMIT ?
+        """
+        return sql, params + [before, per_page + 1]
+
+    seek = ""
+    seek_params = []
+    if after is not None:
+        seek = "AND id < ?"
+        seek_params = [after]
+
+    sql = f"""
+        SELECT {columns} FROM registros
+        WHERE {where} {seek}
+        ORDER BY id DESC
+        LIMIT ?
+    """
+    return sql, params + seek_params + [per_page + 1]
+
+
+def fetch_page(conn, filters, per_page=DEFAULT_PER_PAGE, after=None, before=None,
+               columns=TABLE_COLUMNS):
+    """
+    Busca uma página de registros usando paginação por keyset sobre o id.
+
+    A listagem é sempre ORDER BY id DESC:
+        - after=<id>  → próxima página (ids menores que o último exibido)
+        - before=<id> → página anterior (ids maiores que o primeiro exibido)
+
+    Lê per_page + 1 linhas para saber se existe uma página seguinte
+    sem precisar contar a tabela inteira.
+
+    columns: colunas do SELECT (a API usa a projeção pedida em fields=);
+             devem incluir o id.
+
+    Returns:
+        dict: {"rows", "has_next", "has_prev", "first_id", "last_id"}
+    """
+    sql, params = page_query(filters, per_page, after=after, before=before, columns=columns)
+    return keyset_page(conn.execute(sql, params).fetchall(), per_page, after, before)
+
+
+def keyset_page(rows, per_page, after=None, before=None):
+    """
+    Monta o resultado de fetch_page a partir das per_page + 1 linhas
+    lidas (ASC quando before, DESC nos demais casos). Também usado pela
+    listagem da lixeira (trash.fetch_trash_page).
+
+    Returns:
+        dict: {"rows", "has_next", "has_prev", "first_id", "last_id"}
+    """
+    if before is not None:
+        more = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        has_prev, has_next = more, True
+    else:
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = after is not None
+
+    return {
+        "rows": rows,
+        "has_next": has_next and bool(rows),
+        "has_prev": has_prev and bool(rows),
+        "first_id": rows[0]["id"] if rows else None,
+        "last_id": rows[-1]["id"] if rows else None,
+    }
+
+
+def count_query(filters, cap):
+    """SQL e parâmetros da contagem limitada de approx_count (até cap + 1)."""
+    where, params = build_where(filters)
+
+    sql = f"""
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM registros WHERE {where} LIMIT ?
+        )
+    """
+    return sql, params + [cap + 1]
+
+
+def approx_count(conn, filters, cap):
+    """
+    Conta os registros do filtro, parando em `cap` linhas.
+
+    Evita percorrer a tabela inteira apenas para desenhar a paginação:
+    acima do limite a interface mostra "cap+".
+
+    Returns:
+        tuple[int, bool]: (total, atingiu_limite)
+    """
+    sql, params = count_query(filters, cap)
+    total = conn.execute(sql, params).fetchone()[0]
+
+    if total > cap:
+        return cap, True
+    return total, False
+
+
+def iter_filtered(conn, filters, columns=EXPORT_COLUMNS, batch_size=1000):
+    """
+    Percorre todos os registros do filtro em blocos (cursor.fetchmany),
+    sem materializar o resultado inteiro em memória.
+
+    Yields:
+        sqlite3.Row: uma linha por vez, ORDER BY id DESC.
+    """
+    where, params = build_where(filters)
+
+    cur = conn.execute(f"""
+        SELECT {", ".join(columns)} FROM registros
+        WHERE {where}
+        ORDER BY id DESC
+    """, params)
+
+    try:
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cur.close()
+
+
+def build_match_query(text):
+    """
+    Converte o texto digitado em uma expressão MATCH do FTS5.
+
+    - Cada palavra vira um prefixo entre aspas ("joao"*), então a
+      pontuação do usuário nunca é interpretada como operador
+    - CPF/processo com máscara (529.982.247-25) vira só dígitos
+
+    Returns:
+        str: expressão MATCH, ou "" se não houver termos.
+    """
+    terms = []
+
+    for word in text.split():
+        if re.fullmatch(r"[\d.\-/]+", word):
+            word = re.sub(r"\D", "", word)
+        word = word.replace('"', "")
+        if word:
+            terms.append(f'"{word}"*')
+
+    return " ".join(terms)
+
+
+def search_registros(conn, text, office="CENTRAL", limit=50, allowed=None):
+    """
+    Busca textual nos registros ativos, ordenada por relevância (bm25).
+    Acentos são ignorados ("Joao" encontra "João").
+    allowed restringe aos escritórios permitidos (None = todos).
+
+    Returns:
+        list[sqlite3.Row]: colunas de TABLE_COLUMNS + "score".
+    """
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    office_clause = ""
+    params = [match]
+    if office and office != "CENTRAL":
+        office_clause = "AND r.escritorio_dono = ?"
+        params.append(office)
+
+    if allowed is not None:
+        scope, scope_params = office_scope_sql("r.escritorio_dono", allowed)
+        office_clause += f" AND {scope}"
+        params.extend(scope_params)
+    params.append(limit)
+
+    columns = ", ".join(f"r.{c.strip()}" for c in TABLE_COLUMNS.split(","))
+
+    return conn.execute(f"""
+        SELECT {columns}, bm25(registros_fts) AS score
+        FROM registros_fts
+        JOIN registros r ON r.id = registros_fts.rowid
+        WHERE registros_fts MATCH ?
+          {office_clause}
+        ORDER BY score
+        LIMIT ?
+    """, params).fetchall()
+
+
+def parse_int_arg(args, name, default=None, minimum=None, maximum=None):
+    """
+    Lê um inteiro de request.args com limites opcionais.
+    Valores inválidos retornam o default.
+    """
+    try:
+        value = int(args.get(name, ""))
+    except ValueError:
+        return default
+
+    if minimum is not None:
+        value = max(minimum, value)
+    if maximum is not None:
+        value = min(maximum, value)
+    return value
+
+
+def _escape_like(value: str) -> str:
+    """Escapa os curingas do LIKE (%, _ e a própria barra)."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
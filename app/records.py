@@ -4,11 +4,38 @@ records.py
 Todas as operações de cadastro e manipulação dos registros.
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from .extensions import get_conn
-from .utils import normalize_cpf
+import csv
+import io
+from datetime import date
+
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, flash, session,
+    current_app, Response, stream_with_context, send_file, abort
+)
+from .extensions import get_conn, get_read_conn
+from .utils import normalize_cpf, list_offices, require_roles_hook
+from .importer import iter_file_rows, import_rows, resolve_submission, registro_params, INSERT_SQL
+from .db_helpers import write_transaction
+from .reports import submit_report, report_status, report_owner
+from .user_store import permitted_offices, require_office, office_allowed, current_user
+from .writequeue import enqueue_registro
+from .edits import update_registros
+from .trash import move_to_trash, restore_ids, purge_ids
+from .versions import conditional, registros_version, current_versions
+from .fragments import cached_fragment
+from .query import (
+    parse_filters, filter_args, fetch_page, approx_count, parse_int_arg,
+    iter_filtered, search_registros, DEFAULT_PER_PAGE, MAX_PER_PAGE, EXPORT_COLUMNS
+)
 
 records_bp = Blueprint("records", __name__)
+records_bp.before_request(require_roles_hook())
+
+# Quantas linhas rejeitadas a tela de importação lista
+IMPORT_REJECTED_SHOWN = 100
+
+# Linhas acumuladas antes de enviar cada pedaço da exportação CSV
+EXPORT_CHUNK_ROWS = 500
 
 
 # =============================================================================
@@ -16,7 +43,9 @@ records_bp = Blueprint("records", __name__)
 # =============================================================================
 @records_bp.route("/")
 def index():
-    return render_template("index.html")
+    allowed = permitted_offices()
+    offices = [o for o in list_offices() if office_allowed(o["key"], allowed)]
+    return render_template("index.html", offices=offices)
 
 
 # =============================================================================
@@ -24,55 +53,292 @@ def index():
 # =============================================================================
 @records_bp.route("/submit", methods=["POST"])
 def submit():
+    """
+    Cadastro avulso. Validação e escritório seguem as regras da importação
+    (importer.resolve_submission) nos dois caminhos — gravação direta ou
+    fila (WRITE_BEHIND) —, então a linha gravada é a mesma.
+    """
 
-    nome = request.form.get("nome")
-    cpf = normalize_cpf(request.form.get("cpf"))
-    escritorio_dono = request.form.get("escritorio_dono")
-    tipo_acao = request.form.get("tipo_acao")
-    data_fechamento = request.form.get("data_fechamento")
+    row = dict(request.form.to_dict(), escritorio=request.form.get("escritorio_dono", ""))
+    data, reason = resolve_submission(row)
 
-    conn = get_conn()
-    c = conn.cursor()
+    if reason:
+        flash(f"Cadastro não aceito: {reason}.", "error")
+        return redirect(url_for("records.index"))
 
-    c.execute("""
-        INSERT INTO registros (nome, cpf, escritorio_dono, tipo_acao, data_fechamento)
-        VALUES (?, ?, ?, ?, ?)
-    """, (nome, cpf, escritorio_dono, tipo_acao, data_fechamento))
+    if not office_allowed(data["escritorio_dono"], permitted_offices()):
+        abort(403)
 
-    conn.commit()
-    conn.close()
+    # Write-behind: grava na fila e confirma sem esperar o banco
+    if current_app.config.get("WRITE_BEHIND"):
+        enqueue_registro(current_app, data)
+        flash("Registro recebido!", "success")
+        return redirect(url_for("records.index"))
+
+    conn = get_conn()
+    with write_transaction(conn):
+        conn.execute(
+            "INSERT OR IGNORE INTO offices (office_key, display_name) VALUES (?, ?)",
+            (data["escritorio_dono"], data["escritorio_nome"]),
+        )
+        conn.execute(INSERT_SQL, registro_params(data))
+
+    flash("Registro salvo!", "success")
+    return redirect(url_for("records.index"))
 
-    return render_template("submit.html")
+
+# =============================================================================
+# IMPORTAÇÃO EM MASSA (CSV / XLSX)
+# =============================================================================
+@records_bp.route("/import", methods=["GET", "POST"])
+def import_file():
+    """
+    Upload de planilha para importação em massa.
+    A planilha é lida linha a linha e gravada em lotes (ver importer.py);
+    as primeiras linhas rejeitadas são exibidas com o motivo.
+    """
+
+    if request.method == "GET":
+        return render_template("import.html")
+
+    upload = request.files.get("arquivo")
+    if not upload or not upload.filename:
+        flash("Selecione um arquivo CSV ou XLSX.", "error")
+        return redirect(url_for("records.import_file"))
+
+    rejected = []
+
+    def on_reject(line_no, reason, row):
+        if len(rejected) < IMPORT_REJECTED_SHOWN:
+            rejected.append({"linha": line_no, "motivo": reason, "nome": row.get("nome", "")})
+
+    try:
+        stats = import_rows(
+            get_conn(),
+            iter_file_rows(upload.stream, upload.filename),
+            on_reject=on_reject,
+            allowed=permitted_offices(),
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        flash(f"Erro ao ler a planilha: {e}", "error")
+        return redirect(url_for("records.import_file"))
+
+    flash(f"{stats['inserted']} registro(s) importado(s).", "success")
+    return render_template("import.html", stats=stats, rejected=rejected)
 
 
 # =============================================================================
 # TABELA DE REGISTROS
 # =============================================================================
 @records_bp.route("/table/<office>")
+@conditional(lambda office: [registros_version(office), "offices"])
 def table(office):
+    """
+    Lista os registros ativos de um escritório (CENTRAL = todos).
+
+    - Filtros aplicados no banco (nome, cpf, id e intervalo de datas)
+    - Paginação por keyset: ?after=<id> avança, ?before=<id> volta
+    - Total aproximado, limitado por TABLE_COUNT_CAP
+    - Somente os escritórios permitidos ao usuário (cache da sessão)
+    - ETag pela versão dos registros do escritório: sem mudança, 304
+    - Linhas renderizadas em cache (fragments.py) pela mesma versão
+    """
+
+    allowed = permitted_offices()
+    require_office(office, allowed)
+
+    filters = parse_filters(office, request.args, allowed)
+    per_page = parse_int_arg(
+        request.args, "per_page", DEFAULT_PER_PAGE, minimum=1, maximum=MAX_PER_PAGE
+    )
+    page = parse_int_arg(request.args, "page", 1, minimum=1)
+    after = parse_int_arg(request.args, "after")
+    before = parse_int_arg(request.args, "before")
+
+    cap = current_app.config.get("TABLE_COUNT_CAP", 10000)
+
+    def load():
+        conn = get_read_conn()
+        result = fetch_page(conn, filters, per_page, after=after, before=before)
+
+        # Contagem opcional — desligue com TABLE_COUNT_CAP = 0
+        total, total_capped = None, False
+        total_pages = page
+        if cap:
+            total, total_capped = approx_count(conn, filters, cap)
+            total_pages = max(page, -(-total // per_page))
+
+        meta = {
+            "total": total,
+            "total_capped": total_capped,
+            "total_pages": total_pages,
+            "has_next": result["has_next"],
+            "has_prev": result["has_prev"],
+            "first_id": result["first_id"],
+            "last_id": result["last_id"],
+        }
+        return {"rows": result["rows"], "office": office}, meta
+
+    # A versão é a mesma lida pelo ETag (conditional): escrita nova, chave nova
+    counter = registros_version(office)
+    version = current_versions([counter])[counter][0]
+    key = (
+        "table", office, tuple(sorted(filters.items())),
+        per_page, page, after, before, cap, version,
+    )
+    tbody, meta = cached_fragment(key, "table_rows.html", load)
+
+    return render_template(
+        "table.html",
+        tbody=tbody,
+        office=office,
+        page=page,
+        per_page=per_page,
+        **meta,
+        filter_args=filter_args(filters),
+        **{k: v for k, v in filters.items() if k not in ("office", "allowed")}
+    )
 
-    conn = get_conn()
-    c = conn.cursor()
 
-    if office == "CENTRAL":
-        c.execute("""
-            SELECT id, nome, cpf, escritorio_dono, tipo_acao, data_fechamento
-            FROM registros
-            WHERE excluido=0
-            ORDER BY id DESC
-        """)
-    else:
-        c.execute("""
-            SELECT id, nome, cpf, escritorio_dono, tipo_acao, data_fechamento
-            FROM registros
-            WHERE excluido=0 AND escritorio_dono=?
-            ORDER BY id DESC
-        """, (office,))
-
-    rows = c.fetchall()
-    conn.close()
+# =============================================================================
+# BUSCA TEXTUAL
+# =============================================================================
+@records_bp.route("/search")
+def search():
+    """
+    Busca ranqueada por nome, CPF, nº do processo, observações e pendências.
+
+    Parâmetros: q (texto), office (padrão CENTRAL = todos), limit (até 200).
+    """
+
+    text = request.args.get("q", "").strip()
+    office = request.args.get("office", "CENTRAL")
+    limit = parse_int_arg(request.args, "limit", 50, minimum=1, maximum=MAX_PER_PAGE)
+
+    allowed = permitted_offices()
+    require_office(office, allowed)
+
+    rows = search_registros(get_read_conn(), text, office, limit, allowed)
+
+    return {
+        "q": text,
+        "office": office,
+        "results": [dict(r) for r in rows],
+    }
+
+
+# =============================================================================
+# EXPORTAÇÃO CSV (EM FLUXO)
+# =============================================================================
+@records_bp.route("/export/<office>")
+def export_csv(office):
+    """
+    Exporta em CSV os registros do escritório com os mesmos filtros da tabela.
+
+    O arquivo é gerado em blocos (fetchmany + resposta em streaming),
+    então o consumo de memória não depende do tamanho do resultado.
+    """
+
+    allowed = permitted_offices()
+    require_office(office, allowed)
+
+    filters = parse_filters(office, request.args, allowed)
+    conn = get_read_conn()
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=";")
+
+        # BOM para o Excel reconhecer UTF-8
+        buffer.write("\ufeff")
+        writer.writerow(EXPORT_COLUMNS)
+
+        for i, row in enumerate(iter_filtered(conn, filters), start=1):
+            writer.writerow(tuple(row))
+
+            if i % EXPORT_CHUNK_ROWS == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+
+        yield buffer.getvalue()
+
+    filename = f"registros_{office}_{date.today().isoformat()}.csv"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+# =============================================================================
+# RELATÓRIO PDF EM LOTE
+# =============================================================================
+@records_bp.route("/reports/<office>", methods=["POST"])
+def report_create(office):
+    """
+    Agenda um relatório PDF com os registros do escritório (mesmos filtros
+    da tabela, enviados na query string ou no formulário).
+    A geração roda no pool de processos; a resposta traz o id do job.
+    """
+
+    allowed = permitted_offices()
+    require_office(office, allowed)
 
-    return render_template("table.html", rows=rows, office=office)
+    filters = parse_filters(office, request.values, allowed)
+    owner = {"user_id": current_user()["id"], "office": office}
+    job_id = submit_report(current_app, filters, f"Relatório — {office}", owner=owner)
+
+    return {
+        "job_id": job_id,
+        "status_url": url_for("records.report_job", job_id=job_id),
+        "download_url": url_for("records.report_download", job_id=job_id),
+    }, 202
+
+
+def _require_report_owner(job_id):
+    """
+    404 para job de outro usuário (o id não revela se existe) e 403 se o
+    dono perdeu o acesso ao escritório depois de agendar.
+    """
+    owner = report_owner(current_app, job_id)
+    user = current_user()
+
+    if owner is None or user is None or owner.get("user_id") != user["id"]:
+        abort(404)
+
+    require_office(owner.get("office"), permitted_offices())
+
+
+@records_bp.route("/reports/job/<job_id>")
+def report_job(job_id):
+    """Estado do job: pending, done, error ou unknown."""
+
+    _require_report_owner(job_id)
+    state, info = report_status(current_app, job_id)
+
+    payload = {"job_id": job_id, "status": state}
+    if state == "error":
+        payload["error"] = info
+    if state == "done":
+        payload["download_url"] = url_for("records.report_download", job_id=job_id)
+
+    return payload, 404 if state == "unknown" else 200
+
+
+@records_bp.route("/reports/job/<job_id>/download")
+def report_download(job_id):
+    """Entrega o PDF quando o job estiver concluído."""
+
+    _require_report_owner(job_id)
+    state, info = report_status(current_app, job_id)
+
+    if state != "done":
+        return {"job_id": job_id, "status": state}, 404 if state == "unknown" else 409
+
+    return send_file(info, mimetype="application/pdf", as_attachment=True,
+                     download_name=f"relatorio_{job_id}.pdf")
 
 
 # =============================================================================
@@ -85,13 +351,15 @@ def edit(reg_id):
     c = conn.cursor()
 
     c.execute("""
-        SELECT id, nome, cpf, escritorio_dono, tipo_acao, data_fechamento
+        SELECT id, nome, cpf, escritorio_dono, tipo_acao, data_fechamento, version
         FROM registros WHERE id=?
     """, (reg_id,))
 
     row = c.fetchone()
 
-    if not row:
+    # Registro de escritório não permitido é tratado como inexistente
+    allowed = permitted_offices()
+    if not row or not office_allowed(row[3], allowed):
         conn.close()
         flash("Registro não encontrado.", "error")
         return redirect(url_for("records.index"))
@@ -102,24 +370,31 @@ def edit(reg_id):
         "cpf": row[2],
         "escritorio_dono": row[3],
         "tipo_acao": row[4],
-        "data_fechamento": row[5]
+        "data_fechamento": row[5],
+        "version": row[6]
     }
 
     if request.method == "POST":
 
-        nome = request.form.get("nome")
-        cpf = normalize_cpf(request.form.get("cpf"))
-        tipo_acao = request.form.get("tipo_acao")
-        data_fechamento = request.form.get("data_fechamento")
+        values = {
+            "nome": request.form.get("nome"),
+            "cpf": normalize_cpf(request.form.get("cpf")),
+            "tipo_acao": request.form.get("tipo_acao"),
+            "data_fechamento": request.form.get("data_fechamento"),
+        }
 
-        c.execute("""
-            UPDATE registros SET
-                nome=?, cpf=?, tipo_acao=?, data_fechamento=?
-            WHERE id=?
-        """, (nome, cpf, tipo_acao, data_fechamento, reg_id))
+        # Versão lida quando o formulário foi aberto: só grava se ninguém
+        # alterou o registro nesse meio tempo
+        version = parse_int_arg(request.form, "version")
+        result = update_registros(conn, [(reg_id, values, version)], allowed)
 
-        conn.commit()
-        conn.close()
+        if result["conflicts"]:
+            flash("Este registro foi alterado por outro usuário. Confira os dados atuais e salve novamente.", "error")
+            return redirect(url_for("records.edit", reg_id=reg_id))
+
+        if result["missing"]:
+            flash("Registro não encontrado.", "error")
+            return redirect(url_for("records.index"))
 
         flash("Registro atualizado!", "success")
         return redirect(url_for("records.table", office="CENTRAL"))
@@ -129,27 +404,37 @@ def edit(reg_id):
 
 
 # =============================================================================
-# EXCLUSÃO LÓGICA
+# EXCLUSÃO (MOVER PARA A LIXEIRA)
 # =============================================================================
 @records_bp.route("/delete", methods=["POST"])
 def delete():
+    """
+    Move o registro para a tabela excluidos (INSERT ... SELECT + DELETE
+    na mesma transação, ver trash.move_to_trash).
+    """
 
     reg_id = request.form.get("id")
 
-    conn = get_conn()
-    c = conn.cursor()
+    if move_to_trash(get_conn(), [reg_id], permitted_offices()):
+        flash("Registro movido para excluídos.", "success")
 
-    c.execute("""
-        UPDATE registros
-        SET excluido=1, data_exclusao=datetime('now','localtime')
-        WHERE id=?
-    """, (reg_id,))
+    return redirect(url_for("records.index"))
 
-    conn.commit()
-    conn.close()
 
-    flash("Registro movido para excluídos.", "success")
-    return redirect(url_for("records.index"))
+@records_bp.route("/delete_selected", methods=["POST"])
+def delete_selected():
+    """
+    Move os registros selecionados na tabela para a lixeira em uma
+    única transação.
+    """
+
+    ids = request.form.getlist("ids")
+    office = request.form.get("office") or "CENTRAL"
+
+    total = move_to_trash(get_conn(), ids, permitted_offices())
+
+    flash(f"{total} registro(s) movido(s) para excluídos.", "success")
+    return redirect(url_for("records.table", office=office))
 
 
 # =============================================================================
@@ -157,22 +442,8 @@ def delete():
 # =============================================================================
 @records_bp.route("/excluidos")
 def excluidos():
-
-    conn = get_conn()
-    c = conn.cursor()
-
-    c.execute("""
-        SELECT id, nome, cpf, escritorio_dono, tipo_acao,
-               data_fechamento, data_exclusao
-        FROM registros
-        WHERE excluido=1
-        ORDER BY data_exclusao DESC
-    """)
-
-    rows = c.fetchall()
-    conn.close()
-
-    return render_template("excluidos.html", rows=rows)
+    """A lixeira é a tabela excluidos (deleted.py)."""
+    return redirect(url_for("deleted.excluidos"))
 
 
 # =============================================================================
@@ -183,15 +454,19 @@ def restore():
 
     reg_id = request.form.get("id")
 
-    conn = get_conn()
-    c = conn.cursor()
+    if restore_ids(get_conn(), [reg_id], permitted_offices()):
+        flash("Registro restaurado!", "success")
 
-    c.execute("UPDATE registros SET excluido=0 WHERE id=?", (reg_id,))
-    conn.commit()
-    conn.close()
+    return redirect(url_for("deleted.excluidos"))
+
+
+@records_bp.route("/restore_selected", methods=["POST"])
+def restore_selected():
 
-    flash("Registro restaurado!", "success")
-    return redirect(url_for("records.excluidos"))
+    total = restore_ids(get_conn(), request.form.getlist("ids"), permitted_offices())
+
+    flash(f"{total} registro(s) restaurado(s) com sucesso.", "success")
+    return redirect(url_for("deleted.excluidos"))
 
 
 # =============================================================================
@@ -202,13 +477,8 @@ def delete_forever():
 
     reg_id = request.form.get("id")
 
-    conn = get_conn()
-    c = conn.cursor()
-
-    c.execute("DELETE FROM registros WHERE id=?", (reg_id,))
-    conn.commit()
-    conn.close()
+    purge_ids(get_conn(), [reg_id], permitted_offices())
 
     flash("Registro removido definitivamente.", "success")
 
-    return redirect(url_for("records.excluidos"))
+    return redirect(url_for("deleted.excluidos"))
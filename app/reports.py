@@ -0,0 +1,211 @@
+"""
+reports.py
+---------------------------
+Relatórios PDF em lote, executados fora dos workers do gunicorn.
+
+Inclui:
+- Pool de processos (ProcessPoolExecutor) para o layout do reportlab,
+  que é CPU-bound e bloquearia o worker da requisição. Os filhos saem de
+  um forkserver, não de um fork do worker: o worker já tem threads
+  (fila de gravação, limpeza da lixeira) que podem estar segurando locks
+- Jobs identificados por id; o estado fica em arquivos no REPORTS_DIR,
+  então qualquer worker consegue responder status e download:
+      <job>.job  → em andamento: guarda o horário de agendamento, trocado
+                   pelo de início quando o filho começa; passado
+                   REPORT_JOB_TIMEOUT_S, o job é dado como falho (filho
+                   morto no meio não deixa .pdf nem .err)
+      <job>.pdf  → pronto
+      <job>.err  → falhou (mensagem do erro)
+      <job>.owner → dono do job (usuário e escritório, JSON); status e
+                    download só respondem a quem agendou
+"""
+
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from .pdfgen import render_registros_pdf
+from .query import iter_filtered
+
+
+REPORT_COLUMNS = (
+    "id", "nome", "cpf", "escritorio_nome", "escritorio_dono", "tipo_acao",
+    "data_fechamento", "pendencias", "numero_processo", "data_protocolo",
+    "observacoes", "captador",
+)
+
+JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+DEFAULT_JOB_TIMEOUT_S = 30 * 60
+
+_executor = None
+_executor_pid = None
+
+
+def _get_executor(max_workers):
+    """
+    Pool de processos deste worker (recriado após fork, como o pool de conexões).
+    """
+    global _executor, _executor_pid
+
+    if _executor is None or _executor_pid != os.getpid():
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context(method)
+        )
+        _executor_pid = os.getpid()
+
+    return _executor
+
+
+def _run_report_job(db_path, filters, out_path, title):
+    """
+    Executado no processo filho: lê os registros com uma conexão própria
+    somente leitura e grava o PDF de forma atômica (arquivo .tmp + rename).
+    """
+    base = out_path[:-4]
+    tmp_path = out_path + ".tmp"
+    _mark_job(base + ".job")
+
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            with open(tmp_path, "wb") as fileobj:
+                total = render_registros_pdf(
+                    iter_filtered(conn, filters, REPORT_COLUMNS), fileobj, title
+                )
+        finally:
+            conn.close()
+
+        os.replace(tmp_path, out_path)
+        return total
+
+    except Exception as e:
+        with open(base + ".err", "w", encoding="utf-8") as f:
+            f.write(str(e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    finally:
+        if os.path.exists(base + ".job"):
+            os.remove(base + ".job")
+
+
+def _mark_job(path):
+    """Grava o horário atual (epoch) no marcador <job>.job."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(str(time.time()))
+
+
+def _cleanup(reports_dir, max_age):
+    """Remove relatórios (e erros) mais antigos que max_age segundos."""
+    limit = time.time() - max_age
+
+    for name in os.listdir(reports_dir):
+        path = os.path.join(reports_dir, name)
+        try:
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def submit_report(app, filters, title, owner=None):
+    """
+    Agenda a geração de um relatório.
+
+    Args:
+        owner (dict): quem agendou, gravado em <job>.owner
+                      (ver report_owner).
+
+    Returns:
+        str: id do job.
+    """
+    reports_dir = os.path.abspath(app.config.get("REPORTS_DIR", "reports"))
+    os.makedirs(reports_dir, exist_ok=True)
+    _cleanup(reports_dir, app.config.get("REPORT_MAX_AGE_S", 24 * 3600))
+
+    job_id = uuid.uuid4().hex
+    out_path = os.path.join(reports_dir, f"{job_id}.pdf")
+    with open(os.path.join(reports_dir, f"{job_id}.owner"), "w", encoding="utf-8") as f:
+        json.dump(owner or {}, f)
+    _mark_job(os.path.join(reports_dir, f"{job_id}.job"))
+
+    executor = _get_executor(app.config.get("REPORT_WORKERS", 2))
+    executor.submit(
+        _run_report_job,
+        os.path.abspath(app.config.get("DB_READ_PATH") or app.config["DB_PATH"]),
+        dict(filters),
+        out_path,
+        title,
+    )
+
+    return job_id
+
+
+def report_status(app, job_id):
+    """
+    Estado de um job: "done", "error", "pending" ou "unknown"
+    (id inválido, inexistente ou já removido pela limpeza).
+
+    Returns:
+        tuple[str, str | None]: (estado, caminho do PDF ou mensagem de erro)
+    """
+    if not JOB_ID_RE.match(job_id or ""):
+        return "unknown", None
+
+    reports_dir = os.path.abspath(app.config.get("REPORTS_DIR", "reports"))
+    pdf_path = os.path.join(reports_dir, f"{job_id}.pdf")
+    err_path = os.path.join(reports_dir, f"{job_id}.err")
+
+    if os.path.exists(pdf_path):
+        return "done", pdf_path
+
+    if os.path.exists(err_path):
+        with open(err_path, encoding="utf-8") as f:
+            return "error", f.read()
+
+    job_path = os.path.join(reports_dir, f"{job_id}.job")
+    try:
+        with open(job_path, encoding="utf-8") as f:
+            marked = float(f.read())
+    except FileNotFoundError:
+        return "unknown", None
+    except (OSError, ValueError):
+        # Marcador vazio (versão anterior): vale o horário do arquivo
+        try:
+            marked = os.path.getmtime(job_path)
+        except OSError:
+            return "unknown", None
+
+    # Filho morto no meio (OOM, kill) não remove o .job
+    timeout = app.config.get("REPORT_JOB_TIMEOUT_S", DEFAULT_JOB_TIMEOUT_S)
+    if time.time() - marked > timeout:
+        return "error", f"relatório não concluído em {timeout:.0f} s"
+
+    return "pending", None
+
+
+def report_owner(app, job_id):
+    """
+    Dono gravado por submit_report.
+
+    Returns:
+        dict | None: None para id inválido ou job sem dono registrado.
+    """
+    if not JOB_ID_RE.match(job_id or ""):
+        return None
+
+    reports_dir = os.path.abspath(app.config.get("REPORTS_DIR", "reports"))
+    try:
+        with open(os.path.join(reports_dir, f"{job_id}.owner"), encoding="utf-8") as f:
+            return json.load(f) or None
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,186 @@
+"""
+retention.py
+---------------------------
+Retenção da lixeira: excluídos há mais de TRASH_RETENTION_DAYS dias
+são removidos de vez.
+
+Inclui:
+- Remoção em lotes pequenos (TRASH_PURGE_BATCH_SIZE), cada um em uma
+  transação curta, com uma pausa entre lotes: cadastros e edições não
+  ficam esperando o lock de escrita
+- PRAGMA incremental_vacuum ao final, também em passos limitados,
+  devolvendo ao sistema as páginas liberadas (exige auto_vacuum=
+  INCREMENTAL, ativado uma vez com `flask trash-purge --enable-incremental-vacuum`)
+- Relatório de linhas removidas e páginas recuperadas
+- Execução periódica em segundo plano (TRASH_PURGE_INTERVAL_S); com
+  vários workers, só um executa por intervalo
+"""
+
+import threading
+import time
+
+from .db_helpers import write_transaction
+from .extensions import get_conn
+
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_INTERVAL_S = 3600
+
+# Pausa entre lotes e páginas liberadas por passo do incremental_vacuum
+BATCH_PAUSE_S = 0.05
+VACUUM_STEP_PAGES = 1000
+
+# Ordem por data_exclusao: usa idx_excluidos_data_exclusao
+PURGE_SQL = """
+    DELETE FROM excluidos WHERE id IN (
+        SELECT id FROM excluidos
+        WHERE data_exclusao < datetime('now', 'localtime', ?)
+        ORDER BY data_exclusao
+        LIMIT ?
+    )
+"""
+
+_purger = None
+_purger_lock = threading.Lock()
+
+
+def _page_stats(conn):
+    return {
+        "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+        "freelist_count": conn.execute("PRAGMA freelist_count").fetchone()[0],
+        "page_size": conn.execute("PRAGMA page_size").fetchone()[0],
+    }
+
+
+def incremental_vacuum(conn, step=VACUUM_STEP_PAGES):
+    """
+    Devolve as páginas livres ao sistema em passos de `step` páginas.
+    Sem auto_vacuum=INCREMENTAL (2) não faz nada.
+
+    Returns:
+        int: páginas recuperadas.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+
+    conn.commit()
+    before = conn.execute("PRAGMA page_count").fetchone()[0]
+
+    while conn.execute("PRAGMA freelist_count").fetchone()[0]:
+        conn.execute(f"PRAGMA incremental_vacuum({int(step)})").fetchall()
+        time.sleep(BATCH_PAUSE_S)
+
+    return before - conn.execute("PRAGMA page_count").fetchone()[0]
+
+
+def enable_incremental_vacuum(conn):
+    """
+    Ativa auto_vacuum=INCREMENTAL. Num banco já existente só vale após
+    um VACUUM completo (reescreve o arquivo; rodar fora do horário).
+    """
+    conn.commit()
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+def purge_expired_trash(conn, days, batch_size=DEFAULT_BATCH_SIZE, vacuum=True):
+    """
+    Remove da lixeira o que foi excluído há mais de `days` dias.
+
+    Returns:
+        dict: {"purged", "batches", "pages_reclaimed", "bytes_reclaimed",
+               "freelist_pages"} — freelist_pages são as páginas livres
+               que continuam no arquivo (sem incremental_vacuum).
+    """
+    modifier = f"-{int(days)} days"
+    purged = batches = 0
+
+    while True:
+        with write_transaction(conn):
+            removed = conn.execute(PURGE_SQL, (modifier, batch_size)).rowcount
+
+        purged += removed
+        batches += 1
+        if removed < batch_size:
+            break
+        time.sleep(BATCH_PAUSE_S)
+
+    pages = incremental_vacuum(conn) if vacuum and purged else 0
+    stats = _page_stats(conn)
+
+    return {
+        "purged": purged,
+        "batches": batches,
+        "pages_reclaimed": pages,
+        "bytes_reclaimed": pages * stats["page_size"],
+        "freelist_pages": stats["freelist_count"],
+    }
+
+
+# =============================================================================
+# EXECUÇÃO PERIÓDICA
+# =============================================================================
+def _claim_run(conn, interval):
+    """
+    True se este processo deve rodar a limpeza agora. A marca fica em
+    generations ('trash_purge', fora das versões lidas pelos ETags): o
+    primeiro worker a atualizá-la no intervalo executa, os demais não.
+    """
+    with write_transaction(conn):
+        cur = conn.execute("""
+            INSERT INTO generations (name, value, changed_at)
+            VALUES ('trash_purge', 1, CAST(strftime('%s', 'now') AS INTEGER))
+            ON CONFLICT(name) DO UPDATE SET
+                value = value + 1,
+                changed_at = excluded.changed_at
+            WHERE generations.changed_at IS NULL
+               OR generations.changed_at <= excluded.changed_at - ?
+        """, (int(interval),))
+    return cur.rowcount == 1
+
+
+class TrashPurger(threading.Thread):
+    """Roda purge_expired_trash a cada TRASH_PURGE_INTERVAL_S segundos."""
+
+    def __init__(self, app):
+        super().__init__(name="trash-purge", daemon=True)
+        self.app = app
+        self.days = app.config["TRASH_RETENTION_DAYS"]
+        self.interval = app.config.get("TRASH_PURGE_INTERVAL_S", DEFAULT_INTERVAL_S)
+        self.batch_size = app.config.get("TRASH_PURGE_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+
+    def run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    conn = get_conn()
+                    if _claim_run(conn, self.interval):
+                        report = purge_expired_trash(conn, self.days, self.batch_size)
+                        if report["purged"]:
+                            self.app.logger.info(
+                                "Lixeira: %(purged)d removido(s), %(pages_reclaimed)d "
+                                "página(s) recuperada(s)", report
+                            )
+            except Exception:
+                self.app.logger.exception("Falha na limpeza da lixeira")
+
+            time.sleep(self.interval)
+
+
+def init_retention(app):
+    """
+    Ativa a limpeza periódica se TRASH_RETENTION_DAYS > 0. Cada worker
+    inicia a thread na primeira requisição (depois do fork do gunicorn).
+    """
+    if not app.config.get("TRASH_RETENTION_DAYS"):
+        return
+
+    @app.before_request
+    def _start_purger():
+        global _purger
+
+        if _purger is None or not _purger.is_alive():
+            with _purger_lock:
+                if _purger is None or not _purger.is_alive():
+                    _purger = TrashPurger(app)
+                    _purger.start()
@@ -11,18 +11,19 @@ Responsável por:
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from app.models import Users
 from app.extensions import get_conn
 from app.utils import login_required
+from app.user_store import login_user
+from app.passwords import check_login
 
 
-auth = Blueprint("auth", __name__)
+auth_bp = Blueprint("auth", __name__)
 
 
 # ============================================================
 #  LOGIN — Tela de Login (GET) e Validação (POST)
 # ============================================================
-@auth.route("/login", methods=["GET", "POST"])
+@auth_bp.route("/login", methods=["GET", "POST"])
 def login():
     """
     Exibe o formulário de login.
@@ -38,29 +39,34 @@ def login():
     username = request.form.get("username")
     password = request.form.get("password")
 
-    with get_conn() as conn:
-        user = Users.get_by_username(conn, username)
+    conn = get_conn()
+    user = conn.execute(
+        "SELECT id, password, active FROM users WHERE username=?", (username,)
+    ).fetchone()
 
-        if not user or user.password != password:
-            flash("Credenciais inválidas", "error")
-            return redirect(url_for("auth.login"))
+    # Usuário inexistente também paga o custo do hash (tempo constante);
+    # senha em texto puro ou custo antigo é regravada aqui
+    if not check_login(conn, user["id"] if user else None,
+                       user["password"] if user else None, password):
+        flash("Credenciais inválidas", "error")
+        return redirect(url_for("auth.login"))
 
-        if user.active != 1:
-            flash("Usuário inativo", "error")
-            return redirect(url_for("auth.login"))
+    if user["active"] != 1:
+        flash("Usuário inativo", "error")
+        return redirect(url_for("auth.login"))
 
-    # Criar sessão
-    session["user_id"] = user.id
+    # Criar sessão (no servidor, com o snapshot do usuário)
+    login_user(conn, user["id"])
 
     flash("Login realizado com sucesso!", "success")
-    return redirect(url_for("registros.index"))
+    return redirect(url_for("records.index"))
     
 
 
 # ============================================================
 # LOGOUT — Remove sessão e volta ao login
 # ============================================================
-@auth.route("/logout")
+@auth_bp.route("/logout")
 @login_required
 def logout():
     """Remove sessão e retorna ao login."""
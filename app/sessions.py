@@ -0,0 +1,201 @@
+"""
+sessions.py
+---------------------------
+Sessões guardadas no servidor (tabela sessions do SQLite).
+
+Inclui:
+- SessionInterface do Flask: o cookie leva apenas um id aleatório,
+  os dados ficam na tabela sessions (criada na migração 7)
+- Gravação só quando a sessão muda; a validade é renovada no máximo
+  uma vez a cada metade do tempo de vida
+- Invalidação das sessões de um usuário por um contador de geração
+  ('user:<id>' em generations), visível para todos os workers: snapshot
+  de geração antiga é descartado ao abrir a sessão, mesmo que uma
+  requisição concorrente o tenha gravado de volta
+
+O snapshot do usuário logado (user_store.current_user) fica dentro da
+própria sessão: a mesma leitura que carrega a sessão já traz papel,
+status e escritórios, sem consultar a tabela users a cada requisição.
+"""
+
+import secrets
+import time
+
+from flask import session as current_session, has_request_context
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from .extensions import get_conn
+
+
+_serializer = TaggedJSONSerializer()
+
+# Geração atual do usuário lida junto com a sessão (busca pela chave de generations)
+OPEN_SESSION_SQL = """
+    SELECT s.data, s.expires_at, COALESCE(g.value, 0) AS user_gen
+    FROM sessions s
+    LEFT JOIN generations g ON g.name = 'user:' || s.user_id
+    WHERE s.id=? AND s.expires_at > ?
+"""
+DROP_USER_SESSIONS_SQL = "DELETE FROM sessions WHERE user_id=?"
+BUMP_USER_GEN_SQL = """
+    INSERT INTO generations (name, value, changed_at)
+    VALUES ('user:' || ?, 1, CAST(strftime('%s', 'now') AS INTEGER))
+    ON CONFLICT(name) DO UPDATE SET
+        value = value + 1,
+        changed_at = excluded.changed_at
+"""
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Sessão cujo conteúdo é gravado na tabela sessions."""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid or secrets.token_urlsafe(32)
+        self.expires_at = expires_at
+        self.new = sid is None
+        self.old_sid = None
+        self.modified = False
+        self.accessed = False
+
+    def regenerate(self):
+        """
+        Troca o id da sessão (chamado no login, contra fixação de sessão).
+        O registro antigo é removido ao salvar.
+        """
+        if not self.new:
+            self.old_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+        self.modified = True
+
+
+class SqliteSessionInterface(SessionInterface):
+    """
+    Sessões no SQLite. Lê uma linha por requisição que envia o cookie;
+    requisições sem cookie não tocam no banco.
+    """
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid:
+            return ServerSideSession()
+
+        row = get_conn().execute(OPEN_SESSION_SQL, (sid, int(time.time()))).fetchone()
+
+        if row is None:
+            return ServerSideSession()
+
+        # Snapshot de geração anterior: current_user recarrega do banco
+        data = _serializer.loads(row["data"])
+        snapshot = data.get("user")
+        if snapshot and snapshot.get("gen", 0) != row["user_gen"]:
+            del data["user"]
+
+        return ServerSideSession(data, sid, row["expires_at"])
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        conn = get_conn()
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if session.old_sid:
+            conn.execute("DELETE FROM sessions WHERE id=?", (session.old_sid,))
+            conn.commit()
+
+        # Sessão esvaziada (logout): remove o registro e o cookie
+        if not session:
+            if session.modified:
+                if not session.new:
+                    conn.execute("DELETE FROM sessions WHERE id=?", (session.sid,))
+                    conn.commit()
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = int(time.time())
+        lifetime = int(app.permanent_session_lifetime.total_seconds())
+        refresh = session.expires_at is not None and session.expires_at - now < lifetime // 2
+
+        if session.modified:
+            params = (session.get("user_id"), _serializer.dumps(dict(session)),
+                      now + lifetime, session.sid)
+            # Sessão existente só é atualizada: se foi encerrada no meio da
+            # requisição (invalidate_user_sessions com drop), não volta
+            if session.new:
+                conn.execute(
+                    "INSERT INTO sessions (user_id, data, expires_at, id) VALUES (?, ?, ?, ?)",
+                    params,
+                )
+            else:
+                conn.execute(
+                    "UPDATE sessions SET user_id=?, data=?, expires_at=? WHERE id=?", params
+                )
+            conn.commit()
+        elif refresh:
+            conn.execute(
+                "UPDATE sessions SET expires_at=? WHERE id=?", (now + lifetime, session.sid)
+            )
+            conn.commit()
+        else:
+            return
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        response.vary.add("Cookie")
+
+
+# =============================================================================
+# INVALIDAÇÃO E LIMPEZA
+# =============================================================================
+def invalidate_user_sessions(conn, user_id, drop=False):
+    """
+    Faz as sessões de um usuário recarregarem o snapshot na próxima
+    requisição (drop=True encerra as sessões). Não faz commit.
+
+    Incrementa a geração do usuário: o snapshot guarda a geração lida
+    com ele (load_user_snapshot), e open_session descarta o de geração
+    anterior. Uma requisição que já estava em andamento e grava a sessão
+    com o snapshot antigo depois desta chamada não o ressuscita.
+
+    Usado quando o admin altera papel, status ou escritórios do usuário.
+    """
+    conn.execute(BUMP_USER_GEN_SQL, (user_id,))
+    if drop:
+        conn.execute(DROP_USER_SESSIONS_SQL, (user_id,))
+
+    # A sessão da requisição atual seria regravada com o snapshot antigo
+    if has_request_context() and current_session.get("user_id") == user_id:
+        if drop:
+            current_session.clear()
+        else:
+            current_session.pop("user", None)
+
+
+def purge_expired_sessions(conn):
+    """Remove as sessões vencidas. Não faz commit."""
+    return conn.execute(
+        "DELETE FROM sessions WHERE expires_at <= ?", (int(time.time()),)
+    ).rowcount
+
+
+def init_sessions(app):
+    """Troca as sessões em cookie pelas sessões no SQLite."""
+    app.session_interface = SqliteSessionInterface()
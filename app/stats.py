@@ -0,0 +1,83 @@
+"""
+stats.py
+---------------------------
+Leitura dos contadores agregados por escritório (dashboard).
+
+Os contadores (office_stats, office_stats_tipo, office_stats_mes) são
+mantidos por triggers em registros e excluidos — ver migração 5 em
+migrations.py. Aqui só lemos essas tabelas: o custo é proporcional ao
+número de escritórios, nunca ao número de registros.
+"""
+
+from .utils import get_office_directory
+from .user_store import office_allowed, office_scope_sql
+
+
+def get_dashboard(conn, months=12, allowed=None):
+    """
+    Monta o resumo por escritório.
+
+    Args:
+        conn: conexão sqlite3.
+        months (int): quantos meses mais recentes de data_fechamento incluir.
+        allowed: escritórios permitidos (None = todos); os totais somam
+                 só esses escritórios.
+
+    Returns:
+        dict: {
+            "offices": [
+                {"key", "display", "ativos", "excluidos",
+                 "por_tipo": {tipo: total}, "por_mes": {"AAAA-MM": total}}
+            ],
+            "totais": {"ativos", "excluidos"}
+        }
+    """
+    directory = get_office_directory()["by_key"]
+    offices = {}
+
+    def office(key):
+        if key not in offices:
+            display = directory[key]["display"] if key in directory else (key or "(sem escritório)")
+            offices[key] = {
+                "key": key, "display": display, "ativos": 0, "excluidos": 0,
+                "por_tipo": {}, "por_mes": {},
+            }
+        return offices[key]
+
+    scope, scope_params = office_scope_sql("office_key", allowed)
+
+    for key in directory:
+        if office_allowed(key, allowed):
+            office(key)
+
+    for r in conn.execute(
+        f"SELECT office_key, ativos, excluidos FROM office_stats WHERE {scope}", scope_params
+    ):
+        o = office(r["office_key"])
+        o["ativos"] = r["ativos"]
+        o["excluidos"] = r["excluidos"]
+
+    for r in conn.execute(f"""
+        SELECT office_key, tipo_acao, total FROM office_stats_tipo
+        WHERE total > 0 AND {scope}
+        ORDER BY total DESC
+    """, scope_params):
+        office(r["office_key"])["por_tipo"][r["tipo_acao"] or "(não informado)"] = r["total"]
+
+    for r in conn.execute(f"""
+        SELECT office_key, mes, total FROM office_stats_mes
+        WHERE total > 0 AND {scope}
+          AND mes >= strftime('%Y-%m', 'now', 'start of month', ?)
+        ORDER BY mes DESC
+    """, scope_params + [f"-{int(months) - 1} months"]):
+        office(r["office_key"])["por_mes"][r["mes"]] = r["total"]
+
+    result = sorted(offices.values(), key=lambda o: o["display"])
+
+    return {
+        "offices": result,
+        "totais": {
+            "ativos": sum(o["ativos"] for o in result),
+            "excluidos": sum(o["excluidos"] for o in result),
+        },
+    }
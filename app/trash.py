@@ -0,0 +1,268 @@
+"""
+trash.py
+---------------------------
+Operações em lote sobre a lixeira (tabela excluidos).
+
+Inclui:
+- Exclusão (mover para a lixeira): INSERT ... SELECT de registros para
+  excluidos + DELETE, na mesma transação — registros guarda só linhas ativas
+- Restauração em lote (INSERT ... SELECT de excluidos para registros),
+  com o id e a versão que o registro tinha antes da exclusão
+- Exclusão permanente em lote (DELETE ... WHERE id IN (...))
+- Registro dos escritórios de origem em um único upsert multi-linha
+- Listagem paginada por keyset (deleted.excluidos), como records.table
+
+Tudo roda em uma única transação, em blocos de ids, sem ida e volta
+ao Python por registro.
+"""
+
+from .db_helpers import write_transaction, parse_ids, chunked
+from .utils import normalize_office_key, invalidate_office_cache
+from .user_store import office_scope_sql
+from .query import keyset_page, DEFAULT_PER_PAGE
+
+
+# Colunas exibidas em excluidos_rows.html (o template acessa por nome)
+TRASH_LIST_COLUMNS = "id, nome, cpf, escritorio_origem, tipo_acao, data_exclusao"
+
+
+# Chave do escritório de origem, calculada no próprio SQL:
+#   "office_SP" → "SP"; chave sem prefixo é usada como está;
+#   sem chave → normaliza o nome exibido (mesma regra de utils.py)
+OFFICE_KEY_SQL = """
+    CASE
+        WHEN escritorio_origem_chave LIKE 'office\\_%' ESCAPE '\\'
+            THEN UPPER(SUBSTR(escritorio_origem_chave, 8))
+        WHEN COALESCE(escritorio_origem_chave, '') != ''
+            THEN escritorio_origem_chave
+        ELSE normalize_office_key(escritorio_origem)
+    END
+"""
+
+
+def _register_functions(conn):
+    """Disponibiliza normalize_office_key() dentro do SQL."""
+    conn.create_function(
+        "normalize_office_key", 1, normalize_office_key, deterministic=True
+    )
+
+
+def trash_scope_sql(conn, allowed):
+    """
+    Condição que restringe excluidos aos escritórios de origem permitidos.
+
+    Returns:
+        tuple[str, list]: (condição, parâmetros) — ver office_scope_sql.
+    """
+    _register_functions(conn)
+    return office_scope_sql(OFFICE_KEY_SQL, allowed)
+
+
+def trash_list_query(conn, allowed, per_page=DEFAULT_PER_PAGE, after=None, before=None):
+    """
+    SQL e parâmetros de uma página da lixeira (deleted.excluidos), mais
+    recentes primeiro, com per_page + 1 linhas (ver query.page_query).
+
+    Returns:
+        tuple[str, list]
+    """
+    scope, params = trash_scope_sql(conn, allowed)
+
+    if before is not None:
+        return f"""
+            SELECT {TRASH_LIST_COLUMNS} FROM excluidos
+            WHERE {scope} AND id > ?
+            ORDER BY id ASC
+            LIMIT ?
+        """, params + [before, per_page + 1]
+
+    seek = ""
+    if after is not None:
+        seek = "AND id < ?"
+        params = params + [after]
+
+    return f"""
+        SELECT {TRASH_LIST_COLUMNS} FROM excluidos
+        WHERE {scope} {seek}
+        ORDER BY id DESC
+        LIMIT ?
+    """, params + [per_page + 1]
+
+
+def fetch_trash_page(conn, allowed, per_page=DEFAULT_PER_PAGE, after=None, before=None):
+    """
+    Uma página da lixeira por keyset sobre o id (after → próxima,
+    before → anterior), no formato de query.fetch_page.
+
+    Returns:
+        dict: {"rows", "has_next", "has_prev", "first_id", "last_id"}
+    """
+    sql, params = trash_list_query(conn, allowed, per_page, after=after, before=before)
+    return keyset_page(conn.execute(sql, params).fetchall(), per_page, after, before)
+
+
+def _scoped_ids(conn, ids, allowed):
+    """Mantém apenas os ids cujo escritório de origem é permitido."""
+    scope, scope_params = trash_scope_sql(conn, allowed)
+    kept = []
+
+    for chunk in chunked(ids):
+        marks = ",".join("?" * len(chunk))
+        kept.extend(r[0] for r in conn.execute(
+            f"SELECT id FROM excluidos WHERE id IN ({marks}) AND {scope}",
+            chunk + scope_params,
+        ))
+
+    return kept
+
+
+def move_to_trash(conn, ids, allowed=None):
+    """
+    Move registros ativos para a lixeira (tabela excluidos).
+
+    Por bloco de ids, na mesma transação:
+        1. INSERT ... SELECT de registros para excluidos
+        2. DELETE dos mesmos ids (mesmo WHERE: move exatamente o que copiou)
+
+    Args:
+        conn: conexão sqlite3.
+        ids: ids (strings ou inteiros) da tabela registros.
+        allowed: escritórios permitidos (None = todos); os demais ids
+                 são ignorados.
+
+    Returns:
+        int: quantidade de registros movidos.
+    """
+    ids = parse_ids(ids)
+    if not ids:
+        return 0
+
+    scope, scope_params = office_scope_sql("escritorio_dono", allowed)
+    moved = 0
+
+    with write_transaction(conn):
+        for chunk in chunked(ids):
+            marks = ",".join("?" * len(chunk))
+            where = f"id IN ({marks}) AND {scope}"
+
+            cur = conn.execute(f"""
+                INSERT INTO excluidos (
+                    registro_id, version, escritorio_nome,
+                    nome, cpf, escritorio_origem, escritorio_origem_chave,
+                    tipo_acao, data_fechamento, pendencias,
+                    numero_processo, data_protocolo,
+                    observacoes, captador, created_at, data_exclusao
+                )
+                SELECT
+                    id, version, escritorio_nome,
+                    nome, cpf, COALESCE(escritorio_nome, escritorio_dono), escritorio_dono,
+                    tipo_acao, data_fechamento, pendencias,
+                    numero_processo, data_protocolo,
+                    observacoes, captador, created_at, datetime('now','localtime')
+                FROM registros
+                WHERE {where}
+                ORDER BY id
+            """, chunk + scope_params)
+            moved += cur.rowcount
+
+            conn.execute(f"DELETE FROM registros WHERE {where}", chunk + scope_params)
+
+    return moved
+
+
+def restore_ids(conn, ids, allowed=None):
+    """
+    Restaura registros da lixeira de volta para 'registros'.
+
+    Por bloco de ids, na mesma transação da checagem de escopo:
+        1. INSERT OR IGNORE dos escritórios de origem (um único comando)
+        2. INSERT ... SELECT de excluidos para registros, com o id e a
+           versão originais (linhas antigas da lixeira, sem registro_id,
+           ganham um id novo)
+        3. DELETE dos ids restaurados
+
+    Args:
+        conn: conexão sqlite3.
+        ids: ids (strings ou inteiros) da tabela excluidos.
+        allowed: escritórios permitidos (None = todos); os demais ids
+                 são ignorados.
+
+    Returns:
+        int: quantidade de registros restaurados.
+    """
+    ids = parse_ids(ids)
+    if not ids:
+        return 0
+
+    _register_functions(conn)
+    restored = 0
+
+    with write_transaction(conn):
+        if allowed is not None:
+            ids = _scoped_ids(conn, ids, allowed)
+
+        for chunk in chunked(ids):
+            marks = ",".join("?" * len(chunk))
+
+            conn.execute(f"""
+                INSERT OR IGNORE INTO offices (office_key, display_name)
+                SELECT DISTINCT {OFFICE_KEY_SQL}, escritorio_origem
+                FROM excluidos
+                WHERE id IN ({marks})
+            """, chunk)
+
+            cur = conn.execute(f"""
+                INSERT INTO registros (
+                    id, version,
+                    nome, cpf, escritorio_dono, escritorio_nome,
+                    tipo_acao, data_fechamento, pendencias,
+                    numero_processo, data_protocolo,
+                    observacoes, captador, created_at
+                )
+                SELECT
+                    CASE
+                        WHEN registro_id IN (SELECT id FROM registros) THEN NULL
+                        ELSE registro_id
+                    END,
+                    COALESCE(version, 1),
+                    nome, cpf, {OFFICE_KEY_SQL},
+                    CASE WHEN registro_id IS NULL THEN escritorio_origem ELSE escritorio_nome END,
+                    tipo_acao, data_fechamento, pendencias,
+                    numero_processo, data_protocolo,
+                    observacoes, captador, created_at
+                FROM excluidos
+                WHERE id IN ({marks})
+                ORDER BY id
+            """, chunk)
+            restored += cur.rowcount
+
+            conn.execute(f"DELETE FROM excluidos WHERE id IN ({marks})", chunk)
+
+    invalidate_office_cache()
+    return restored
+
+
+def purge_ids(conn, ids, allowed=None):
+    """
+    Remove permanentemente registros da lixeira.
+    allowed restringe aos escritórios permitidos (None = todos).
+
+    Returns:
+        int: quantidade de registros removidos.
+    """
+    ids = parse_ids(ids)
+    if not ids:
+        return 0
+
+    purged = 0
+
+    with write_transaction(conn):
+        if allowed is not None:
+            ids = _scoped_ids(conn, ids, allowed)
+
+        for chunk in chunked(ids):
+            marks = ",".join("?" * len(chunk))
+            cur = conn.execute(f"DELETE FROM excluidos WHERE id IN ({marks})", chunk)
+            purged += cur.rowcount
+
+    return purged
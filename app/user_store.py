@@ -0,0 +1,255 @@
+"""
+user_store.py
+---------------------------
+Consultas de usuários e de seus vínculos com escritórios.
+
+Inclui:
+- Listagem paginada de usuários já com os escritórios vinculados,
+  em uma única consulta (json_group_array), sem N+1
+- Vínculos usuário x escritório (tabela user_offices, única fonte)
+- Snapshot do usuário logado (papel, status e escritórios) guardado
+  na sessão: as rotas checam permissões e filtram por escritório
+  sem consultar o banco
+"""
+
+import json
+import time
+from types import MappingProxyType
+
+from flask import session, abort, g, current_app
+
+from .extensions import get_conn
+from .sessions import purge_expired_sessions
+
+
+USERS_PER_PAGE = 50
+
+USER_OFFICE_KEYS_SQL = "SELECT office_key FROM user_offices WHERE user_id=? ORDER BY office_key"
+
+# Escritórios de cada usuário agregados em JSON, ordenados pelo nome exibido.
+# A subconsulta correlacionada usa idx_user_offices_user; tudo roda em um
+# único comando para a página inteira.
+_OFFICES_JSON_SQL = """
+    (
+        SELECT json_group_array(json_object('key', k, 'display', d))
+        FROM (
+            SELECT uo.office_key AS k, COALESCE(o.display_name, uo.office_key) AS d
+            FROM user_offices uo
+            LEFT JOIN offices o ON o.office_key = uo.office_key
+            WHERE uo.user_id = u.id
+            ORDER BY d
+        )
+    )
+"""
+
+
+def _hydrate(row):
+    """Converte a linha em dict de usuário com a lista de escritórios."""
+    offices = json.loads(row["offices_json"] or "[]")
+
+    return {
+        "id": row["id"],
+        "username": row["username"],
+        "full_name": row["full_name"],
+        "role": row["role"],
+        "active": row["active"],
+        "created_at": row["created_at"],
+        "offices": [o["display"] for o in offices],
+        "office_keys": [o["key"] for o in offices],
+    }
+
+
+def list_users_page(conn, page=1, per_page=USERS_PER_PAGE):
+    """
+    Lista uma página de usuários (mais recentes primeiro) com os escritórios.
+
+    Returns:
+        dict: {"users": [...], "page", "per_page", "total", "total_pages"}
+    """
+    page = max(1, page)
+    total = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    rows = conn.execute(f"""
+        SELECT u.id, u.username, u.full_name, u.role, u.active, u.created_at,
+               {_OFFICES_JSON_SQL} AS offices_json
+        FROM users u
+        ORDER BY u.id DESC
+        LIMIT ? OFFSET ?
+    """, (per_page, (page - 1) * per_page)).fetchall()
+
+    return {
+        "users": [_hydrate(r) for r in rows],
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "total_pages": max(1, -(-total // per_page)),
+    }
+
+
+# =============================================================================
+# VÍNCULOS USUÁRIO x ESCRITÓRIO
+# =============================================================================
+def get_user_office_keys(conn, user_id):
+    """Chaves dos escritórios vinculados ao usuário, em ordem alfabética."""
+    rows = conn.execute(USER_OFFICE_KEYS_SQL, (user_id,)).fetchall()
+    return [r[0] for r in rows]
+
+
+def set_user_offices(conn, user_id, office_keys):
+    """
+    Substitui os vínculos do usuário (não faz commit).
+    Chaves vazias ou repetidas são descartadas.
+    """
+    keys = sorted({k.strip() for k in office_keys if k and k.strip()})
+
+    conn.execute("DELETE FROM user_offices WHERE user_id=?", (user_id,))
+    conn.executemany(
+        "INSERT OR IGNORE INTO user_offices (user_id, office_key) VALUES (?, ?)",
+        [(user_id, k) for k in keys],
+    )
+
+
+# =============================================================================
+# USUÁRIO LOGADO (SNAPSHOT NA SESSÃO)
+# =============================================================================
+#
+# session["user"] guarda uma cópia do usuário feita no login:
+#   {"id", "username", "full_name", "role", "active", "offices", "gen", "loaded_at"}
+#   offices = None → sem restrição (ADMIN ou vinculado à CENTRAL)
+#   gen = geração do usuário lida na mesma consulta (ver sessions.py)
+#
+# A sessão fica no servidor (sessions.py), então o snapshot chega junto
+# com a sessão, sem consultar users. Ele é recarregado após
+# USER_SNAPSHOT_TTL_S segundos ou quando o admin altera o usuário
+# (sessions.invalidate_user_sessions). Sem usuário na sessão, nada é
+# restringido (rotas sem login_required).
+
+UNRESTRICTED_ROLES = ("ADMIN",)
+DEFAULT_SNAPSHOT_TTL_S = 300
+
+
+def load_user_snapshot(conn, user_id):
+    """
+    Lê o usuário, seus escritórios e a geração 'user:<id>' em uma
+    única consulta (a geração corresponde exatamente aos dados lidos).
+
+    Returns:
+        dict | None: snapshot pronto para session["user"].
+    """
+    row = conn.execute("""
+        SELECT u.id, u.username, u.full_name, u.role, u.active,
+               (SELECT json_group_array(office_key) FROM user_offices
+                WHERE user_id = u.id) AS offices_json,
+               COALESCE((SELECT value FROM generations
+                         WHERE name = 'user:' || u.id), 0) AS gen
+        FROM users u WHERE u.id=?
+    """, (user_id,)).fetchone()
+
+    if row is None:
+        return None
+
+    keys = sorted(json.loads(row["offices_json"] or "[]"))
+    unrestricted = row["role"] in UNRESTRICTED_ROLES or "CENTRAL" in keys
+
+    return {
+        "id": row["id"],
+        "username": row["username"],
+        "full_name": row["full_name"],
+        "role": row["role"],
+        "active": row["active"],
+        "offices": None if unrestricted else keys,
+        "gen": row["gen"],
+        "loaded_at": int(time.time()),
+    }
+
+
+def login_user(conn, user_id):
+    """
+    Abre a sessão do usuário: id novo de sessão (contra fixação) e
+    snapshot em cache. Aproveita para limpar sessões vencidas.
+    """
+    if hasattr(session, "regenerate"):
+        session.regenerate()
+
+    session["user_id"] = user_id
+    session["user"] = load_user_snapshot(conn, user_id)
+
+    purge_expired_sessions(conn)
+    conn.commit()
+
+
+def current_user():
+    """
+    Usuário logado, a partir do snapshot da sessão (somente leitura).
+
+    Recarrega do banco quando o snapshot venceu ou foi invalidado;
+    usuário removido ou inativo encerra a sessão.
+
+    Returns:
+        MappingProxyType | None
+    """
+    if "current_user" in g:
+        return g.current_user
+
+    user = None
+
+    if "user_id" in session:
+        snapshot = session.get("user")
+        ttl = current_app.config.get("USER_SNAPSHOT_TTL_S", DEFAULT_SNAPSHOT_TTL_S)
+
+        if not snapshot or time.time() - snapshot["loaded_at"] > ttl:
+            snapshot = load_user_snapshot(get_conn(), session["user_id"])
+            session["user"] = snapshot
+
+        if snapshot and snapshot["active"] == 1:
+            offices = snapshot["offices"]
+            user = MappingProxyType(dict(
+                snapshot, offices=None if offices is None else tuple(offices)
+            ))
+        else:
+            session.clear()
+
+    g.current_user = user
+    return user
+
+
+def permitted_offices():
+    """
+    Escritórios que o usuário logado pode acessar.
+
+    Returns:
+        tuple[str] | None: chaves permitidas; None = todos.
+    """
+    user = current_user()
+    return None if user is None else user["offices"]
+
+
+def office_allowed(office_key, allowed):
+    """True se a chave estiver entre as permitidas (None = todas)."""
+    return allowed is None or office_key in allowed
+
+
+def require_office(office_key, allowed):
+    """
+    Interrompe a requisição com 403 se o escritório não for permitido.
+    CENTRAL (todos) é aceito: a consulta é restringida por office_scope_sql.
+    """
+    if office_key != "CENTRAL" and not office_allowed(office_key, allowed):
+        abort(403)
+
+
+def office_scope_sql(column, allowed):
+    """
+    Condição que restringe <coluna> aos escritórios permitidos,
+    para compor o WHERE de consultas e escritas.
+
+    Returns:
+        tuple[str, list]: ("1", []) quando não há restrição.
+    """
+    if allowed is None:
+        return "1", []
+    if not allowed:
+        return "0", []
+
+    marks = ",".join("?" * len(allowed))
+    return f"{column} IN ({marks})", list(allowed)
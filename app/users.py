@@ -15,41 +15,32 @@ Funções:
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from .extensions import get_conn
-from .utils import list_offices, office_keys_to_list
+from .db_helpers import write_transaction
+from .utils import list_offices, require_roles_hook, admin_required
+from .user_store import list_users_page, get_user_office_keys, set_user_offices
+from .sessions import invalidate_user_sessions
+from .passwords import hash_password
+from .versions import conditional
 
 users_bp = Blueprint("users", __name__, url_prefix="/users")
+users_bp.before_request(require_roles_hook(("ADMIN", "SUPERVISOR")))
 
 
 # =============================================================================
 # LISTAGEM COMPLETA DE USUÁRIOS (ADMIN)
 # =============================================================================
 @users_bp.route("/")
+@conditional(["users", "offices"])
 def admin_users():
-    conn = get_conn()
-    c = conn.cursor()
+    """
+    Lista os usuários, paginada, com os escritórios vinculados
+    (uma única consulta — ver user_store.list_users_page).
+    """
 
-    c.execute("""
-        SELECT id, username, full_name, role, active, offices, created_at
-        FROM users
-        ORDER BY id DESC
-    """)
-
-    rows = c.fetchall()
-    conn.close()
+    page = request.args.get("page", 1, type=int)
+    result = list_users_page(get_conn(), page=page)
 
-    users = []
-    for r in rows:
-        users.append({
-            "id": r[0],
-            "username": r[1],
-            "full_name": r[2],
-            "role": r[3],
-            "active": r[4],
-            "offices": office_keys_to_list(r[5]),
-            "created_at": r[6]
-        })
-
-    return render_template("admin_users.html", users=users)
+    return render_template("admin_users.html", **result)
 
 
 # =============================================================================
@@ -65,18 +56,15 @@ def admin_users_create():
         role = request.form.get("role")
         offices = request.form.getlist("offices")
 
-        offices_str = ",".join(offices)
-
         conn = get_conn()
-        c = conn.cursor()
 
-        c.execute("""
-            INSERT INTO users (username, full_name, password, role, active, offices)
-            VALUES (?, ?, ?, ?, 1, ?)
-        """, (username, full_name, password, role, offices_str))
+        with write_transaction(conn):
+            cur = conn.execute("""
+                INSERT INTO users (username, full_name, password, role, active)
+                VALUES (?, ?, ?, ?, 1)
+            """, (username, full_name, hash_password(password), role))
+            set_user_offices(conn, cur.lastrowid, offices)
 
-        conn.commit()
-        conn.close()
         flash("Usuário criado com sucesso!", "success")
 
         return redirect(url_for("users.admin_users"))
@@ -124,6 +112,7 @@ def admin_users_edit(user_id):
                 full_name=?, role=?, active=?
             WHERE id=?
         """, (full_name, role, active, user_id))
+        invalidate_user_sessions(conn, user_id)
 
         conn.commit()
         conn.close()
@@ -143,7 +132,7 @@ def admin_users_offices(user_id):
     conn = get_conn()
     c = conn.cursor()
 
-    c.execute("SELECT offices, full_name FROM users WHERE id=?", (user_id,))
+    c.execute("SELECT full_name FROM users WHERE id=?", (user_id,))
     row = c.fetchone()
 
     if not row:
@@ -151,27 +140,24 @@ def admin_users_offices(user_id):
         flash("Usuário não encontrado.", "error")
         return redirect(url_for("users.admin_users"))
 
-    assigned = office_keys_to_list(row[0])
-    full_name = row[1]
-
-    offices = list_offices()
+    full_name = row[0]
 
     if request.method == "POST":
-        new_list = request.form.getlist("offices")
-        offices_str = ",".join(new_list)
+        with write_transaction(conn):
+            set_user_offices(conn, user_id, request.form.getlist("offices"))
+            invalidate_user_sessions(conn, user_id)
 
-        c.execute("UPDATE users SET offices=? WHERE id=?", (offices_str, user_id))
-        conn.commit()
-        conn.close()
         flash("Vínculos atualizados!", "success")
 
         return redirect(url_for("users.admin_users"))
 
+    assigned = get_user_office_keys(conn, user_id)
     conn.close()
+
     return render_template(
         "admin_users_offices.html",
         user={"id": user_id, "full_name": full_name},
-        offices=offices,
+        offices=list_offices(),
         assigned=assigned
     )
 
@@ -180,6 +166,7 @@ def admin_users_offices(user_id):
 # RESET PASSWORD
 # =============================================================================
 @users_bp.route("/reset/<int:user_id>", methods=["POST"])
+@admin_required
 def admin_users_reset_password(user_id):
 
     new_pass = request.form.get("new_password", "123456")
@@ -187,7 +174,7 @@ def admin_users_reset_password(user_id):
     conn = get_conn()
     c = conn.cursor()
 
-    c.execute("UPDATE users SET password=? WHERE id=?", (new_pass, user_id))
+    c.execute("UPDATE users SET password=? WHERE id=?", (hash_password(new_pass), user_id))
     conn.commit()
     conn.close()
 
@@ -199,14 +186,15 @@ def admin_users_reset_password(user_id):
 # DELETE USER
 # =============================================================================
 @users_bp.route("/delete/<int:user_id>", methods=["POST"])
+@admin_required
 def admin_users_delete(user_id):
 
     conn = get_conn()
-    c = conn.cursor()
 
-    c.execute("DELETE FROM users WHERE id=?", (user_id,))
-    conn.commit()
-    conn.close()
+    with write_transaction(conn):
+        conn.execute("DELETE FROM user_offices WHERE user_id=?", (user_id,))
+        conn.execute("DELETE FROM users WHERE id=?", (user_id,))
+        invalidate_user_sessions(conn, user_id, drop=True)
 
     flash("Usuário removido!", "success")
     return redirect(url_for("users.admin_users"))
@@ -6,11 +6,19 @@ Funções auxiliares que não dependem de banco ou rotas específicas.
 Inclui:
 - Normalização de nomes de escritórios
 - Criação automática de novos escritórios
+- Diretório de escritórios em memória (cache invalidado entre workers)
 - Funções reutilizáveis acessadas por várias rotas
+- Decorators de acesso (login_required, supervisor_required, admin_required)
 """
 
 import re
+import threading
+from functools import wraps
+
+from flask import g, has_request_context, redirect, url_for, flash, abort
+
 from .extensions import get_conn
+from .user_store import current_user
 
 
 def normalize_office_key(name: str) -> str:
@@ -36,14 +44,157 @@ def normalize_office_key(name: str) -> str:
     return s or "CENTRAL"
 
 
+def normalize_cpf(cpf: str) -> str:
+    """
+    Mantém apenas os dígitos de um CPF.
+
+    Exemplos:
+        "123.456.789-00" -> "12345678900"
+        None -> ""
+
+    Args:
+        cpf (str): CPF digitado (com ou sem máscara).
+
+    Returns:
+        str: Somente dígitos.
+    """
+    if not cpf:
+        return ""
+
+    return re.sub(r"\D", "", cpf)
+
+
+def is_valid_cpf(cpf: str) -> bool:
+    """
+    Valida os dígitos verificadores de um CPF.
+
+    Args:
+        cpf (str): CPF já normalizado (somente dígitos).
+
+    Returns:
+        bool: True se tiver 11 dígitos e verificadores corretos.
+    """
+    if len(cpf) != 11 or not cpf.isdigit() or cpf == cpf[0] * 11:
+        return False
+
+    for size in (9, 10):
+        total = sum(int(d) * w for d, w in zip(cpf[:size], range(size + 1, 1, -1)))
+        digit = (total * 10) % 11 % 10
+        if digit != int(cpf[size]):
+            return False
+
+    return True
+
+
+# =============================================================================
+# DIRETÓRIO DE ESCRITÓRIOS (CACHE EM MEMÓRIA)
+# =============================================================================
+#
+# Cada worker mantém os escritórios em memória, indexados por office_key
+# e por display_name. A validade é controlada pelo contador 'offices' da
+# tabela generations, incrementado por triggers em qualquer escrita na
+# tabela offices — assim todos os workers do gunicorn enxergam a mudança.
+# O contador é lido no máximo uma vez por requisição.
+
+OFFICES_SQL = "SELECT office_key, display_name FROM offices ORDER BY display_name"
+OFFICE_BY_KEY_SQL = "SELECT office_key, display_name FROM offices WHERE office_key=?"
+
+_office_lock = threading.Lock()
+_office_directory = {"generation": None, "by_key": {}, "by_display": {}, "ordered": []}
+
+
+def _office_generation(conn) -> int:
+    row = conn.execute("SELECT value FROM generations WHERE name='offices'").fetchone()
+    return row[0] if row else 0
+
+
+def get_office_directory() -> dict:
+    """
+    Retorna o diretório de escritórios, recarregando se estiver desatualizado.
+
+    Returns:
+        dict: {
+            "generation": int,
+            "by_key": {office_key: office},
+            "by_display": {display_name: office},
+            "ordered": [office, ...]   # ORDER BY display_name
+        }
+        onde office = {"key": ..., "display": ...}
+    """
+    global _office_directory
+
+    if has_request_context() and "office_directory" in g:
+        return g.office_directory
+
+    conn = get_conn()
+    generation = _office_generation(conn)
+
+    with _office_lock:
+        directory = _office_directory
+
+        if directory["generation"] != generation:
+            rows = conn.execute(OFFICES_SQL).fetchall()
+
+            ordered = [{"key": r["office_key"], "display": r["display_name"]} for r in rows]
+            directory = {
+                "generation": generation,
+                "by_key": {o["key"]: o for o in ordered},
+                "by_display": {o["display"]: o for o in ordered},
+                "ordered": ordered,
+            }
+            _office_directory = directory
+
+    if has_request_context():
+        g.office_directory = directory
+
+    return directory
+
+
+def invalidate_office_cache():
+    """
+    Descarta o diretório em memória deste worker.
+    Os demais workers percebem a mudança pelo contador de geração.
+    """
+    global _office_directory
+
+    with _office_lock:
+        _office_directory = {"generation": None, "by_key": {}, "by_display": {}, "ordered": []}
+
+    if has_request_context():
+        g.pop("office_directory", None)
+
+
+def find_office_by_display(display: str):
+    """
+    Busca O(1) de um escritório pelo nome exibido.
+
+    Returns:
+        dict | None: {"key": ..., "display": ...}
+    """
+    return get_office_directory()["by_display"].get(display)
+
+
+def get_office_display(key: str) -> str:
+    """
+    Nome exibido de um escritório a partir da chave.
+    Retorna a própria chave se o escritório não estiver cadastrado.
+    """
+    office = get_office_directory()["by_key"].get(key)
+    return office["display"] if office else key
+
+
 def register_office(key: str, display: str):
     """
     Registra um escritório no banco caso ainda não exista.
+    Se a chave já estiver no diretório em memória, nada é gravado.
 
     Args:
         key  (str): office_key ("SAO_PAULO")
         display (str): Nome visível ("SÃO PAULO")
     """
+    if key in get_office_directory()["by_key"]:
+        return
+
     conn = get_conn()
     c = conn.cursor()
 
@@ -53,12 +204,12 @@ def register_office(key: str, display: str):
     """, (key, display))
 
     conn.commit()
-    conn.close()
+    invalidate_office_cache()
 
 
 def list_offices():
     """
-    Lista todos os escritórios cadastrados.
+    Lista todos os escritórios cadastrados (a partir do diretório em memória).
 
     Returns:
         list[dict]: Exemplo:
@@ -67,13 +218,42 @@ def list_offices():
                 {"key": "SP", "display": "SÃO PAULO"}
             ]
     """
-    conn = get_conn()
-    c = conn.cursor()
+    return list(get_office_directory()["ordered"])
+
 
-    c.execute("SELECT office_key, display_name FROM offices ORDER BY display_name")
-    rows = c.fetchall()
+# =============================================================================
+# CONTROLE DE ACESSO
+# =============================================================================
+#
+# Os decorators usam o snapshot do usuário guardado na sessão
+# (user_store.current_user): nenhuma consulta a users por requisição.
 
-    offices = [{"key": r["office_key"], "display": r["display_name"]} for r in rows]
+def _require_roles(roles=None):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user = current_user()
 
-    conn.close()
-    return offices
+            if user is None:
+                flash("Faça login para continuar.", "error")
+                return redirect(url_for("auth.login"))
+
+            if roles and user["role"] not in roles:
+                abort(403)
+
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+login_required = _require_roles()
+supervisor_required = _require_roles(("ADMIN", "SUPERVISOR"))
+admin_required = _require_roles(("ADMIN",))
+
+
+def require_roles_hook(roles=None):
+    """
+    Mesma checagem dos decorators, para before_request de uma blueprint:
+    protege todas as rotas dela de uma vez.
+    """
+    return _require_roles(roles)(lambda: None)
@@ -0,0 +1,126 @@
+"""
+versions.py
+---------------------------
+Versões dos dados e GET condicional (ETag / Last-Modified).
+
+Inclui:
+- Leitura de vários contadores da tabela generations em uma única
+  consulta. Os contadores são mantidos por triggers (migração 9):
+      registros                → qualquer escrita em registros
+      registros:<escritório>   → escritas nos registros do escritório
+      excluidos, offices, users (users + user_offices)
+- Decorator conditional: calcula ETag e Last-Modified a partir das
+  versões e responde 304 sem consultar nem renderizar a página
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import request, session, make_response, Response, g
+from werkzeug.http import is_resource_modified
+
+from .extensions import get_read_conn
+from .user_store import current_user
+
+
+def registros_version(office):
+    """Nome do contador dos registros de um escritório (CENTRAL = todos)."""
+    return "registros" if not office or office == "CENTRAL" else f"registros:{office}"
+
+
+def read_versions(conn, names):
+    """
+    Lê os contadores pedidos (os que nunca mudaram valem 0).
+
+    Returns:
+        dict: {nome: (versão, changed_at epoch | None)}
+    """
+    names = sorted(set(names))
+    marks = ",".join("?" * len(names))
+    found = {
+        r["name"]: (r["value"], r["changed_at"])
+        for r in conn.execute(
+            f"SELECT name, value, changed_at FROM generations WHERE name IN ({marks})", names
+        )
+    }
+    return {n: found.get(n, (0, None)) for n in names}
+
+
+def current_versions(names):
+    """
+    Versões lidas na requisição atual: a primeira leitura fica em g e é
+    reaproveitada (o ETag e o cache de fragmentos usam a mesma versão).
+    """
+    cached = g.setdefault("data_versions", {})
+    missing = [n for n in names if n not in cached]
+    if missing:
+        cached.update(read_versions(get_read_conn(), missing))
+    return {n: cached[n] for n in names}
+
+
+def _validators(versions):
+    """ETag e Last-Modified da página atual para as versões lidas."""
+    user = current_user()
+    identity = None
+    if user is not None:
+        identity = sorted((k, v) for k, v in user.items() if k != "loaded_at")
+
+    key = repr((
+        request.endpoint,
+        request.query_string,
+        sorted((n, v[0]) for n, v in versions.items()),
+        identity,
+    ))
+    etag = hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    changed = [v[1] for v in versions.values() if v[1]]
+    last_modified = (
+        datetime.fromtimestamp(max(changed), tz=timezone.utc) if changed else None
+    )
+    return etag, last_modified
+
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Navegador sempre revalida; a revalidação custa uma leitura de contador
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def conditional(names):
+    """
+    GET condicional para páginas de listagem.
+
+    Args:
+        names: lista de contadores, ou função que recebe os argumentos
+               da rota e devolve a lista.
+
+    Uso:
+        @records_bp.route("/table/<office>")
+        @conditional(lambda office: [registros_version(office), "offices"])
+        def table(office): ...
+
+    Páginas com mensagens flash pendentes não são condicionais (a
+    mensagem precisa ser exibida uma vez).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD") or "_flashes" in session:
+                return view(*args, **kwargs)
+
+            wanted = names(**kwargs) if callable(names) else names
+            etag, last_modified = _validators(current_versions(wanted))
+
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                return _set_validators(Response(status=304), etag, last_modified)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
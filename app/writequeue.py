@@ -0,0 +1,325 @@
+"""
+writequeue.py
+---------------------------
+Gravação assíncrona de cadastros (write-behind), opcional (WRITE_BEHIND).
+
+Inclui:
+- Fila durável em um arquivo SQLite próprio (WRITE_QUEUE_PATH), separado
+  do banco principal: enfileirar não disputa o lock de escrita de
+  registros, e o cadastro é confirmado logo após o commit na fila
+- Uma única thread gravadora, em lotes (um INSERT OR IGNORE de
+  escritórios + executemany de registros por transação)
+- Um único gravador entre os workers do gunicorn: quem drena a fila
+  mantém uma concessão (lease) renovada na própria fila
+- Aplicação exatamente uma vez: o último id aplicado de cada fila
+  (identificada por queue_id) é gravado na mesma transação dos
+  registros (tabela write_queue_applied, migração 8)
+- Itens que falham individualmente ficam marcados com o erro e não
+  bloqueiam o restante da fila. Para tentar de novo, reenfileire
+  (requeue_failed): o item ganha um id novo, acima do marcador. Nunca
+  limpe last_error no próprio item — o id dele já pode estar abaixo do
+  marcador, e o gravador o descartaria como aplicado
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from .db_helpers import write_transaction
+from .extensions import get_conn
+from .importer import INSERT_SQL, registro_params
+
+
+QUEUE_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS write_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    last_error TEXT
+);
+
+CREATE TABLE IF NOT EXISTS queue_meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    queue_id TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS writer_lease (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_INTERVAL_S = 0.2
+LEASE_S = 10
+
+_writer = None
+_writer_lock = threading.Lock()
+_local = threading.local()
+
+
+# =============================================================================
+# FILA (ARQUIVO SQLITE PRÓPRIO)
+# =============================================================================
+class QueueConnection(sqlite3.Connection):
+    """Conexão da fila; guarda o queue_id do arquivo."""
+
+    queue_id = None
+
+
+def connect_queue(path):
+    """
+    Abre a fila. synchronous=FULL: um cadastro confirmado ao usuário
+    sobrevive a queda de energia.
+    """
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False, factory=QueueConnection)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.executescript(QUEUE_SCHEMA_SQL)
+
+    # Identifica este arquivo: uma fila recriada do zero reinicia os ids
+    # e não pode herdar o marcador de aplicação da anterior
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO queue_meta (id, queue_id) VALUES (1, ?)", (uuid.uuid4().hex,)
+        )
+    conn.queue_id = conn.execute("SELECT queue_id FROM queue_meta WHERE id=1").fetchone()[0]
+    return conn
+
+
+def _queue_conn(app):
+    """Conexão da fila por thread (e por processo, após o fork)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid():
+        conn = connect_queue(app.config.get("WRITE_QUEUE_PATH", "write_queue.db"))
+        _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+
+def enqueue_registro(app, data):
+    """
+    Grava um cadastro já validado (importer.resolve_submission) na fila
+    e acorda o gravador.
+
+    Args:
+        data (dict): colunas de INSERT_SQL, com escritorio_dono e
+                     escritorio_nome já resolvidos (created_at opcional).
+
+    Returns:
+        int: id do item na fila.
+    """
+    conn = _queue_conn(app)
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO write_queue (payload, created_at) VALUES (?, ?)",
+            (json.dumps(data), datetime.utcnow().isoformat()),
+        )
+
+    writer = ensure_writer(app)
+    writer.wake.set()
+    return cur.lastrowid
+
+
+def requeue_failed(app):
+    """
+    Reenfileira os itens com erro como itens novos (id acima do marcador
+    de aplicados), na ordem original, e remove os antigos.
+
+    Returns:
+        int: itens reenfileirados.
+    """
+    conn = _queue_conn(app)
+    with conn:
+        cur = conn.execute("""
+            INSERT INTO write_queue (payload, created_at)
+            SELECT payload, created_at FROM write_queue
+            WHERE last_error IS NOT NULL
+            ORDER BY id
+        """)
+        conn.execute("DELETE FROM write_queue WHERE last_error IS NOT NULL")
+
+    return cur.rowcount
+
+
+def queue_stats(app):
+    """Itens pendentes e com erro na fila."""
+    row = _queue_conn(app).execute("""
+        SELECT SUM(last_error IS NULL) AS pending, SUM(last_error IS NOT NULL) AS failed
+        FROM write_queue
+    """).fetchone()
+    return {"pending": row["pending"] or 0, "failed": row["failed"] or 0}
+
+
+# =============================================================================
+# APLICAÇÃO NO BANCO PRINCIPAL
+# =============================================================================
+def _apply(conn, queue_id, items):
+    """
+    Aplica itens da fila em uma transação e avança o marcador.
+    Itens com id já aplicado (queda entre o commit e a limpeza da fila)
+    são ignorados — e drain_once os remove da fila. Por isso um item com
+    erro só volta a ser aplicado reenfileirado (requeue_failed).
+    """
+    now = datetime.utcnow().isoformat()
+
+    with write_transaction(conn):
+        row = conn.execute(
+            "SELECT last_id FROM write_queue_applied WHERE queue_id=?", (queue_id,)
+        ).fetchone()
+        last_id = row[0] if row else 0
+        items = [i for i in items if i["id"] > last_id]
+        if not items:
+            return last_id
+
+        offices = {
+            (i["data"]["escritorio_dono"], i["data"].get("escritorio_nome") or i["data"]["escritorio_dono"])
+            for i in items if i["data"].get("escritorio_dono")
+        }
+        if offices:
+            conn.executemany(
+                "INSERT OR IGNORE INTO offices (office_key, display_name) VALUES (?, ?)",
+                sorted(offices),
+            )
+
+        conn.executemany(INSERT_SQL, [registro_params(i["data"], now) for i in items])
+
+        last_id = max(i["id"] for i in items)
+        conn.execute("""
+            INSERT INTO write_queue_applied (queue_id, last_id) VALUES (?, ?)
+            ON CONFLICT(queue_id) DO UPDATE SET last_id = excluded.last_id
+        """, (queue_id, last_id))
+
+    return last_id
+
+
+def drain_once(app, batch_size=None):
+    """
+    Aplica um lote da fila no banco principal.
+
+    Se o lote falhar por causa de algum item (integridade, dado inválido),
+    os itens são aplicados um a um; os que falharem sozinhos ficam com
+    last_error e saem da fila ativa. Banco ocupado (OperationalError)
+    não marca nada: a thread tenta de novo no próximo ciclo.
+
+    Returns:
+        int: itens aplicados.
+    """
+    batch_size = batch_size or app.config.get("WRITE_QUEUE_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    queue = _queue_conn(app)
+
+    rows = queue.execute("""
+        SELECT id, payload FROM write_queue
+        WHERE last_error IS NULL
+        ORDER BY id LIMIT ?
+    """, (batch_size,)).fetchall()
+    if not rows:
+        return 0
+
+    items = [{"id": r["id"], "data": json.loads(r["payload"])} for r in rows]
+    conn = get_conn()
+
+    try:
+        _apply(conn, queue.queue_id, items)
+        applied = items
+    except sqlite3.OperationalError:
+        raise
+    except sqlite3.Error:
+        applied = []
+        for item in items:
+            try:
+                _apply(conn, queue.queue_id, [item])
+                applied.append(item)
+            except sqlite3.OperationalError:
+                raise
+            except sqlite3.Error as e:
+                with queue:
+                    queue.execute(
+                        "UPDATE write_queue SET last_error=? WHERE id=?", (str(e), item["id"])
+                    )
+
+    if applied:
+        ids = [i["id"] for i in applied]
+        with queue:
+            queue.executemany("DELETE FROM write_queue WHERE id=?", [(i,) for i in ids])
+
+    return len(applied)
+
+
+# =============================================================================
+# THREAD GRAVADORA (UMA POR PROCESSO, UMA ATIVA NO TOTAL)
+# =============================================================================
+class QueueWriter(threading.Thread):
+    """
+    Drena a fila em lotes. Só grava enquanto detiver a concessão
+    (writer_lease): com vários workers, os demais apenas aguardam.
+    """
+
+    def __init__(self, app):
+        super().__init__(name="write-queue", daemon=True)
+        self.app = app
+        self.pid = os.getpid()
+        self.owner = f"{os.uname().nodename}:{self.pid}"
+        self.wake = threading.Event()
+        self.interval = app.config.get("WRITE_QUEUE_INTERVAL_S", DEFAULT_INTERVAL_S)
+
+    def _hold_lease(self):
+        queue = _queue_conn(self.app)
+        now = time.time()
+        with queue:
+            queue.execute("""
+                INSERT INTO writer_lease (id, owner, expires_at) VALUES (1, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE writer_lease.owner = excluded.owner
+                   OR writer_lease.expires_at < ?
+            """, (self.owner, now + LEASE_S, now))
+            row = queue.execute("SELECT owner FROM writer_lease WHERE id=1").fetchone()
+        return row["owner"] == self.owner
+
+    def run(self):
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+            try:
+                if not self._hold_lease():
+                    continue
+
+                # Renova a concessão a cada lote
+                with self.app.app_context():
+                    while drain_once(self.app) and self._hold_lease():
+                        pass
+            except Exception:
+                self.app.logger.exception("Falha ao drenar a fila de gravação")
+                time.sleep(self.interval)
+
+
+def ensure_writer(app):
+    """Inicia a thread gravadora deste processo (recriada após fork)."""
+    global _writer
+
+    with _writer_lock:
+        if _writer is None or _writer.pid != os.getpid() or not _writer.is_alive():
+            _writer = QueueWriter(app)
+            _writer.start()
+
+    return _writer
+
+
+def init_write_queue(app):
+    """
+    Ativa o write-behind se WRITE_BEHIND estiver ligado: cada worker
+    inicia a thread na primeira requisição (depois do fork do gunicorn).
+    """
+    if not app.config.get("WRITE_BEHIND"):
+        return
+
+    @app.before_request
+    def _start_writer():
+        ensure_writer(app)
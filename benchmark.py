@@ -0,0 +1,141 @@
+"""
+Benchmark das rotas com dados sintéticos.
+
+Gera (uma vez por conjunto de parâmetros) um banco base em --workdir,
+copia para um banco descartável a cada execução e mede os cenários
+pelo test client do Flask. O resultado vai para um JSON com o commit
+atual, então execuções de commits diferentes podem ser comparadas:
+
+    python benchmark.py --rows 100000 --out antes.json
+    python benchmark.py --rows 100000 --out depois.json --compare antes.json
+
+Nunca toca no database.db da aplicação (DB_PATH aponta para o workdir).
+"""
+
+import json
+import os
+import shutil
+
+import click
+
+
+@click.command()
+@click.option("--rows", default=10000, show_default=True,
+              help="Registros ativos (10 mil a 5 milhões).")
+@click.option("--deleted-ratio", default=0.1, show_default=True,
+              help="Excluídos na lixeira, em proporção de --rows.")
+@click.option("--offices", default=20, show_default=True, help="Escritórios.")
+@click.option("--users", default=50, show_default=True, help="Usuários (além do admin).")
+@click.option("--skew", default=1.2, show_default=True,
+              help="Expoente Zipf da distribuição entre escritórios (0 = uniforme).")
+@click.option("--seed", default=42, show_default=True, help="Semente dos dados e das requisições.")
+@click.option("--iterations", default=200, show_default=True, help="Requisições por cenário.")
+@click.option("--pdf-iterations", default=10, show_default=True, help="PDFs gerados.")
+@click.option("--pdf-rows", default=500, show_default=True, help="Registros por PDF (máximo).")
+@click.option("--scenario", "scenarios", multiple=True,
+              help="Cenário a rodar (repita a opção). Padrão: todos.")
+@click.option("--workdir", default="bench_data", show_default=True,
+              help="Diretório dos bancos sintéticos.")
+@click.option("--regenerate", is_flag=True, help="Gera o banco base de novo.")
+@click.option("--out", default="bench_results.json", show_default=True, help="Arquivo JSON do resultado.")
+@click.option("--compare", "compare_path", type=click.Path(exists=True, dir_okay=False),
+              help="JSON de uma execução anterior para comparar (p95).")
+def main(rows, deleted_ratio, offices, users, skew, seed, iterations, pdf_iterations,
+         pdf_rows, scenarios, workdir, regenerate, out, compare_path):
+    """Mede vazão e latência das rotas principais com dados sintéticos."""
+
+    os.makedirs(workdir, exist_ok=True)
+    workdir = os.path.abspath(workdir)
+    params = dict(rows=rows, deleted_ratio=deleted_ratio, offices=offices,
+                  users=users, skew=skew, seed=seed)
+
+    name = "base-{rows}-{deleted_ratio}-{offices}-{users}-{skew}-{seed}".format(**params)
+    base_path = os.path.join(workdir, name + ".db")
+    run_path = os.path.join(workdir, "run.db")
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(run_path + suffix):
+            os.remove(run_path + suffix)
+    if regenerate and os.path.exists(base_path):
+        os.remove(base_path)
+
+    generated = not os.path.exists(base_path)
+    if not generated:
+        shutil.copyfile(base_path, run_path)
+
+    # Antes de create_app: init_database já roda no banco do benchmark
+    os.environ["DB_PATH"] = run_path
+
+    from app import create_app
+    from app.backup import backup_database
+    from app.benchmark import (
+        SCENARIOS, BenchmarkError, check_endpoints, generate_dataset, run_benchmark,
+        environment_info, compare_reports,
+    )
+    from app.extensions import get_conn
+
+    scenarios = scenarios or SCENARIOS
+    unknown = sorted(set(scenarios) - set(SCENARIOS))
+    if unknown:
+        raise click.BadParameter(f"cenários desconhecidos: {', '.join(unknown)}",
+                                 param_hint="--scenario")
+
+    app = create_app()
+    app.config.update(
+        DB_READ_PATH=None,
+        WRITE_BEHIND=False,
+        REPORTS_DIR=os.path.join(workdir, "reports"),
+        WRITE_QUEUE_PATH=os.path.join(workdir, "write_queue.db"),
+    )
+
+    try:
+        check_endpoints(app, scenarios)
+    except BenchmarkError as e:
+        raise click.ClickException(str(e))
+
+    dataset = dict(params)
+    if generated:
+        click.echo(f"Gerando {base_path} ...")
+        with app.app_context():
+            dataset.update(generate_dataset(get_conn(), log=click.echo, **params))
+        # Cópia consistente com a app aberta; o banco de execução vira a base
+        backup_database(run_path, base_path, verify=False)
+    dataset["generated"] = generated
+    dataset["bytes"] = os.path.getsize(base_path)
+
+    results = run_benchmark(
+        app, scenarios, iterations=iterations, pdf_iterations=pdf_iterations,
+        pdf_rows=pdf_rows, seed=seed, skew=skew, log=click.echo,
+    )
+
+    report = {"environment": environment_info(), "dataset": dataset,
+              "iterations": iterations, "scenarios": results}
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    click.echo(f"\n{'cenário':<26} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'erros':>6}")
+    for scenario, r in results.items():
+        click.echo(
+            f"{scenario:<26} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} "
+            f"{r['p99_ms']:8.1f} {r['per_s']:8.1f} {r['errors']:6d}"
+        )
+
+    if compare_path:
+        with open(compare_path, encoding="utf-8") as f:
+            previous = json.load(f)
+        click.echo(f"\np95 em relação a {compare_path} "
+                   f"(commit {previous.get('environment', {}).get('commit')}):")
+        for row in compare_reports(previous, report):
+            ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+            click.echo(f"{row['scenario']:<26} {row['old']:8.1f} → {row['new']:8.1f} ms  {ratio}")
+
+    click.echo(f"\nResultado gravado em {out}.")
+
+    # Respostas 4xx/5xx: os números não medem a rota funcionando
+    failed = [s for s, r in results.items() if r.get("errors")]
+    if failed:
+        raise click.ClickException(f"cenários com erro: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Fixtures dos testes: uma app de create_app por teste, com banco próprio
+em tmp_path (DB_PATH vem do ambiente, ver app/__init__.py).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.fragments import get_fragment_cache  # noqa: E402
+from app.utils import invalidate_office_cache  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "test.db"))
+    invalidate_office_cache()
+
+    app = create_app()
+    app.config.update(
+        TESTING=True,
+        PASSWORD_HASH_METHOD="pbkdf2:sha256:1000",
+        REPORTS_DIR=str(tmp_path / "reports"),
+        WRITE_QUEUE_PATH=str(tmp_path / "write_queue.db"),
+    )
+    get_fragment_cache(app).clear()
+
+    yield app
+
+    invalidate_office_cache()
+    for key in ("db_pool", "db_read_pool"):
+        pool = app.extensions.get(key)
+        if pool:
+            pool.close_all()
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    response = client.post("/login", data={"username": "admin", "password": "123456"})
+    assert response.status_code == 302
+    return client
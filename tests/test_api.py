@@ -0,0 +1,118 @@
+"""
+API JSON (/api/v1): criação, alteração condicional, exclusão e paginação
+por cursor com projeção de campos.
+"""
+
+
+def _create(client, *names, office="Central"):
+    response = client.post("/api/v1/registros", json={
+        "items": [{"nome": n, "escritorio": office} for n in names],
+    })
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()["ids"]
+
+
+def _versions(client, ids):
+    rows = client.get("/api/v1/registros?fields=id,version,nome&limit=200").get_json()["data"]
+    return {r["id"]: (r["version"], r["nome"]) for r in rows if r["id"] in ids}
+
+
+def test_patch_rejects_repeated_ids(app, admin_client):
+    reg_id, = _create(admin_client, "ANA")
+
+    response = admin_client.patch("/api/v1/registros", json={"items": [
+        {"id": reg_id, "version": 1, "nome": "ANA MARIA"},
+        {"id": reg_id, "version": 1, "nome": "ANA PAULA"},
+    ]})
+
+    assert response.status_code == 400
+    assert response.get_json()["details"] == [{"index": 1, "error": "id repetido"}]
+    assert _versions(admin_client, {reg_id}) == {reg_id: (1, "ANA")}
+
+
+def test_patch_conflict_rolls_back_every_item(app, admin_client):
+    first, second = _create(admin_client, "ANA", "BRUNO")
+
+    response = admin_client.patch("/api/v1/registros", json={"items": [
+        {"id": first, "version": 1, "nome": "ANA MARIA"},
+        {"id": second, "version": 7, "nome": "BRUNO LIMA"},
+    ]})
+
+    assert response.status_code == 409
+    assert response.get_json()["details"] == [
+        {"id": second, "error": "versão desatualizada", "version": 1},
+    ]
+    assert _versions(admin_client, {first, second}) == {first: (1, "ANA"), second: (1, "BRUNO")}
+
+    # A conexão segue utilizável: a próxima alteração grava normalmente
+    response = admin_client.patch("/api/v1/registros", json={"items": [
+        {"id": first, "version": 1, "nome": "ANA MARIA"},
+    ]})
+    assert response.get_json() == {"updated": 1, "versions": {str(first): 2}}
+
+
+def test_batch_update_missing_id_is_404_and_writes_nothing(app, admin_client):
+    reg_id, = _create(admin_client, "ANA")
+
+    response = admin_client.patch("/api/v1/registros/batch", json={
+        "set": {"tipo_acao": "REVISIONAL"}, "ids": [reg_id, 999999],
+    })
+
+    assert response.status_code == 404
+    assert response.get_json()["details"] == [{"id": 999999, "error": "registro não encontrado"}]
+    assert _versions(admin_client, {reg_id}) == {reg_id: (1, "ANA")}
+
+
+def test_list_pages_with_cursor_and_fields(app, admin_client):
+    ids = _create(admin_client, "ANA", "BRUNO", "CARLA", "DANIEL", "EDUARDO")
+
+    seen, cursor = [], None
+    while True:
+        query = {"fields": "nome", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        body = admin_client.get("/api/v1/registros", query_string=query).get_json()
+        assert all(set(r) == {"id", "nome"} for r in body["data"])
+        seen.extend(r["id"] for r in body["data"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == sorted(ids, reverse=True)
+
+
+def test_list_rejects_bad_parameters(app, admin_client):
+    for query in ({"fields": "nome,senha"}, {"cursor": "!!!"}, {"cursor": "YWJj"}):
+        response = admin_client.get("/api/v1/registros", query_string=query)
+        assert response.status_code == 400, query
+        assert "error" in response.get_json()
+
+    assert app.test_client().get("/api/v1/registros").status_code == 401
+
+
+def test_create_is_all_or_nothing(app, admin_client):
+    response = admin_client.post("/api/v1/registros", json={"items": [
+        {"nome": "ANA", "escritorio": "Central"},
+        {"nome": "", "escritorio": "Central"},
+        "texto",
+    ]})
+
+    assert response.status_code == 400
+    assert response.get_json()["details"] == [
+        {"index": 1, "error": "nome vazio"},
+        {"index": 2, "error": "item deve ser um objeto"},
+    ]
+    assert admin_client.get("/api/v1/registros").get_json()["data"] == []
+
+
+def test_deleted_records_move_to_trash_listing(app, admin_client):
+    ids = _create(admin_client, "ANA", "BRUNO", "CARLA")
+
+    response = admin_client.delete("/api/v1/registros", json={"ids": ids[:2]})
+    assert response.get_json() == {"deleted": 2}
+
+    body = admin_client.get("/api/v1/excluidos?fields=registro_id,nome&limit=1").get_json()
+    assert body["data"][0]["registro_id"] == ids[1]
+    assert body["next_cursor"]
+
+    body = admin_client.get(f"/api/v1/excluidos?fields=registro_id&cursor={body['next_cursor']}").get_json()
+    assert [r["registro_id"] for r in body["data"]] == [ids[0]]
+    assert body["next_cursor"] is None
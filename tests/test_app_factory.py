@@ -0,0 +1,19 @@
+from app.benchmark import SCENARIOS, check_endpoints
+
+
+def test_benchmark_endpoints_are_registered(app):
+    check_endpoints(app, SCENARIOS)
+
+
+def test_pages_render_for_admin(admin_client):
+    for url in ("/", "/table/CENTRAL", "/deleted/", "/offices/",
+                "/offices/dashboard", "/users/", "/import"):
+        assert admin_client.get(url).status_code == 200, url
+
+
+def test_pages_require_login(app):
+    client = app.test_client()
+    for url in ("/", "/table/CENTRAL", "/deleted/", "/offices/", "/users/"):
+        response = client.get(url)
+        assert response.status_code == 302, url
+        assert "/login" in response.location
@@ -0,0 +1,79 @@
+"""
+Backup online (API de backup do SQLite).
+"""
+
+import gzip
+import os
+import sqlite3
+
+from app.backup import backup_database
+from app.commands import db_backup_command
+from app.extensions import get_conn
+
+
+def _seed(app, n):
+    with app.app_context():
+        conn = get_conn()
+        conn.executemany(
+            "INSERT INTO registros (nome, observacoes) VALUES (?, ?)",
+            [(f"CLIENTE {i}", "x" * 500) for i in range(n)],
+        )
+        conn.commit()
+
+
+def _open(path):
+    conn = sqlite3.connect(path)
+    return conn, conn.execute("PRAGMA integrity_check").fetchone()[0]
+
+
+def test_backup_command_writes_verified_gzip_snapshot(app, tmp_path):
+    _seed(app, 50)
+    dest = tmp_path / "backups"
+    dest.mkdir()
+
+    with app.app_context():
+        result = app.test_cli_runner().invoke(db_backup_command, [str(dest), "--gzip"])
+    assert result.exit_code == 0, result.output
+    assert "integrity_check: ok" in result.output
+
+    archive, = dest.iterdir()
+    assert archive.name.startswith("database-") and archive.name.endswith(".db.gz")
+    assert not [p for p in dest.iterdir() if p.name.endswith(".tmp")]
+
+    restored = tmp_path / "restored.db"
+    restored.write_bytes(gzip.decompress(archive.read_bytes()))
+    conn, integrity = _open(restored)
+    assert integrity == "ok"
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert conn.execute("SELECT COUNT(*) FROM registros").fetchone()[0] == 50
+    conn.close()
+
+
+def test_backup_stays_consistent_with_concurrent_writes(app, tmp_path):
+    _seed(app, 200)
+    dest = str(tmp_path / "snapshot.db")
+    steps = []
+
+    with app.app_context():
+        conn = get_conn()
+
+        # Escrita entre os passos: a cópia recomeça e, no fim, copia de uma vez
+        def progress(remaining, total):
+            steps.append(remaining)
+            if remaining:
+                conn.execute("INSERT INTO registros (nome) VALUES ('durante o backup')")
+                conn.commit()
+
+        report = backup_database(app.config["DB_PATH"], dest, step_pages=2, pause_s=0,
+                                 progress=progress)
+        written = conn.execute("SELECT COUNT(*) FROM registros").fetchone()[0]
+
+    assert report["restarts"] >= 1
+    assert report["integrity"] == "ok"
+    assert os.path.exists(dest) and not os.path.exists(dest + ".tmp")
+
+    snapshot, integrity = _open(dest)
+    copied = snapshot.execute("SELECT COUNT(*) FROM registros").fetchone()[0]
+    assert integrity == "ok"
+    assert 200 <= copied <= written
+    snapshot.close()
@@ -0,0 +1,30 @@
+import csv
+
+from app.commands import import_registros_command
+
+
+def test_import_writes_rejected_rows_with_original_columns(app, tmp_path):
+    source = tmp_path / "entrada.csv"
+    source.write_text(
+        "Nome;CPF;Escritório;Observações\n"
+        "Maria;52998224725;SP;\n"
+        "José;123;;\n"
+        ";11111111111;RJ;ligar depois\n",
+        encoding="utf-8",
+    )
+    rejected = tmp_path / "rejeitadas.csv"
+
+    with app.app_context():
+        result = app.test_cli_runner().invoke(
+            import_registros_command, [str(source), "--rejected", str(rejected)]
+        )
+    assert result.exit_code == 0, result.output
+
+    with open(rejected, encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f, delimiter=";"))
+
+    assert rows == [
+        ["linha", "motivo", "Nome", "CPF", "Escritório", "Observações"],
+        ["3", "CPF inválido", "José", "123", "", ""],
+        ["4", "nome vazio", "", "11111111111", "RJ", "ligar depois"],
+    ]
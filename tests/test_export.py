@@ -0,0 +1,48 @@
+"""
+Exportação CSV em fluxo (records.export_csv).
+"""
+
+import csv
+import io
+
+from app import records
+from app.extensions import get_conn
+from app.query import EXPORT_COLUMNS
+
+
+def _seed(app, n):
+    with app.app_context():
+        conn = get_conn()
+        conn.executemany(
+            "INSERT INTO registros (nome, escritorio_dono) VALUES (?, ?)",
+            [(f"CLIENTE {i}", "SP" if i % 2 else "RJ") for i in range(n)],
+        )
+        conn.commit()
+
+
+def test_export_streams_in_chunks(app, admin_client, monkeypatch):
+    monkeypatch.setattr(records, "EXPORT_CHUNK_ROWS", 2)
+    _seed(app, 7)
+
+    response = admin_client.get("/export/SP")
+    assert response.is_streamed
+    assert response.mimetype == "text/csv"
+    assert "registros_SP_" in response.headers["Content-Disposition"]
+
+    chunks = [c.decode("utf-8") for c in response.response]
+    assert len(chunks) == 2  # cabeçalho + 2 linhas, depois a linha restante
+    text = "".join(chunks)
+
+    assert text.startswith("\ufeff")
+    rows = list(csv.reader(io.StringIO(text.lstrip("\ufeff")), delimiter=";"))
+    assert rows[0] == list(EXPORT_COLUMNS)
+    assert [r[1] for r in rows[1:]] == ["CLIENTE 5", "CLIENTE 3", "CLIENTE 1"]
+
+
+def test_export_applies_filters(app, admin_client):
+    _seed(app, 4)
+
+    text = admin_client.get("/export/CENTRAL?filtro=nome&valor=CLIENTE 2").get_data(as_text=True)
+    rows = list(csv.reader(io.StringIO(text.lstrip("\ufeff")), delimiter=";"))
+
+    assert [r[1] for r in rows[1:]] == ["CLIENTE 2"]
@@ -0,0 +1,36 @@
+"""
+Instrumentação de requisições e SQL (METRICS_ENABLED=1).
+"""
+
+import re
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _metrics_enabled(monkeypatch):
+    # Lido por create_app: precisa estar no ambiente antes da fixture app
+    monkeypatch.setenv("METRICS_ENABLED", "1")
+
+
+def test_server_timing_counts_sql(app, admin_client):
+    response = admin_client.get("/table/CENTRAL")
+    assert response.status_code == 200
+
+    timing = response.headers["Server-Timing"]
+    match = re.search(r'db;dur=[\d.]+;desc="(\d+) queries, (\d+) rows"', timing)
+    assert timing.startswith("app;dur=")
+    assert match and int(match.group(1)) > 0
+
+
+def test_metrics_endpoint_exposes_histograms(app, admin_client):
+    admin_client.get("/table/CENTRAL")
+
+    response = admin_client.get("/metrics")
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+
+    assert '# TYPE app_request_duration_seconds histogram' in text
+    assert re.search(r'app_request_duration_seconds_count\{endpoint="records.table"\} [1-9]', text)
+    assert re.search(r'app_sql_queries_total\{endpoint="records.table"\} [1-9]', text)
+
@@ -0,0 +1,92 @@
+import sqlite3
+
+from app.extensions import get_conn
+from app.migrations import MIGRATIONS, get_version, drop_soft_delete_columns
+from app.trash import restore_ids
+
+
+# Esquema do primeiro deploy (antes das migrações versionadas)
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    role TEXT NOT NULL,
+    active INTEGER DEFAULT 1,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE offices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    office_key TEXT UNIQUE NOT NULL,
+    display_name TEXT NOT NULL
+);
+CREATE TABLE user_offices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    office_key TEXT NOT NULL,
+    FOREIGN KEY(user_id) REFERENCES users(id)
+);
+CREATE TABLE registros (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT,
+    cpf TEXT,
+    escritorio_dono TEXT,
+    data_fechamento TEXT,
+    excluido INTEGER DEFAULT 0,
+    data_exclusao TEXT DEFAULT NULL
+);
+"""
+
+
+def _baseline_db(path, total=10, trashed=(1, 4, 7, 10)):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany(
+        "INSERT INTO registros (id, nome, cpf, escritorio_dono, excluido) VALUES (?, ?, ?, 'SP', ?)",
+        [(i, f"cliente {i}", f"{i:011d}", int(i in trashed)) for i in range(1, total + 1)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_upgrade_from_baseline_keeps_fts_in_sync(tmp_path, monkeypatch):
+    from app import create_app
+
+    path = tmp_path / "baseline.db"
+    _baseline_db(path)
+    monkeypatch.setenv("DB_PATH", str(path))
+
+    app = create_app()
+    with app.app_context():
+        conn = get_conn()
+        assert get_version(conn) == MIGRATIONS[-1][0]
+
+        live = conn.execute("SELECT COUNT(*) FROM registros").fetchone()[0]
+        trashed = conn.execute("SELECT COUNT(*) FROM excluidos").fetchone()[0]
+        assert (live, trashed) == (6, 4)
+
+        matched = [r[0] for r in conn.execute(
+            "SELECT rowid FROM registros_fts WHERE registros_fts MATCH 'cliente' ORDER BY rowid"
+        )]
+        assert matched == [r[0] for r in conn.execute("SELECT id FROM registros ORDER BY id")]
+
+        # Compara o índice com a tabela de conteúdo; falha com "malformed"
+        conn.execute("INSERT INTO registros_fts (registros_fts, rank) VALUES ('integrity-check', 1)")
+
+        stats = conn.execute(
+            "SELECT ativos, excluidos FROM office_stats WHERE office_key='SP'"
+        ).fetchone()
+        assert tuple(stats) == (6, 4)
+
+        # As colunas antigas ficam até o comando de manutenção
+        columns = {r[1] for r in conn.execute("PRAGMA table_info(registros)")}
+        assert {"excluido", "data_exclusao"} <= columns
+        assert drop_soft_delete_columns(conn) == ["excluido", "data_exclusao"]
+        conn.execute("INSERT INTO registros_fts (registros_fts, rank) VALUES ('integrity-check', 1)")
+
+        # A lixeira migrada guarda o id original; restaurar devolve o mesmo id
+        trash_ids = [r[0] for r in conn.execute("SELECT id FROM excluidos")]
+        assert restore_ids(conn, trash_ids) == 4
+        ids = [r[0] for r in conn.execute("SELECT id FROM registros ORDER BY id")]
+        assert ids == list(range(1, 11))
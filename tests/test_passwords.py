@@ -0,0 +1,50 @@
+"""
+Senhas: rehash no login (texto puro legado e custo antigo).
+"""
+
+from werkzeug.security import generate_password_hash
+
+from app.extensions import get_conn
+
+
+def _set_password(app, stored):
+    with app.app_context():
+        conn = get_conn()
+        conn.execute("UPDATE users SET password=? WHERE username='admin'", (stored,))
+        conn.commit()
+
+
+def _stored(app):
+    with app.app_context():
+        return get_conn().execute(
+            "SELECT password FROM users WHERE username='admin'"
+        ).fetchone()[0]
+
+
+def _login(app, password):
+    response = app.test_client().post("/login", data={"username": "admin", "password": password})
+    return response.status_code == 302 and "/login" not in response.headers.get("Location", "")
+
+
+def test_plaintext_password_is_rehashed_on_login(app):
+    _set_password(app, "segredo")
+
+    assert not _login(app, "errada")
+    assert _stored(app) == "segredo"
+
+    assert _login(app, "segredo")
+    assert _stored(app).startswith("pbkdf2:sha256:1000$")
+    assert _login(app, "segredo")
+
+
+def test_old_cost_is_upgraded_on_login(app):
+    old = generate_password_hash("segredo", method="pbkdf2:sha256:600")
+    _set_password(app, old)
+
+    assert _login(app, "segredo")
+    stored = _stored(app)
+    assert stored != old and stored.startswith("pbkdf2:sha256:1000$")
+
+    # Já no custo atual: o login não regrava
+    assert _login(app, "segredo")
+    assert _stored(app) == stored
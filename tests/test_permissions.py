@@ -0,0 +1,118 @@
+import json
+import os
+
+from app.extensions import get_conn
+
+
+def _operator_client(app, offices):
+    with app.app_context():
+        conn = get_conn()
+        user_id = conn.execute("""
+            INSERT INTO users (username, password, full_name, role)
+            VALUES ('operador', 'senha', 'Operador', 'OPERADOR')
+        """).lastrowid
+        conn.executemany(
+            "INSERT INTO user_offices (user_id, office_key) VALUES (?, ?)",
+            [(user_id, key) for key in offices],
+        )
+        conn.commit()
+
+    client = app.test_client()
+    response = client.post("/login", data={"username": "operador", "password": "senha"})
+    assert response.status_code == 302
+    return client
+
+
+def test_submit_rejects_office_outside_scope(app):
+    client = _operator_client(app, ["SP"])
+
+    form = {"nome": "Maria", "cpf": "", "escritorio_dono": "Filial Norte"}
+    assert client.post("/submit", data=form).status_code == 403
+
+    with app.app_context():
+        conn = get_conn()
+        assert conn.execute("SELECT COUNT(*) FROM registros").fetchone()[0] == 0
+        assert conn.execute(
+            "SELECT COUNT(*) FROM offices WHERE office_key='FILIAL_NORTE'"
+        ).fetchone()[0] == 0
+
+
+def test_dashboard_shows_only_allowed_offices(app):
+    with app.app_context():
+        conn = get_conn()
+        conn.executemany(
+            "INSERT INTO registros (nome, escritorio_dono) VALUES (?, ?)",
+            [("a", "SP"), ("b", "SP"), ("c", "RJ")],
+        )
+        conn.commit()
+
+    client = _operator_client(app, ["SP"])
+    data = client.get("/offices/dashboard?format=json").get_json()
+
+    assert [o["key"] for o in data["offices"]] == ["SP"]
+    assert data["totais"]["ativos"] == 2
+
+
+def test_report_job_is_visible_only_to_its_owner(app, admin_client):
+    reports_dir = app.config["REPORTS_DIR"]
+    os.makedirs(reports_dir)
+    job_id = "0" * 32
+    with open(os.path.join(reports_dir, f"{job_id}.owner"), "w") as f:
+        json.dump({"user_id": 1, "office": "SP"}, f)
+    with open(os.path.join(reports_dir, f"{job_id}.pdf"), "wb") as f:
+        f.write(b"%PDF-1.4")
+
+    assert admin_client.get(f"/reports/job/{job_id}").get_json()["status"] == "done"
+    assert admin_client.get(f"/reports/job/{job_id}/download").status_code == 200
+
+    other = _operator_client(app, ["SP"])
+    assert other.get(f"/reports/job/{job_id}").status_code == 404
+    assert other.get(f"/reports/job/{job_id}/download").status_code == 404
+
+
+def _session_rows(app):
+    with app.app_context():
+        return get_conn().execute(
+            "SELECT s.id, s.data FROM sessions s JOIN users u ON u.id = s.user_id "
+            "WHERE u.username = 'operador'"
+        ).fetchall()
+
+
+def test_office_change_reloads_snapshot_even_if_stale_one_is_saved_back(app, admin_client):
+    client = _operator_client(app, ["SP"])
+    assert client.get("/table/SP").status_code == 200
+    assert client.get("/table/RJ").status_code == 403
+
+    (sid, stale), = _session_rows(app)
+    with app.app_context():
+        user_id = get_conn().execute("SELECT id FROM users WHERE username='operador'").fetchone()[0]
+
+    response = admin_client.post(f"/users/offices/{user_id}", data={"offices": ["RJ"]})
+    assert response.status_code == 302
+
+    # Requisição concorrente que abriu a sessão antes da alteração e a
+    # grava de volta depois, com o snapshot antigo
+    with app.app_context():
+        conn = get_conn()
+        conn.execute("UPDATE sessions SET data=? WHERE id=?", (stale, sid))
+        conn.commit()
+
+    assert client.get("/table/SP").status_code == 403
+    assert client.get("/table/RJ").status_code == 200
+
+
+def test_dropped_session_is_not_saved_back(app, admin_client):
+    client = _operator_client(app, ["SP"])
+    with app.app_context():
+        user_id = get_conn().execute("SELECT id FROM users WHERE username='operador'").fetchone()[0]
+
+    # Sessão aberta antes da remoção do usuário e modificada depois
+    with client.session_transaction() as sess:
+        assert admin_client.post(f"/users/delete/{user_id}").status_code == 302
+        sess["_flashes"] = [("info", "depois da remoção")]
+
+    with app.app_context():
+        assert get_conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE user_id=?", (user_id,)
+        ).fetchone()[0] == 0
+    assert client.get("/table/SP").status_code == 302
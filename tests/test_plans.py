@@ -0,0 +1,11 @@
+from app.extensions import get_conn
+from app.plans import check_query_plans
+
+
+def test_query_plans_use_indexes(app):
+    with app.app_context():
+        report = check_query_plans(get_conn())
+
+    failed = {item["name"]: item["plan"] for item in report if not item["ok"]}
+    assert not failed
+    assert len(report) > 10
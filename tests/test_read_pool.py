@@ -0,0 +1,47 @@
+"""
+Pool somente leitura (get_read_conn) e snapshot em DB_READ_PATH.
+"""
+
+import sqlite3
+
+import pytest
+
+from app.backup import backup_database
+from app.extensions import get_conn, get_read_conn
+
+
+def _insert(app, nome):
+    with app.app_context():
+        conn = get_conn()
+        conn.execute("INSERT INTO registros (nome, escritorio_dono) VALUES (?, 'SP')", (nome,))
+        conn.commit()
+
+
+def test_read_conn_is_separate_and_read_only(app):
+    with app.test_request_context():
+        read = get_read_conn()
+        assert read is not get_conn()
+        assert read is get_read_conn()
+
+        with pytest.raises(sqlite3.OperationalError):
+            read.execute("INSERT INTO registros (nome) VALUES ('x')")
+
+    app.config["DB_READ_ROUTING"] = False
+    with app.test_request_context():
+        assert get_read_conn() is get_conn()
+
+
+def test_listing_reads_snapshot_and_follows_its_renewal(app, admin_client, tmp_path):
+    snapshot = str(tmp_path / "leitura.db")
+    _insert(app, "ANTES DO SNAPSHOT")
+    backup_database(app.config["DB_PATH"], snapshot, pause_s=0)
+    app.config["DB_READ_PATH"] = snapshot
+
+    _insert(app, "DEPOIS DO SNAPSHOT")
+    html = admin_client.get("/table/SP").get_data(as_text=True)
+    assert "ANTES DO SNAPSHOT" in html and "DEPOIS DO SNAPSHOT" not in html
+
+    # Snapshot renovado (novo arquivo no lugar): as conexões antigas são descartadas
+    backup_database(app.config["DB_PATH"], snapshot, pause_s=0)
+    html = admin_client.get("/table/SP").get_data(as_text=True)
+    assert "DEPOIS DO SNAPSHOT" in html
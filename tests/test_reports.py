@@ -0,0 +1,73 @@
+"""
+Relatórios PDF em lote: geração no pool de processos e jobs interrompidos.
+"""
+
+import json
+import os
+import time
+
+from app.extensions import get_conn
+from app.importer import INSERT_SQL, registro_params
+from app.reports import _get_executor
+
+
+def _insert(app, n):
+    with app.app_context():
+        conn = get_conn()
+        with conn:
+            for i in range(n):
+                conn.execute(INSERT_SQL, registro_params({
+                    "nome": f"CLIENTE {i}", "cpf": f"{i:011d}",
+                    "escritorio_dono": "CENTRAL", "escritorio_nome": "CENTRAL",
+                    "tipo_acao": "", "data_fechamento": "", "pendencias": "",
+                    "numero_processo": "", "data_protocolo": "",
+                    "observacoes": "", "captador": "",
+                    "created_at": "2024-01-01 00:00:00",
+                }))
+
+
+def _admin_id(app):
+    with app.app_context():
+        return get_conn().execute("SELECT id FROM users WHERE username = 'admin'").fetchone()[0]
+
+
+def test_report_job_runs_in_worker_process(app, admin_client):
+    _insert(app, 3)
+
+    response = admin_client.post("/reports/CENTRAL")
+    assert response.status_code == 202
+    status_url = response.get_json()["status_url"]
+
+    assert _get_executor(1)._mp_context.get_start_method() in ("forkserver", "spawn")
+
+    deadline = time.time() + 60
+    while True:
+        payload = admin_client.get(status_url).get_json()
+        if payload["status"] != "pending" or time.time() > deadline:
+            break
+        time.sleep(0.2)
+
+    assert payload["status"] == "done", payload
+    download = admin_client.get(payload["download_url"])
+    assert download.status_code == 200
+    assert download.data.startswith(b"%PDF")
+
+
+def test_stale_job_is_reported_as_error(app, admin_client):
+    reports_dir = app.config["REPORTS_DIR"]
+    os.makedirs(reports_dir, exist_ok=True)
+    job_id = "ab" * 16
+
+    # Filho morto no meio: .job ficou para trás, sem .pdf nem .err
+    with open(os.path.join(reports_dir, f"{job_id}.owner"), "w", encoding="utf-8") as f:
+        json.dump({"user_id": _admin_id(app), "office": "CENTRAL"}, f)
+    with open(os.path.join(reports_dir, f"{job_id}.job"), "w", encoding="utf-8") as f:
+        f.write(str(time.time() - 120))
+
+    app.config["REPORT_JOB_TIMEOUT_S"] = 3600
+    assert admin_client.get(f"/reports/job/{job_id}").get_json()["status"] == "pending"
+
+    app.config["REPORT_JOB_TIMEOUT_S"] = 60
+    payload = admin_client.get(f"/reports/job/{job_id}").get_json()
+    assert payload["status"] == "error"
+    assert "não concluído" in payload["error"]
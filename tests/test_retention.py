@@ -0,0 +1,61 @@
+"""
+Retenção da lixeira: remoção em lotes do que passou de N dias.
+"""
+
+from app import retention
+from app.commands import trash_purge_command
+from app.extensions import get_conn
+from app.retention import _claim_run, purge_expired_trash
+
+
+def _seed_trash(conn, ages):
+    """Uma linha em excluidos para cada idade (em dias) da exclusão."""
+    conn.executemany(
+        "INSERT INTO excluidos (nome, data_exclusao) VALUES (?, datetime('now', 'localtime', ?))",
+        [(f"item {i}", f"-{days} days") for i, days in enumerate(ages)],
+    )
+    conn.commit()
+
+
+def _remaining(conn):
+    return sorted(r[0] for r in conn.execute("SELECT nome FROM excluidos"))
+
+
+def test_purge_removes_only_expired_rows_in_batches(app, monkeypatch):
+    monkeypatch.setattr(retention, "BATCH_PAUSE_S", 0)
+
+    with app.app_context():
+        conn = get_conn()
+        _seed_trash(conn, [100, 95, 91, 89, 1])
+
+        report = purge_expired_trash(conn, 90, batch_size=2)
+
+        assert report["purged"] == 3
+        assert report["batches"] == 2
+        assert _remaining(conn) == ["item 3", "item 4"]
+        assert purge_expired_trash(conn, 90, batch_size=2)["purged"] == 0
+
+
+def test_purge_command_requires_days(app, monkeypatch):
+    monkeypatch.setattr(retention, "BATCH_PAUSE_S", 0)
+    runner = app.test_cli_runner()
+
+    with app.app_context():
+        _seed_trash(get_conn(), [40, 10])
+
+        result = runner.invoke(trash_purge_command, [])
+        assert result.exit_code != 0
+        assert "--days" in result.output
+
+        result = runner.invoke(trash_purge_command, ["--days", "30", "--no-vacuum"])
+        assert result.exit_code == 0, result.output
+        assert "1 registro(s) removido(s)" in result.output
+        assert _remaining(get_conn()) == ["item 1"]
+
+
+def test_only_one_worker_claims_each_interval(app):
+    with app.app_context():
+        conn = get_conn()
+        assert _claim_run(conn, 3600) is True
+        assert _claim_run(conn, 3600) is False
+        assert _claim_run(conn, 0) is True
@@ -0,0 +1,54 @@
+"""
+Busca textual (FTS5) em /search.
+"""
+
+from app.extensions import get_conn
+from app.trash import move_to_trash
+
+
+def _seed(app):
+    with app.app_context():
+        conn = get_conn()
+        ids = [conn.execute(
+            "INSERT INTO registros (nome, cpf, escritorio_dono, observacoes) VALUES (?, ?, ?, ?)",
+            row,
+        ).lastrowid for row in (
+            ("João Conceição", "52998224725", "SP", "aguardando perícia"),
+            ("Joana Silva", "11144477735", "RJ", ""),
+            ("Maria Souza", "98765432100", "SP", "revisão do benefício"),
+        )]
+        conn.commit()
+    return ids
+
+
+def _search(client, q, **args):
+    response = client.get("/search", query_string={"q": q, **args})
+    assert response.status_code == 200
+    return [r["nome"] for r in response.get_json()["results"]]
+
+
+def test_search_ignores_accents_and_masks(app, admin_client):
+    _seed(app)
+
+    assert _search(admin_client, "joao conceicao") == ["João Conceição"]
+    assert _search(admin_client, "CONCEIÇÃO") == ["João Conceição"]
+    assert _search(admin_client, "pericia") == ["João Conceição"]
+    assert _search(admin_client, "529.982.247-25") == ["João Conceição"]
+    assert sorted(_search(admin_client, "jo")) == ["Joana Silva", "João Conceição"]
+    assert _search(admin_client, 'jo" OR "maria') == []
+    assert _search(admin_client, "   ") == []
+
+
+def test_search_follows_writes_and_office(app, admin_client):
+    _, joana, maria = _seed(app)
+
+    assert _search(admin_client, "jo", office="RJ") == ["Joana Silva"]
+
+    with app.app_context():
+        conn = get_conn()
+        conn.execute("UPDATE registros SET nome='Mariana Souza' WHERE id=?", (maria,))
+        conn.commit()
+        move_to_trash(conn, [joana])
+
+    assert _search(admin_client, "mariana") == ["Mariana Souza"]
+    assert _search(admin_client, "joana") == []
@@ -0,0 +1,72 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app import writequeue
+from app.extensions import get_conn
+
+FORM = {
+    "nome": "Maria Souza",
+    "cpf": "529.982.247-25",
+    "escritorio_dono": "CENTRAL",
+    "tipo_acao": "TRABALHISTA",
+    "data_fechamento": "2024-03-01",
+    "pendencias": "ASSINATURA",
+    "numero_processo": "0001234-56.2024",
+    "data_protocolo": "2024-03-10",
+    "observacoes": "obs",
+    "captador": "PAGO",
+}
+
+EXPECTED = (
+    "Maria Souza", "52998224725", "CENTRAL", "CENTRAL", "TRABALHISTA", "2024-03-01",
+    "ASSINATURA", "0001234-56.2024", "2024-03-10", "obs", "PAGO",
+)
+
+COLUMNS = (
+    "nome, cpf, escritorio_dono, escritorio_nome, tipo_acao, data_fechamento, pendencias, "
+    "numero_processo, data_protocolo, observacoes, captador"
+)
+
+
+def _stored(app):
+    with app.app_context():
+        rows = get_conn().execute(f"SELECT {COLUMNS}, created_at FROM registros").fetchall()
+    assert len(rows) == 1
+    assert rows[0]["created_at"]
+    return tuple(rows[0])[:-1]
+
+
+@pytest.fixture
+def queue(app, monkeypatch):
+    # Sem thread gravadora: o teste drena a fila
+    monkeypatch.setattr(writequeue, "_local", threading.local())
+    monkeypatch.setattr(writequeue, "ensure_writer",
+                        lambda app: SimpleNamespace(wake=threading.Event()))
+    app.config["WRITE_BEHIND"] = True
+    return app
+
+
+def test_submit_stores_every_form_field(app, admin_client):
+    assert admin_client.post("/submit", data=FORM).status_code == 302
+
+    assert _stored(app) == EXPECTED
+
+
+def test_submit_stores_the_same_row_with_write_behind(app, admin_client, queue):
+    assert admin_client.post("/submit", data=FORM).status_code == 302
+    with app.app_context():
+        assert writequeue.drain_once(app) == 1
+
+    assert _stored(app) == EXPECTED
+
+
+def test_submit_rejects_invalid_rows(app, admin_client):
+    for form in (dict(FORM, nome=""), dict(FORM, cpf="123.456.789-00"),
+                 dict(FORM, data_fechamento="32/13/2024")):
+        response = admin_client.post("/submit", data=form, follow_redirects=True)
+        assert "Cadastro não aceito" in response.get_data(as_text=True)
+
+    with app.app_context():
+        assert get_conn().execute("SELECT COUNT(*) FROM registros").fetchone()[0] == 0
@@ -0,0 +1,87 @@
+"""
+Tabela de registros: paginação por keyset e filtros aplicados no banco.
+"""
+
+from app.extensions import get_conn
+from app.query import fetch_page, parse_filters
+
+
+ROWS = [
+    # nome, cpf, escritório, data_fechamento
+    ("ANA SOUZA", "52998224725", "SP", "2024-01-10"),
+    ("ANDRE LIMA", "11144477735", "SP", "2024-02-10"),
+    ("BRUNO ALVES", "52998224700", "RJ", "2024-03-10"),
+    ("CARLA DIAS", "98765432100", "SP", "2024-04-10"),
+    ("DANIEL REIS", "12345678909", "RJ", "2024-05-10"),
+]
+
+
+def _seed(app):
+    with app.app_context():
+        conn = get_conn()
+        ids = [conn.execute(
+            "INSERT INTO registros (nome, cpf, escritorio_dono, data_fechamento) VALUES (?, ?, ?, ?)",
+            row,
+        ).lastrowid for row in ROWS]
+        conn.commit()
+    return ids
+
+
+def _names(app, office="CENTRAL", args=None, allowed=None, **page):
+    with app.app_context():
+        result = fetch_page(get_conn(), parse_filters(office, args or {}, allowed), **page)
+    return [r["nome"] for r in result["rows"]], result
+
+
+def test_keyset_pages_forward_and_back(app):
+    _seed(app)
+
+    first, result = _names(app, per_page=2)
+    assert first == ["DANIEL REIS", "CARLA DIAS"]
+    assert (result["has_prev"], result["has_next"]) == (False, True)
+
+    second, result = _names(app, per_page=2, after=result["last_id"])
+    assert second == ["BRUNO ALVES", "ANDRE LIMA"]
+    assert (result["has_prev"], result["has_next"]) == (True, True)
+
+    last, result = _names(app, per_page=2, after=result["last_id"])
+    assert last == ["ANA SOUZA"]
+    assert result["has_next"] is False
+
+    back, result = _names(app, per_page=2, before=result["first_id"])
+    assert back == ["BRUNO ALVES", "ANDRE LIMA"]
+    assert result["has_prev"] is True
+
+
+def test_filters(app):
+    ids = _seed(app)
+
+    assert _names(app, args={"filtro": "nome", "valor": "AN"})[0] == ["ANDRE LIMA", "ANA SOUZA"]
+    assert _names(app, args={"filtro": "nome", "valor": "%"})[0] == []
+    assert _names(app, args={"filtro": "cpf", "valor": "529.982.247-25"})[0] == ["ANA SOUZA"]
+    assert _names(app, args={"filtro": "cpf", "valor": "529982"})[0] == ["BRUNO ALVES", "ANA SOUZA"]
+    assert _names(app, args={"filtro": "id", "valor": str(ids[2])})[0] == ["BRUNO ALVES"]
+    assert _names(app, args={"filtro": "id", "valor": "abc"})[0] == []
+
+    dates = {"data_tipo": "data_fechamento", "data_de": "2024-02-01", "data_ate": "2024-04-10"}
+    assert _names(app, args=dates)[0] == ["CARLA DIAS", "BRUNO ALVES", "ANDRE LIMA"]
+
+    assert _names(app, "RJ")[0] == ["DANIEL REIS", "BRUNO ALVES"]
+    assert _names(app, allowed=("SP",))[0] == ["CARLA DIAS", "ANDRE LIMA", "ANA SOUZA"]
+    assert _names(app, "RJ", allowed=("SP",))[0] == []
+
+
+def test_table_route_links_next_page(app, admin_client):
+    ids = _seed(app)
+
+    response = admin_client.get("/table/CENTRAL?per_page=2&filtro=nome&valor=A")
+    html = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert "ANDRE LIMA" in html and "ANA SOUZA" in html and "CARLA DIAS" not in html
+    assert "Próxima" not in html
+
+    response = admin_client.get(f"/table/CENTRAL?per_page=2&after={ids[4]}")
+    html = response.get_data(as_text=True)
+    assert "CARLA DIAS" in html and "BRUNO ALVES" in html and "DANIEL REIS" not in html
+    assert f"before={ids[3]}" in html
@@ -0,0 +1,78 @@
+from app.extensions import get_conn
+from app.trash import move_to_trash, purge_ids, restore_ids
+
+
+def _insert(conn, nome, office):
+    cur = conn.execute(
+        "INSERT INTO registros (nome, cpf, escritorio_dono, escritorio_nome) VALUES (?, '1', ?, ?)",
+        (nome, office, f"Escritório {office}"),
+    )
+    conn.commit()
+    return cur.lastrowid
+
+
+def test_restore_keeps_id_version_and_office_name(app):
+    with app.app_context():
+        conn = get_conn()
+        first = _insert(conn, "primeiro", "SP")
+        second = _insert(conn, "segundo", "RJ")
+        conn.execute("UPDATE registros SET version=5 WHERE id=?", (first,))
+        conn.commit()
+
+        assert move_to_trash(conn, [first, second]) == 2
+        _insert(conn, "depois", "SP")  # o id novo não reaproveita os da lixeira
+
+        trash_ids = [r[0] for r in conn.execute("SELECT id FROM excluidos")]
+        assert restore_ids(conn, trash_ids) == 2
+
+        rows = {r["id"]: r for r in conn.execute(
+            "SELECT id, version, escritorio_dono, escritorio_nome FROM registros"
+        )}
+        assert rows[first]["version"] == 5
+        assert (rows[first]["escritorio_dono"], rows[first]["escritorio_nome"]) == ("SP", "Escritório SP")
+        assert rows[second]["version"] == 1
+        assert rows[second]["escritorio_dono"] == "RJ"
+        assert conn.execute("SELECT COUNT(*) FROM excluidos").fetchone()[0] == 0
+
+
+def test_restore_and_purge_respect_allowed_offices(app):
+    with app.app_context():
+        conn = get_conn()
+        sp = _insert(conn, "sp", "SP")
+        rj = _insert(conn, "rj", "RJ")
+        move_to_trash(conn, [sp, rj])
+
+        trash = dict(conn.execute("SELECT escritorio_origem_chave, id FROM excluidos").fetchall())
+        assert restore_ids(conn, [trash["SP"], trash["RJ"]], allowed=frozenset({"SP"})) == 1
+        assert purge_ids(conn, [trash["RJ"]], allowed=frozenset({"SP"})) == 0
+
+        assert [r[0] for r in conn.execute("SELECT id FROM registros")] == [sp]
+        assert conn.execute("SELECT COUNT(*) FROM excluidos").fetchone()[0] == 1
+
+
+def test_trash_page_is_paginated_by_keyset(app, admin_client):
+    with app.app_context():
+        conn = get_conn()
+        ids = [_insert(conn, f"nome{i:02d}", "SP") for i in range(5)]
+        move_to_trash(conn, ids)
+        trash_ids = [r[0] for r in conn.execute("SELECT id FROM excluidos ORDER BY id DESC")]
+
+    def shown(response):
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+        return [i for i in trash_ids if f'name="ids" value="{i}"' in html]
+
+    first = admin_client.get("/deleted/?per_page=2")
+    assert shown(first) == trash_ids[:2]
+    assert f"after={trash_ids[1]}" in first.get_data(as_text=True)
+
+    second = admin_client.get(f"/deleted/?per_page=2&page=2&after={trash_ids[1]}")
+    assert shown(second) == trash_ids[2:4]
+
+    back = admin_client.get(f"/deleted/?per_page=2&before={trash_ids[2]}")
+    assert shown(back) == trash_ids[:2]
+
+    # Cada página tem sua entrada no cache; a exclusão permanente troca a versão
+    with app.app_context():
+        purge_ids(get_conn(), [trash_ids[0]])
+    assert shown(admin_client.get("/deleted/?per_page=2")) == trash_ids[1:3]
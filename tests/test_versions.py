@@ -0,0 +1,72 @@
+"""
+GET condicional (ETag / 304) pelas versões dos dados.
+"""
+
+from app.extensions import get_conn
+
+
+def _insert(app, nome, office):
+    with app.app_context():
+        conn = get_conn()
+        conn.execute("INSERT INTO registros (nome, escritorio_dono) VALUES (?, ?)", (nome, office))
+        conn.commit()
+
+
+def _consume_flash(client):
+    # A mensagem do login deixa a próxima página fora do GET condicional
+    client.get("/")
+
+
+def _revalidate(client, url, etag):
+    return client.get(url, headers={"If-None-Match": etag})
+
+
+def test_table_etag_is_invalidated_by_writes_to_its_office(app, admin_client):
+    _consume_flash(admin_client)
+    _insert(app, "PRIMEIRO", "SP")
+
+    first = admin_client.get("/table/SP")
+    etag = first.headers["ETag"].strip('"')
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    not_modified = _revalidate(admin_client, "/table/SP", etag)
+    assert not_modified.status_code == 304
+    assert not_modified.get_data() == b""
+
+    # Escrita em outro escritório não muda a versão de SP, só a de CENTRAL
+    central = admin_client.get("/table/CENTRAL").headers["ETag"].strip('"')
+    _insert(app, "OUTRO", "RJ")
+    assert _revalidate(admin_client, "/table/SP", etag).status_code == 304
+    assert _revalidate(admin_client, "/table/CENTRAL", central).status_code == 200
+
+    # Escrita em SP: página nova (e não o fragmento em cache), com outro ETag
+    _insert(app, "SEGUNDO", "SP")
+    changed = _revalidate(admin_client, "/table/SP", etag)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"].strip('"') != etag
+    assert "SEGUNDO" in changed.get_data(as_text=True)
+
+
+def test_etag_depends_on_query_and_user(app, admin_client):
+    _consume_flash(admin_client)
+    etag = admin_client.get("/table/CENTRAL").headers["ETag"].strip('"')
+
+    assert _revalidate(admin_client, "/table/CENTRAL?per_page=10", etag).status_code == 200
+
+    anonymous = app.test_client().get("/table/CENTRAL", headers={"If-None-Match": etag})
+    assert anonymous.status_code != 304
+
+
+def test_api_listing_is_conditional(app, admin_client):
+    _consume_flash(admin_client)
+    first = admin_client.get("/api/v1/offices")
+    etag = first.headers["ETag"].strip('"')
+    assert _revalidate(admin_client, "/api/v1/offices", etag).status_code == 304
+
+    with app.app_context():
+        conn = get_conn()
+        conn.execute("INSERT INTO offices (office_key, display_name) VALUES ('SP', 'São Paulo')")
+        conn.commit()
+
+    assert _revalidate(admin_client, "/api/v1/offices", etag).status_code == 200
@@ -0,0 +1,31 @@
+import json
+import threading
+
+from app import writequeue
+from app.extensions import get_conn
+from app.writequeue import drain_once, requeue_failed, queue_stats
+
+
+def test_requeued_failed_item_is_applied(app, monkeypatch):
+    monkeypatch.setattr(writequeue, "_local", threading.local())
+
+    with app.app_context():
+        queue = writequeue._queue_conn(app)
+        with queue:
+            for nome in ("A", "B"):
+                queue.execute(
+                    "INSERT INTO write_queue (payload, created_at) VALUES (?, '2024-01-01')",
+                    (json.dumps({"nome": nome, "escritorio_dono": "SP"}),),
+                )
+            queue.execute("UPDATE write_queue SET last_error='falhou' WHERE id=1")
+
+        # B avança o marcador para além do item com erro
+        assert drain_once(app) == 1
+        assert queue_stats(app) == {"pending": 0, "failed": 1}
+
+        assert requeue_failed(app) == 1
+        assert drain_once(app) == 1
+        assert queue_stats(app) == {"pending": 0, "failed": 0}
+
+        nomes = [r[0] for r in get_conn().execute("SELECT nome FROM registros ORDER BY nome")]
+        assert nomes == ["A", "B"]